@@ -0,0 +1,175 @@
+"""
+Aggregates of an output csv file that are saved next to it, so later runs
+only have to read the rows that were appended since
+"""
+import hashlib  # To notice if the output file was replaced
+import json  # Format of the sidecar file
+import os  # To replace the sidecar file atomically
+
+from libs.backend.dsa_results import read_csv_rows, parse_rolls, \
+    dice_eyes, D20_CATEGORIES
+
+# bump this if the layout of the sidecar file changes
+VERSION = 1
+
+# how many bytes at the start of the output file identify it
+FINGERPRINT_SIZE = 4096
+
+
+class IncrementalAggregate:
+    """
+    Roll histograms, per entry test counts and success/failure counts of an
+    output csv file, together with the byte offset up to which the file was
+    read. The output file is append only, so update() continues at that
+    offset.
+
+    ...
+
+    Attributes
+    ----------
+    path: str
+        file path of the output csv file
+    sidecar_path: str
+        file path of the saved aggregates, <path>.agg.json
+    offset: int
+        bytes of the output file that are already counted, always the end
+        of a complete row
+    fingerprint: str
+        hash of the first bytes of the output file
+    row_count: int
+        number of counted rows
+    rolls: dict
+        dice type ("auto"/"manual") -> dice eyes -> rolled value -> count
+    entries: dict
+        "category/name" -> [tests, successes, failures]
+
+    Methods
+    -------
+    update(chunk_size=1 << 20):
+        Count the rows appended since the last update and save the
+        aggregates.
+    reset():
+        Forget everything, the next update reads the whole file.
+    save():
+        Write the aggregates to the sidecar file.
+    _load():
+        Read the sidecar file if it exists.
+    _add_rows(rows):
+        Count a list of rows.
+    _fingerprint(csv_file):
+        Hash of the first bytes of the output file.
+    """
+
+    def __init__(self, path):
+        """
+        Parameters:
+            path (str): file path of the output csv file
+        """
+        self.path = path
+        self.sidecar_path = path + ".agg.json"
+        self.reset()
+        self._load()
+
+    def reset(self):
+        """ forget everything, the next update reads the whole file """
+        self.offset = 0
+        self.fingerprint = ''
+        self.row_count = 0
+        self.rolls = {}
+        self.entries = {}
+
+    def update(self, chunk_size=1 << 20):
+        """ count the rows appended since the last update and save the
+        aggregates. if the output file was replaced or got shorter, it is
+        counted from the start again
+        input: chunk_size:int, bytes per read
+        output: new_rows:int, number of rows counted by this update """
+        rows_before = self.row_count
+        with open(self.path, "rb") as csv_file:
+            size = csv_file.seek(0, os.SEEK_END)
+            if size < self.offset or \
+                    self._fingerprint(csv_file) != self.fingerprint:
+                self.reset()
+
+            csv_file.seek(self.offset)
+            rest = b''
+            while True:
+                chunk = csv_file.read(chunk_size)
+                if not chunk:
+                    break
+                chunk = rest + chunk
+                # only complete rows are counted, the rest waits for the
+                # next chunk or the next update
+                cut = chunk.rfind(b"\n") + 1
+                rest = chunk[cut:]
+                if cut:
+                    lines = chunk[:cut].decode("utf-8").splitlines()
+                    self._add_rows(read_csv_rows(lines))
+                    self.offset += cut
+
+            self.fingerprint = self._fingerprint(csv_file)
+
+        self.save()
+        return self.row_count - rows_before
+
+    def save(self):
+        """ write the aggregates to the sidecar file. a temporary file is
+        renamed so a crash never leaves a half written sidecar """
+        data = {"version": VERSION,
+                "offset": self.offset,
+                "fingerprint": self.fingerprint,
+                "row_count": self.row_count,
+                "rolls": self.rolls,
+                "entries": self.entries}
+        temp_path = self.sidecar_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as sidecar:
+            json.dump(data, sidecar)
+        os.replace(temp_path, self.sidecar_path)
+
+    def _load(self):
+        """ read the sidecar file if it exists and has the current layout """
+        try:
+            with open(self.sidecar_path, "r", encoding="utf-8") as sidecar:
+                data = json.load(sidecar)
+        except (OSError, ValueError):
+            return
+        if data.get("version") != VERSION:
+            return
+        self.offset = data["offset"]
+        self.fingerprint = data["fingerprint"]
+        self.row_count = data["row_count"]
+        self.rolls = data["rolls"]
+        self.entries = data["entries"]
+
+    def _add_rows(self, rows):
+        """ count a list of rows
+        input: rows:iterable, rows in the output csv column order """
+        for row in rows:
+            self.row_count += 1
+            if row[1] in D20_CATEGORIES:
+                counts = self.entries.setdefault(row[1] + "/" + row[2],
+                                                 [0, 0, 0])
+                counts[0] += 1
+                if row[8] != '':
+                    if int(row[8]) >= 0:
+                        counts[1] += 1
+                    else:
+                        counts[2] += 1
+
+            eyes = dice_eyes(row)
+            if eyes is None:
+                continue
+            # json keys are strings
+            histogram = self.rolls.setdefault(row[11], {}).setdefault(
+                str(eyes), {})
+            for roll in parse_rolls(row[7]):
+                histogram[str(roll)] = histogram.get(str(roll), 0) + 1
+
+    def _fingerprint(self, csv_file):
+        """ hash of the first bytes of the output file, only bytes that are
+        already counted are used so appending doesn't change it
+        input: csv_file:file object, opened in binary mode
+        output: str """
+        csv_file.seek(0)
+        start = csv_file.read(min(self.offset, FINGERPRINT_SIZE))
+        return hashlib.sha1(start).hexdigest()
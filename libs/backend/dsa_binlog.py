@@ -0,0 +1,416 @@
+"""
+Compact binary append-only log for test results, an alternative to the
+output csv file
+"""
+import csv  # To export the log as output csv file
+import datetime  # Timestamps are stored as seconds
+import os  # To check if files already exist
+import re  # To split the roll number from the description
+import struct  # Fixed width binary records
+import threading  # The writer thread and the interface share one log
+
+from libs.backend.dsa_game import COLUMNS
+from libs.backend.dsa_rules import RULE_SETS, DEFAULT_RULES
+
+# first bytes of every log file
+MAGIC = b"DSALOG01"
+
+# categories are stored as their index in this tuple
+CATEGORIES = ("attr", "skill", "spell", "fight_talent", "advantage",
+              "special_skill", "misc")
+
+DICE_TYPES = ("auto", "manual")
+
+# the dice type field holds the dice type in its low 4 bits and the index of
+# the critical rule set in its high 4 bits. logs written before rule sets
+# existed have 0 there, which is the default rule set
+RULES_SHIFT = 4
+DICE_MASK = (1 << RULES_SHIFT) - 1
+
+# stands for an empty csv cell in signed fields
+NONE_VALUE = -32768
+
+# every record has the same size. a test record holds category, hero id,
+# entry id, misc dice count, misc dice eyes, value, modifier, attrs id,
+# result, timestamp, dice type and rule set, roll number, description id,
+# roll count and the first 3 rolls. misc tests with more dice are followed
+# by continuation records holding up to 22 more rolls each
+RECORD = struct.Struct("<BIIHHhhIiIBIIH3H")
+CONTINUATION = struct.Struct("<BB22H")
+RECORD_ROLLS = 3
+CONTINUATION_ROLLS = 22
+# category code of continuation records
+CONTINUED = 255
+
+# smallest and largest value of the record fields that come from a test,
+# NONE_VALUE is kept free for empty cells
+SHORT_RANGE = (NONE_VALUE + 1, 32767)
+USHORT_RANGE = (0, 65535)
+INT_RANGE = (-(1 << 31), (1 << 31) - 1)
+
+# string table entries are stored as length followed by utf-8 bytes
+STRING_LENGTH = struct.Struct("<H")
+
+EPOCH = datetime.datetime(1970, 1, 1)
+
+# regex: "Roll#12: some text" -> '12', 'some text'
+# ^: match from start of string
+# \d+: match one or more integers
+# (.*)$: match everything else until the end of the string
+DESC_PATTERN = re.compile(r"^Roll#(\d+): (.*)$", re.DOTALL)
+
+
+def _to_int(value):
+    """ csv cells are strings, empty cells are stored as NONE_VALUE
+    input: value:str/int/None
+    output: int """
+    if value is None or value == '':
+        return NONE_VALUE
+    return int(value)
+
+
+def _from_int(value):
+    """ reverse of _to_int()
+    input: value:int
+    output: int or '' """
+    return '' if value == NONE_VALUE else value
+
+
+def check_row(row):
+    """ the fields of a record have a fixed width, struct can't pack values
+    outside of it. raises ValueError naming the value that doesn't fit
+    input: row:list, in the output csv column order """
+    rolls = row[7]
+    if isinstance(rolls, str):
+        rolls = [int(i) for i in rolls.split(";") if i.strip()]
+    misc = str(row[3]).upper().split("D") if row[3] else (0, 0)
+    fields = [("misc dice count", misc[0], USHORT_RANGE),
+              ("misc dice eyes", misc[1], USHORT_RANGE),
+              ("value", row[4], SHORT_RANGE),
+              ("modifier", row[5], SHORT_RANGE),
+              ("result", row[8], INT_RANGE),
+              ("roll count", len(rolls), USHORT_RANGE)]
+    fields.extend(("roll", i, USHORT_RANGE) for i in rolls)
+    for name, value, (low, high) in fields:
+        if value is None or value == '':
+            continue
+        if not low <= int(value) <= high:
+            raise ValueError("{0} {1} doesn't fit into the binary log, it "
+                             "has to be from {2} to {3}".format(
+                                 name, value, low, high))
+
+
+class BinaryResultLog:
+    """
+    Appends test results as fixed width struct packed records to a binary
+    file. Hero files, entry names, attribute strings and descriptions are
+    stored once in a string table next to the log (<path>.str) and only
+    referenced by their index.
+
+    ...
+
+    Attributes
+    ----------
+    _path: str
+        file path of the log
+    _string_path: str
+        file path of the string table
+    _strings: list
+        all strings of the string table, the index is the id
+    _string_ids: dict
+        string -> id
+    _lock: threading.Lock
+        serializes writing
+    _readonly: bool
+        the log is only read, the files are never changed
+
+    Methods
+    -------
+    write_rows(rows):
+        Append rows in the output csv column order to the log.
+    read_records(chunk_size=1 << 20):
+        Stream the raw records of the log.
+    read_rows():
+        Stream the log as rows in the output csv column order.
+    last_roll_number():
+        Roll number of the last saved test.
+    export_csv(csv_path):
+        Write the whole log as output csv file.
+    _pack_rows(rows, new_strings):
+        Pack rows into fixed width records.
+    _string_id(text, new_strings):
+        Look up or create the id of a string.
+    _load_strings():
+        Read the string table.
+    """
+
+    def __init__(self, path, readonly=False):
+        """
+        Parameters:
+            path (str): file path of the log, created if it doesn't exist
+
+            readonly (bool): only read the log. another process may be
+                appending to it, so a torn record at the end is skipped
+                instead of cut off
+        """
+        self._path = path
+        self._string_path = path + ".str"
+        self._strings = []
+        self._string_ids = {}
+        self._lock = threading.Lock()
+        self._readonly = readonly
+
+        if readonly:
+            with open(self._path, "rb") as log_file:
+                if log_file.read(len(MAGIC)) != MAGIC:
+                    raise ValueError(self._path + " is no DSATester log")
+        elif not os.path.isfile(self._path):
+            with open(self._path, "wb") as log_file:
+                log_file.write(MAGIC)
+        else:
+            with open(self._path, "r+b") as log_file:
+                if log_file.read(len(MAGIC)) != MAGIC:
+                    raise ValueError(self._path + " is no DSATester log")
+                # a crash can leave half a record at the end, cut it off so
+                # new records start at a record boundary
+                size = log_file.seek(0, os.SEEK_END) - len(MAGIC)
+                if size % RECORD.size:
+                    log_file.truncate(size - size % RECORD.size + len(MAGIC))
+        self._load_strings()
+
+    def write_rows(self, rows):
+        """ append rows to the log, can be used as sink of
+        libs.backend.dsa_writer.ResultWriter. raises ValueError if a value
+        doesn't fit into its record field, no row is written then
+        input: rows:list, rows in the output csv column order """
+        if self._readonly:
+            raise ValueError(self._path + " is opened read only")
+        with self._lock:
+            new_strings = []
+            try:
+                records = self._pack_rows(rows, new_strings)
+                # strings have to be on disk before the records that use
+                # them
+                if new_strings:
+                    with open(self._string_path, "ab") as string_file:
+                        string_file.write(b''.join(
+                            STRING_LENGTH.pack(len(encoded)) + encoded
+                            for encoded in (text.encode("utf-8")
+                                            for text in new_strings)))
+            except Exception:
+                # forget the new strings so their ids are given out again
+                for text in new_strings:
+                    del self._string_ids[text]
+                del self._strings[len(self._strings) - len(new_strings):]
+                raise
+            with open(self._path, "ab") as log_file:
+                log_file.write(records)
+
+    def _pack_rows(self, rows, new_strings):
+        """ pack rows into records, caller holds the lock
+        input: rows:list, rows in the output csv column order
+               new_strings:list, strings added to the string table are
+                                 appended to this list
+        output: records:bytes """
+        records = []
+        # many rows share a timestamp, converting it is the slowest part
+        seconds = {}
+        for row in rows:
+            check_row(row)
+            rolls = row[7]
+            if isinstance(rolls, str):
+                rolls = [int(i) for i in rolls.split(";") if i.strip()]
+
+            if row[3]:
+                misc_count, misc_eyes = str(row[3]).upper().split("D")
+            else:
+                misc_count, misc_eyes = 0, 0
+
+            match = DESC_PATTERN.match(row[9] or '')
+            if match:
+                roll_nr = int(match.groups()[0])
+                desc = match.groups()[1]
+            else:
+                roll_nr = 0
+                desc = row[9] or ''
+
+            try:
+                timestamp = seconds[row[10]]
+            except KeyError:
+                timestamp = int((datetime.datetime.fromisoformat(row[10]) -
+                                 EPOCH).total_seconds())
+                seconds[row[10]] = timestamp
+
+            inline = list(rolls[:RECORD_ROLLS]) + [0] * RECORD_ROLLS
+            records.append(RECORD.pack(
+                CATEGORIES.index(row[1]),
+                self._string_id(row[0], new_strings),
+                self._string_id(row[2] or '', new_strings),
+                int(misc_count),
+                int(misc_eyes),
+                _to_int(row[4]),
+                _to_int(row[5]),
+                self._string_id(row[6] or '', new_strings),
+                _to_int(row[8]),
+                timestamp,
+                DICE_TYPES.index(row[11]) | RULE_SETS.index(
+                    row[12] if len(row) > 12 else DEFAULT_RULES) <<
+                RULES_SHIFT,
+                roll_nr,
+                self._string_id(desc, new_strings),
+                len(rolls),
+                *inline[:RECORD_ROLLS]))
+            for start in range(RECORD_ROLLS, len(rolls),
+                               CONTINUATION_ROLLS):
+                part = list(rolls[start:start + CONTINUATION_ROLLS])
+                records.append(CONTINUATION.pack(
+                    CONTINUED, len(part),
+                    *(part + [0] * (CONTINUATION_ROLLS - len(part)))))
+
+        return b''.join(records)
+
+    def read_records(self, chunk_size=1 << 20):
+        """ stream the raw records of the log, the file is read in chunks of
+        whole records. a test whose continuation records are missing (e.g.
+        after a crash) is skipped
+        input: chunk_size:int, approximate bytes per read
+        output: (record, rolls):tuple, record is the unpacked RECORD tuple,
+                rolls is a tuple of ints """
+        record_size = RECORD.size
+        chunk_size = max(1, chunk_size // record_size) * record_size
+        record = None
+        rolls = None
+        missing = 0
+        with open(self._path, "rb") as log_file:
+            log_file.seek(len(MAGIC))
+            while True:
+                chunk = log_file.read(chunk_size)
+                if len(chunk) < record_size:
+                    return
+                chunk = chunk[:len(chunk) - len(chunk) % record_size]
+                for index, unpacked in enumerate(
+                        RECORD.iter_unpack(chunk)):
+                    if unpacked[0] == CONTINUED:
+                        if not missing:
+                            # continuation of a skipped test
+                            continue
+                        continuation = CONTINUATION.unpack_from(
+                            chunk, index * record_size)
+                        rolls += continuation[2:2 + continuation[1]]
+                        missing -= 1
+                        if not missing:
+                            yield record, rolls
+                        continue
+
+                    # a new test, if the last one was incomplete it's dropped
+                    roll_count = unpacked[13]
+                    record = unpacked
+                    rolls = unpacked[14:14 + min(roll_count, RECORD_ROLLS)]
+                    missing = max(0, -(-(roll_count - RECORD_ROLLS) //
+                                       CONTINUATION_ROLLS))
+                    if not missing:
+                        yield record, rolls
+
+    def read_rows(self):
+        """ stream the log as rows in the output csv column order
+        output: row:list """
+        strings = self._strings
+        for record, rolls in self.read_records():
+            (category, hero_id, entry_id, misc_count, misc_eyes, value, mod,
+             attrs_id, result, timestamp, dice, roll_nr, desc_id) = record[:13]
+            if max(hero_id, entry_id, attrs_id, desc_id) >= len(strings):
+                # another process appended records and their strings after
+                # the string table was read, strings are written first
+                self._load_strings()
+                strings = self._strings
+            if misc_count:
+                misc = str(misc_count) + "D" + str(misc_eyes)
+            else:
+                misc = ''
+            if roll_nr:
+                desc = f"Roll#{roll_nr}: {strings[desc_id]}"
+            else:
+                desc = strings[desc_id]
+            timestamp = EPOCH + datetime.timedelta(seconds=timestamp)
+            yield [strings[hero_id],
+                   CATEGORIES[category],
+                   strings[entry_id],
+                   misc,
+                   _from_int(value),
+                   _from_int(mod),
+                   strings[attrs_id],
+                   "; ".join(map(str, rolls)),
+                   _from_int(result),
+                   desc,
+                   timestamp.strftime('%Y-%m-%dT%H:%M:%S'),
+                   DICE_TYPES[dice & DICE_MASK],
+                   RULE_SETS[dice >> RULES_SHIFT]]
+
+    def last_roll_number(self):
+        """ roll number of the last saved test. records are read backwards
+        from the end of the log, skipping continuation records
+        output: int, None if there is no test with a roll number """
+        with self._lock, open(self._path, "rb") as log_file:
+            position = log_file.seek(0, os.SEEK_END)
+            # a record that is still being written isn't complete yet
+            position -= (position - len(MAGIC)) % RECORD.size
+            while position - RECORD.size >= len(MAGIC):
+                position -= RECORD.size
+                log_file.seek(position)
+                record = RECORD.unpack(log_file.read(RECORD.size))
+                if record[0] != CONTINUED and record[11]:
+                    return record[11]
+        return None
+
+    def export_csv(self, csv_path):
+        """ write the whole log as output csv file
+        input: csv_path:str
+        output: count:int, number of written rows """
+        count = 0
+        with open(csv_path, "w", encoding="utf-8", newline='') as csv_file:
+            file_writer = csv.writer(csv_file, delimiter=',', quotechar='|',
+                                     quoting=csv.QUOTE_MINIMAL)
+            file_writer.writerow(COLUMNS)
+            for row in self.read_rows():
+                file_writer.writerow(row)
+                count += 1
+        return count
+
+    def _string_id(self, text, new_strings):
+        """ look up or create the id of a string, caller holds the lock
+        input: text:str
+               new_strings:list, created strings are added to this list
+        output: int """
+        try:
+            return self._string_ids[text]
+        except KeyError:
+            pass
+        string_id = len(self._strings)
+        self._strings.append(text)
+        self._string_ids[text] = string_id
+        new_strings.append(text)
+        return string_id
+
+    def _load_strings(self):
+        """ read the string table. an incomplete entry at the end is cut off
+        so the next string is appended at the right place, a read only log
+        leaves it alone """
+        self._strings = []
+        self._string_ids = {}
+        if not os.path.isfile(self._string_path):
+            return
+        with open(self._string_path, "rb") as string_file:
+            data = string_file.read()
+        offset = 0
+        while offset + STRING_LENGTH.size <= len(data):
+            length = STRING_LENGTH.unpack_from(data, offset)[0]
+            start = offset + STRING_LENGTH.size
+            if start + length > len(data):
+                break
+            text = data[start:start + length].decode("utf-8")
+            self._string_ids.setdefault(text, len(self._strings))
+            self._strings.append(text)
+            offset = start + length
+        if offset != len(data) and not self._readonly:
+            with open(self._string_path, "r+b") as string_file:
+                string_file.truncate(offset)
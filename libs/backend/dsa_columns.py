@@ -0,0 +1,232 @@
+"""
+Column store of all entries of all heroes, for filters and aggregates over
+the whole party
+"""
+from array import array  # Compact columns if numpy is missing
+
+try:
+    import numpy as np
+except ImportError:  # the columns are array.array and filters are loops
+    np = None
+
+# category codes, the position in this tuple is stored
+CATEGORIES = ("attr", "skill", "spell", "fight_talent", "advantage",
+              "special_skill")
+# attribute codes of the related attributes of skills and spells
+ATTRIBUTES = ("MU", "KL", "IN", "CH", "FF", "GE", "KO", "KK")
+# stored instead of a missing attribute and a missing value
+NO_ATTR = 255
+NO_VALUE = -32768
+
+# typecodes of the columns, numpy dtypes and array module typecodes
+COLUMN_TYPES = {"hero_id": ("uint32", "I"),
+                "category": ("uint8", "B"),
+                "name_id": ("uint32", "I"),
+                "value": ("int16", "h"),
+                "attr_1": ("uint8", "B"),
+                "attr_2": ("uint8", "B"),
+                "attr_3": ("uint8", "B"),
+                "attr_value_1": ("int16", "h"),
+                "attr_value_2": ("int16", "h"),
+                "attr_value_3": ("int16", "h")}
+
+
+class EntryColumns:
+    """
+    One row per entry of every hero, stored column by column. With numpy the
+    filters are vectorized, without numpy the columns are array.array and
+    filters loop over them
+
+    ...
+
+    Attributes
+    ----------
+    heroes: list
+        hero names, the hero_id column is the position in this list
+    names: list
+        entry names, the name_id column is the position in this list
+    columns: dict
+        column name -> numpy.ndarray or array.array, see COLUMN_TYPES.
+        attr_1..3 are codes of ATTRIBUTES, attr_value_1..3 are the values of
+        these attributes of the entry's hero
+    version: int
+        hero version of GameLogic the columns were built from
+
+    Methods
+    -------
+    select(category, hero, name, min_value, max_value, uses_attr):
+        Indexes of all rows that match every given filter.
+    rows(indexes):
+        Entries of the given rows as tuples.
+    count_by_hero(indexes):
+        How many of the given rows belong to each hero.
+    values_by_hero(name):
+        Value of one entry for every hero that has it.
+    """
+
+    def __init__(self, heroes, version=0):
+        """
+        Parameters:
+            heroes (mapping): hero name -> namedtuple Hero, e.g.
+            GameLogic._heroes
+
+            version (int): hero version of GameLogic
+        """
+        self.heroes = []
+        self.names = []
+        self.version = version
+        name_ids = {}
+        columns = {key: array(typecode) for key, (_, typecode) in
+                   COLUMN_TYPES.items()}
+
+        for hero_id, (hero_name, hero) in enumerate(sorted(heroes.items())):
+            self.heroes.append(hero_name)
+            attr_values = {attr.abbr: getattr(attr, "value", None) for attr
+                           in hero.attrs if attr.abbr}
+            for entries in (hero.attrs, hero.skills, hero.spells,
+                            hero.fight_talents, hero.advantages,
+                            hero.special_skills):
+                for entry in entries:
+                    name_id = name_ids.get(entry.name)
+                    if name_id is None:
+                        name_id = name_ids[entry.name] = len(self.names)
+                        self.names.append(entry.name)
+                    value = getattr(entry, "value", None)
+                    attrs = getattr(entry, "attrs", None) or ()
+
+                    columns["hero_id"].append(hero_id)
+                    columns["category"].append(
+                        CATEGORIES.index(entry.category))
+                    columns["name_id"].append(name_id)
+                    columns["value"].append(
+                        NO_VALUE if value is None else value)
+                    for index in range(3):
+                        abbr = attrs[index] if index < len(attrs) else None
+                        attr_value = attr_values.get(abbr)
+                        columns["attr_" + str(index + 1)].append(
+                            ATTRIBUTES.index(abbr) if abbr in ATTRIBUTES
+                            else NO_ATTR)
+                        columns["attr_value_" + str(index + 1)].append(
+                            NO_VALUE if attr_value is None else attr_value)
+
+        if np is None:
+            self.columns = columns
+        else:
+            # the array buffers are copied once, without a python object
+            # per value
+            self.columns = {key: np.frombuffer(
+                column, dtype=COLUMN_TYPES[key][0]).copy()
+                if len(column) else np.zeros(0, COLUMN_TYPES[key][0])
+                for key, column in columns.items()}
+        self._name_ids = name_ids
+
+    def __len__(self):
+        return len(self.columns["hero_id"])
+
+    def select(self, category=None, hero=None, name=None, min_value=None,
+               max_value=None, uses_attr=None):
+        """ indexes of all rows that match every given filter, a filter that
+        is None is not used
+        input: category:str, e.g. "skill"
+               hero:str, hero name
+               name:str, entry name
+               min_value:int, value >= min_value
+               max_value:int, value <= max_value
+               uses_attr:str, e.g. "KL", one of the related attributes
+        output: indexes:numpy.ndarray or list """
+        # (column, code) pairs of the equality filters
+        equal = []
+        if category is not None:
+            equal.append(("category", CATEGORIES.index(category)))
+        if hero is not None:
+            if hero not in self.heroes:
+                return self._empty()
+            equal.append(("hero_id", self.heroes.index(hero)))
+        if name is not None:
+            if name not in self._name_ids:
+                return self._empty()
+            equal.append(("name_id", self._name_ids[name]))
+        attr_code = None if uses_attr is None else ATTRIBUTES.index(uses_attr)
+        value = self.columns["value"]
+
+        if np is not None:
+            mask = np.ones(len(self), dtype=bool)
+            for key, code in equal:
+                mask &= self.columns[key] == code
+            if min_value is not None or max_value is not None:
+                mask &= value != NO_VALUE
+            if min_value is not None:
+                mask &= value >= min_value
+            if max_value is not None:
+                mask &= value <= max_value
+            if attr_code is not None:
+                mask &= (self.columns["attr_1"] == attr_code) | \
+                    (self.columns["attr_2"] == attr_code) | \
+                    (self.columns["attr_3"] == attr_code)
+            return np.flatnonzero(mask)
+
+        indexes = range(len(self))
+        for key, code in equal:
+            column = self.columns[key]
+            indexes = [i for i in indexes if column[i] == code]
+        if min_value is not None:
+            indexes = [i for i in indexes
+                       if value[i] != NO_VALUE and value[i] >= min_value]
+        if max_value is not None:
+            indexes = [i for i in indexes
+                       if value[i] != NO_VALUE and value[i] <= max_value]
+        if attr_code is not None:
+            attrs = (self.columns["attr_1"], self.columns["attr_2"],
+                     self.columns["attr_3"])
+            indexes = [i for i in indexes
+                       if attr_code in (attrs[0][i], attrs[1][i], attrs[2][i])]
+        return list(indexes)
+
+    def _empty(self):
+        """ result of a filter that matches nothing
+        output: numpy.ndarray or list """
+        return np.zeros(0, dtype=np.intp) if np is not None else []
+
+    def rows(self, indexes):
+        """ entries of the given rows
+        input: indexes:iterable of int, e.g. from select()
+        output: list of (hero, category, name, value, attrs) tuples, attrs is
+                a tuple of (abbr, value) pairs """
+        columns = self.columns
+        out_list = []
+        for index in indexes:
+            attrs = []
+            for number in ("1", "2", "3"):
+                code = columns["attr_" + number][index]
+                if code != NO_ATTR:
+                    attrs.append((ATTRIBUTES[code],
+                                  int(columns["attr_value_" + number][index])))
+            value = int(columns["value"][index])
+            out_list.append((self.heroes[columns["hero_id"][index]],
+                             CATEGORIES[columns["category"][index]],
+                             self.names[columns["name_id"][index]],
+                             None if value == NO_VALUE else value,
+                             tuple(attrs)))
+        return out_list
+
+    def count_by_hero(self, indexes):
+        """ how many of the given rows belong to each hero
+        input: indexes:iterable of int, e.g. from select()
+        output: counts:dict, hero name -> count, heroes without rows are
+                left out """
+        hero_ids = self.columns["hero_id"]
+        if np is not None:
+            counts = np.bincount(hero_ids[indexes], minlength=len(self.heroes))
+            return {self.heroes[i]: int(count) for i, count in
+                    enumerate(counts) if count}
+        counts = {}
+        for index in indexes:
+            hero = self.heroes[hero_ids[index]]
+            counts[hero] = counts.get(hero, 0) + 1
+        return counts
+
+    def values_by_hero(self, name):
+        """ value of one entry for every hero that has it
+        input: name:str, entry name, e.g. "Klettern"
+        output: values:dict, hero name -> value """
+        return {row[0]: row[3] for row in self.rows(self.select(name=name))}
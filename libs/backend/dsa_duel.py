@@ -0,0 +1,277 @@
+"""
+Monte Carlo simulation of duels between two heroes: every round both heroes
+attack once with the AT value of a fight talent and the other one parries
+with its PA value, until the first hit. Duels are simulated in chunks of a
+fixed size, every chunk has its own seed, so the result only depends on the
+seed and not on the number of worker processes
+
+Critical rolls (DSA 4.1, simplified):
+    - an attack or parry roll of 1 always succeeds, a roll of 20 always fails
+    - a 1 has to be confirmed by a second roll that succeeds, a 20 by a
+      second roll that fails
+    - a confirmed critical attack can only be parried by a confirmed
+      critical parry
+    - after a confirmed fumbled attack the attacker skips its next attack
+"""
+import concurrent.futures  # To simulate chunks on worker processes
+import random  # Duels without numpy
+from collections import namedtuple
+
+try:
+    import numpy as np
+except ImportError:  # duels are simulated one by one
+    np = None
+
+# one side of a duel. at and pa are the values of the fight talent, mods
+# included
+Fighter = namedtuple("Fighter", ["hero", "talent", "at", "pa"])
+
+
+class DuelResult:
+    """
+    Outcome counts of many simulated duels
+
+    ...
+
+    Attributes
+    ----------
+    duels: int
+        number of simulated duels
+    max_rounds: int
+        duels without a hit after this many rounds are a draw
+    rounds: list
+        two lists, wins of the first and the second fighter per round of the
+        first hit, index 0 is round 1
+    draws: int
+        duels without a hit
+
+    Methods
+    -------
+    add(other):
+        Add the counts of another DuelResult.
+    wins(side):
+        Number of duels won by side 0 or 1.
+    win_chance(side):
+        Share of duels won by side 0 or 1.
+    mean_rounds():
+        Mean number of rounds until the first hit, draws left out.
+    rounds_distribution():
+        Share of duels decided in each round.
+    """
+
+    def __init__(self, max_rounds):
+        self.duels = 0
+        self.max_rounds = max_rounds
+        self.rounds = [[0] * max_rounds, [0] * max_rounds]
+        self.draws = 0
+
+    def add(self, other):
+        """ add the counts of another DuelResult, e.g. of another chunk
+        input: other:DuelResult """
+        self.duels += other.duels
+        self.draws += other.draws
+        for side in (0, 1):
+            self.rounds[side] = [i + j for i, j in
+                                 zip(self.rounds[side], other.rounds[side])]
+
+    def wins(self, side):
+        """ number of duels won by one side
+        input: side:int, 0 for the first fighter, 1 for the second
+        output: int """
+        return sum(self.rounds[side])
+
+    def win_chance(self, side):
+        """ share of duels won by one side
+        input: side:int, 0 for the first fighter, 1 for the second
+        output: float """
+        return self.wins(side) / self.duels if self.duels else 0.0
+
+    def mean_rounds(self):
+        """ mean number of rounds until the first hit, draws left out
+        output: float """
+        decided = self.duels - self.draws
+        if not decided:
+            return 0.0
+        return sum((index + 1) * (first + second) for index, (first, second)
+                   in enumerate(zip(*self.rounds))) / decided
+
+    def rounds_distribution(self):
+        """ share of duels decided in each round
+        output: list, index 0 is round 1 """
+        return [(first + second) / self.duels if self.duels else 0.0
+                for first, second in zip(*self.rounds)]
+
+
+def fighter(columns, hero, talent, at_mod=0, pa_mod=0):
+    """ AT and PA value of one fight talent of a hero
+    input: columns:libs.backend.dsa_columns.EntryColumns
+           hero:str, hero name
+           talent:str, fight talent without "AT "/"PA ", e.g. "Hiebwaffen"
+           at_mod:int, added to the AT value
+           pa_mod:int, added to the PA value
+    output: Fighter, raises KeyError if the hero doesn't have the talent """
+    values = {}
+    for mode in ("AT", "PA"):
+        found = [row[3] for row in columns.rows(columns.select(
+            category="fight_talent", hero=hero)) if row[2] is not None and
+                 row[2].lower() == (mode + ' ' + talent).lower()]
+        if not found or found[0] is None:
+            raise KeyError(hero + ": " + mode + ' ' + talent)
+        values[mode] = found[0]
+    return Fighter(hero, talent, values["AT"] + at_mod, values["PA"] + pa_mod)
+
+
+def _chunk_seed(seed, chunk):
+    """ seed of one chunk of duels
+    input: seed:int
+           chunk:int, index of the chunk
+    output: int """
+    return seed * 1000003 + chunk
+
+
+def _rolls_numpy(rng, size, value, criticals):
+    """ vectorized roll of attacks or parries
+    input: rng:numpy.random.Generator
+           size:int
+           value:int, AT or PA value
+           criticals:bool
+    output: (success, critical, fumble):tuple of bool arrays """
+    rolls = rng.integers(1, 21, size=size)
+    if not criticals:
+        no_critical = np.zeros(size, dtype=bool)
+        return rolls <= value, no_critical, no_critical
+    confirm = rng.integers(1, 21, size=size)
+    success = ((rolls <= value) | (rolls == 1)) & (rolls != 20)
+    critical = (rolls == 1) & ((confirm <= value) | (confirm == 1)) & \
+        (confirm != 20)
+    fumble = (rolls == 20) & ((confirm > value) | (confirm == 20)) & \
+        (confirm != 1)
+    return success, critical, fumble
+
+
+def _simulate_numpy(first, second, duels, seed, max_rounds, criticals):
+    """ simulate a chunk of duels at once, every round works on the arrays
+    of all undecided duels
+    input: see simulate_chunk()
+    output: DuelResult """
+    rng = np.random.default_rng(seed)
+    result = DuelResult(max_rounds)
+    result.duels = duels
+    # indexes of undecided duels and if a side skips its next attack
+    active = np.arange(duels)
+    skip = [np.zeros(duels, dtype=bool), np.zeros(duels, dtype=bool)]
+    fighters = (first, second)
+
+    for round_index in range(max_rounds):
+        for side in (0, 1):
+            if not len(active):
+                return result
+            attacker, defender = fighters[side], fighters[1 - side]
+            size = len(active)
+            attack, critical, fumble = _rolls_numpy(rng, size, attacker.at,
+                                                    criticals)
+            parry, critical_parry, _ = _rolls_numpy(rng, size, defender.pa,
+                                                    criticals)
+            skipped = skip[side][active]
+            # a critical attack is only stopped by a critical parry
+            hit = attack & ~skipped & np.where(critical, ~critical_parry,
+                                               ~parry)
+            skip[side][active] = fumble & ~skipped
+
+            result.rounds[side][round_index] += int(hit.sum())
+            active = active[~hit]
+    result.draws = len(active)
+    return result
+
+
+def _roll(rng, value, criticals):
+    """ one attack or parry, same rules as _rolls_numpy()
+    input: rng:random.Random
+           value:int, AT or PA value
+           criticals:bool
+    output: (success, critical, fumble):tuple of bool """
+    roll = rng.randint(1, 20)
+    if not criticals:
+        return roll <= value, False, False
+    if roll == 1:
+        confirm = rng.randint(1, 20)
+        return True, confirm != 20 and (confirm <= value or confirm == 1), \
+            False
+    if roll == 20:
+        confirm = rng.randint(1, 20)
+        return False, False, confirm != 1 and (confirm > value or
+                                               confirm == 20)
+    return roll <= value, False, False
+
+
+def _simulate_loop(first, second, duels, seed, max_rounds, criticals):
+    """ simulate a chunk of duels one by one
+    input: see simulate_chunk()
+    output: DuelResult """
+    rng = random.Random(seed)
+    result = DuelResult(max_rounds)
+    result.duels = duels
+    fighters = (first, second)
+
+    for _ in range(duels):
+        skip = [False, False]
+        decided = False
+        for round_index in range(max_rounds):
+            for side in (0, 1):
+                attack, critical, fumble = _roll(rng, fighters[side].at,
+                                                 criticals)
+                parry, critical_parry, _ = _roll(rng, fighters[1 - side].pa,
+                                                 criticals)
+                skipped = skip[side]
+                skip[side] = fumble and not skipped
+                if skipped or not attack:
+                    continue
+                if critical and not critical_parry or \
+                        not critical and not parry:
+                    result.rounds[side][round_index] += 1
+                    decided = True
+                    break
+            if decided:
+                break
+        if not decided:
+            result.draws += 1
+    return result
+
+
+def simulate_chunk(job):
+    """ simulate one chunk of duels, runs on a worker process
+    input: job:tuple, (first, second, duels, seed, max_rounds, criticals),
+           first and second are Fighter, seed is the seed of the chunk
+    output: DuelResult """
+    if np is not None:
+        return _simulate_numpy(*job)
+    return _simulate_loop(*job)
+
+
+def simulate(first, second, duels, seed=1, processes=1, max_rounds=100,
+             criticals=True, chunk_size=100000):
+    """ simulate many duels, the first fighter attacks first in every round
+    input: first:Fighter
+           second:Fighter
+           duels:int
+           seed:int, the same seed always gives the same result
+           processes:int, worker processes, 1 simulates on this process
+           max_rounds:int, duels without a hit after this many rounds are a
+                      draw
+           criticals:bool, if rolls of 1 and 20 are critical
+           chunk_size:int, duels per chunk
+    output: DuelResult """
+    jobs = []
+    for chunk, start in enumerate(range(0, duels, chunk_size)):
+        jobs.append((first, second, min(chunk_size, duels - start),
+                     _chunk_seed(seed, chunk), max_rounds, criticals))
+
+    result = DuelResult(max_rounds)
+    if processes == 1:
+        for chunk_result in map(simulate_chunk, jobs):
+            result.add(chunk_result)
+    else:
+        with concurrent.futures.ProcessPoolExecutor(processes) as pool:
+            for chunk_result in pool.map(simulate_chunk, jobs):
+                result.add(chunk_result)
+    return result
@@ -0,0 +1,163 @@
+"""
+Extended tests (Sammelproben) of DSA 4.1: a skill or spell test is repeated
+until the points of the successful tries reach a target or the tries run
+out. A successful try adds its result, at least 1 point, a failed try adds
+nothing. The points of one try follow distribution_3dice(), so the tries
+are combined exactly by convolution. If the table of point totals would get
+too big, tries are simulated in batches instead
+"""
+import random  # Simulation without numpy
+from collections import namedtuple
+
+from libs.backend.dsa_probability import distribution_3dice
+from libs.backend.dsa_rules import DEFAULT_RULES
+
+try:
+    import numpy as np
+except ImportError:  # simulation draws one try at a time
+    np = None
+
+# tries: chance to reach the target with exactly try n, index 0 is try 1
+# chance: chance to reach the target within the try limit
+# method: "exact" or "simulation"
+# samples: simulated extended tests, 0 for exact results
+ExtendedResult = namedtuple("ExtendedResult", ["tries",
+                                               "chance",
+                                               "method",
+                                               "samples"])
+
+# exact results are computed if target * points per try * tries is below
+# this, otherwise they are simulated
+EXACT_LIMIT = 20000000
+# drawn tries per simulated batch, bounds the memory of a batch
+BATCH_TRIES = 4000000
+
+
+def points_distribution(attr_values, value, mod, rules=DEFAULT_RULES):
+    """ points a single try adds and how many of the 8000 roll combinations
+    lead to them
+    input: attr_values:tuple, the 3 unmodified attribute values
+           value:int, value of the tested skill/spell
+           mod:int, test modifier
+           rules:str, critical rule set, one of dsa_rules.RULE_SETS
+    output: counts:dict, points -> number of combinations """
+    counts = {}
+    for result, count in distribution_3dice(tuple(attr_values), value,
+                                            mod, rules).items():
+        points = max(result, 1) if result >= 0 else 0
+        counts[points] = counts.get(points, 0) + count
+    return counts
+
+
+def exact_tries(counts, target, tries):
+    """ convolve the points of the tries. totals that reached the target
+    leave the table, so it never has more than target rows
+    input: counts:dict, created by points_distribution()
+           target:int, points that have to be reached
+           tries:int, try limit
+    output: finished:list, chance to reach the target with exactly try n """
+    total = sum(counts.values())
+    chances = [(points, count / total) for points, count in counts.items()]
+    # chance of every point total that didn't reach the target yet
+    open_totals = {0: 1.0}
+    finished = []
+    for _ in range(tries):
+        if not open_totals:
+            # every test reached the target already
+            finished.append(0.0)
+            continue
+        next_totals = {}
+        done = 0.0
+        for points_sum, chance in open_totals.items():
+            for points, points_chance in chances:
+                new_sum = points_sum + points
+                if new_sum >= target:
+                    done += chance * points_chance
+                else:
+                    next_totals[new_sum] = next_totals.get(new_sum, 0.0) + \
+                        chance * points_chance
+        finished.append(done)
+        open_totals = next_totals
+    return finished
+
+
+def simulate_tries(counts, target, tries, samples, seed=None):
+    """ simulate extended tests in batches, every try draws its points from
+    the points distribution
+    input: counts:dict, created by points_distribution()
+           target:int
+           tries:int
+           samples:int, number of simulated extended tests
+           seed:int, makes the simulation repeatable
+    output: finished:list, share of tests that reached the target with
+            exactly try n """
+    points = sorted(counts)
+    weights = [counts[i] for i in points]
+    finished = [0] * tries
+
+    if np is not None:
+        rng = np.random.default_rng(seed)
+        chances = np.array(weights) / sum(weights)
+        batch_size = max(1, BATCH_TRIES // tries)
+        for start in range(0, samples, batch_size):
+            size = min(batch_size, samples - start)
+            sums = np.cumsum(rng.choice(points, size=(size, tries),
+                                        p=chances), axis=1)
+            reached = sums >= target
+            # first try that reached the target, tests that never did are
+            # left out
+            first = reached.argmax(axis=1)[reached.any(axis=1)]
+            for index, count in enumerate(np.bincount(first,
+                                                      minlength=tries)):
+                finished[index] += int(count)
+    else:
+        rng = random.Random(seed)
+        cum_weights = []
+        for weight in weights:
+            cum_weights.append(weight + (cum_weights[-1] if cum_weights
+                                         else 0))
+        for _ in range(samples):
+            points_sum = 0
+            for index, drawn in enumerate(rng.choices(
+                    points, cum_weights=cum_weights, k=tries)):
+                points_sum += drawn
+                if points_sum >= target:
+                    finished[index] += 1
+                    break
+    return [i / samples for i in finished]
+
+
+def extended_test(attr_values, value, mod, target, tries, samples=1000000,
+                  seed=None, method="auto", rules=DEFAULT_RULES):
+    """ chance of an extended test and how many tries it takes
+    input: attr_values:tuple, the 3 unmodified attribute values
+           value:int, value of the tested skill/spell
+           mod:int, test modifier of every try
+           target:int, points that have to be reached
+           tries:int, try limit
+           samples:int, simulated extended tests if it is simulated
+           seed:int, makes the simulation repeatable
+           method:str, "exact", "simulation" or "auto", auto is exact unless
+                  the table of point totals gets too big
+           rules:str, critical rule set of every try
+    output: ExtendedResult """
+    counts = points_distribution(attr_values, value, mod, rules)
+    if method == "auto":
+        size = target * len(counts) * tries
+        method = "exact" if size <= EXACT_LIMIT else "simulation"
+    if method == "exact":
+        finished = exact_tries(counts, target, tries)
+        samples = 0
+    else:
+        finished = simulate_tries(counts, target, tries, samples, seed)
+    return ExtendedResult(finished, sum(finished), method, samples)
+
+
+def mean_tries(result):
+    """ mean number of tries of the extended tests that reached the target
+    input: result:ExtendedResult
+    output: float, 0.0 if the target can't be reached """
+    if not result.chance:
+        return 0.0
+    return sum((index + 1) * chance for index, chance in
+               enumerate(result.tries)) / result.chance
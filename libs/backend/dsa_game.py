@@ -1,21 +1,21 @@
 """
 The code to provide the logic behind DSATester
 """
-import xml.etree.ElementTree  # To parse input xml file
-
 import copy  # To make copies of attributo and sinnenschaerfe
 import csv  # To write into file
 import datetime  # To log time of dice roll
 import operator  # To subtract list from list
 import os  # To check if file already exists
-import random  # For dice rolls
+import random  # For dice rolls, seeded per session
 import re  # Regular expressions
-import xml.etree.ElementTree  # To parse input xml file
 from collections import namedtuple
+from collections.abc import Mapping  # Base of HeroCache
 from dataclasses import dataclass  # To create GameState
 
 from libs.backend.dsa_data import Attribute, Skill, Spell, FightTalent, \
     Advantage, SpecialSkill, Misc
+from libs.backend.dsa_rules import RULE_SETS, DEFAULT_RULES, result_1dice, \
+    result_3dice
 
 
 @dataclass
@@ -40,6 +40,7 @@ class GameState:
     test_input (str): User input to match with hero entries or misc dice sum
     option_list (list): List of hero entries matching the test input
     selection (list): Single entry from option_list
+    rules (str): Critical rule set the result was computed with
     """
     save: bool = False
     dice: str = None
@@ -53,6 +54,38 @@ class GameState:
     test_input: str = None
     option_list: list = None
     selection: list = None
+    rules: str = DEFAULT_RULES
+
+
+# Columns of the output file, every saved test is one row in this order
+COLUMNS = ["Hero file",
+           "Test type",
+           "Name of tested entry",
+           "Misc dice sum input",
+           "Value of tested entry",
+           "Modifier",
+           "Values of related attributes",
+           "Rolls",
+           "Result",
+           "Description",
+           "Timestamp",
+           "Type of dice input",
+           "Critical rules"]
+
+# regex: "Roll#12: some text" -> '12'
+# ^: match from start of string
+# \d+: match one or more integers
+ROLL_PATTERN = re.compile(r"^Roll#(\d+):")
+
+
+def roll_number(desc):
+    """ read the roll number from a saved description
+    input: desc:str, e.g. "Roll#12: some text"
+    output: int, None if the description has no roll number """
+    match = ROLL_PATTERN.match(desc or '')
+    if match:
+        return int(match.groups()[0])
+    return None
 
 
 # Data type for every attribute related to a skill/spell test.
@@ -76,6 +109,94 @@ Hero = namedtuple("Hero", ["name",
                            "special_skills"])
 
 
+class HeroCache(Mapping):
+    """
+    Read-only dictionary of hero name -> namedtuple Hero. The names are known
+    from the start, a hero file is only parsed the first time its hero is
+    looked up
+
+    ...
+
+    Attributes
+    ----------
+    _names: list
+        all hero names, in the order of the files
+    _read_hero: callable
+        turns a hero name into a namedtuple Hero
+    _loaded: dict
+        heroes that were already parsed
+    """
+
+    def __init__(self, names, read_hero):
+        self._names = names
+        self._read_hero = read_hero
+        self._loaded = {}
+
+    def __getitem__(self, name):
+        try:
+            return self._loaded[name]
+        except KeyError:
+            if name not in self._names:
+                raise
+        hero = self._loaded[name] = self._read_hero(name)
+        return hero
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def __len__(self):
+        return len(self._names)
+
+
+class SessionDice:
+    """
+    Random number generator of one session. It is seeded, so a session that
+    is replayed with the same seed rolls the same dice
+
+    ...
+
+    Attributes
+    ----------
+    seed: int
+        seed of the generator
+    position: int
+        how many numbers were drawn so far
+    _rng: random.Random
+        the generator
+
+    Methods
+    -------
+    roll(dice_count, min_value, max_value):
+        Draw dice rolls.
+    draw_seed():
+        Draw the seed of a batch of rolls, e.g. of a group test.
+    """
+
+    def __init__(self, seed=None):
+        if seed is None:
+            # a new seed for every session that doesn't set one
+            seed = int.from_bytes(os.urandom(8), "big")
+        self.seed = seed
+        self.position = 0
+        self._rng = random.Random(seed)
+
+    def roll(self, dice_count, min_value, max_value):
+        """ draw dice rolls
+        input: dice_count:int, how many numbers to generate
+               min_value:int, lowest possible number
+               max_value:int, highest possible number
+        output: rolls:list, list of generated numbers """
+        self.position += dice_count
+        randint = self._rng.randint
+        return [randint(min_value, max_value) for _ in range(dice_count)]
+
+    def draw_seed(self):
+        """ draw the seed of a batch of rolls, e.g. of a group test
+        output: int """
+        self.position += 1
+        return self._rng.getrandbits(32)
+
+
 class GameLogic:
     """
     DSA 4.1 rules for testing, called upon by interfaces. Reads xml files,
@@ -89,26 +210,72 @@ class GameLogic:
         holds all test categories that can be tested
     _result_csv: str
         file path of output csv file
+    _output_format: str
+        "csv", "sqlite" or "binary", how saved tests are stored
+    _store: libs.backend.dsa_sqlite.SqliteResultStore or
+            libs.backend.dsa_binlog.BinaryResultLog
+        used instead of the csv file if _output_format is "sqlite" or
+        "binary"
     _hero_folder: str
         directory where hero xml files are stored
+    _rules: str
+        critical rule set of all tests, one of dsa_rules.RULE_SETS
     _lang: dict
         language dictionary holding all strings that will be displayed
-    _heroes: dict
-        dictionary holding all read in heroes. Keys are the hero names,
-        fields are namedtuple Hero.
+    _heroes: HeroCache
+        dictionary holding all heroes. Keys are the hero names, fields are
+        namedtuple Hero. A hero file is parsed when its hero is first used.
     _xml_list: list
         list of all found hero xml files
+    _hero_version: int
+        increased every time the hero files are read in again
+    _columns: libs.backend.dsa_columns.EntryColumns
+        column store of all entries of all heroes, built on first use
+    _dice: SessionDice
+        random number generator of all dice rolls
+    _recorder: libs.backend.dsa_trace.SessionRecorder
+        appends the input events to the session trace file, None if the
+        session isn't recorded
 
     Methods
     -------
     _get_all_xml():
-        Read in all hero xml files and store contents in namedtuple Hero.
+        Find all hero xml files, they are read in on first use.
+    reload_heroes():
+        Find the hero xml files again, e.g. after a hero file changed.
+    entry_columns():
+        Column store of all entries of all heroes, for party-wide queries.
+    group_test(test_input, mod, heroes=None, seed=None):
+        Test one entry for many heroes at once, ranked with exact success
+        chances.
+    group_rows(state, results):
+        Create the output csv rows of a group test.
+    _read_hero(name):
+        Read in one hero xml file and store contents in namedtuple Hero.
     _parse_xml(hero_file):
         Use xml.etree.ElementTree.parse to read in hero xml files.
     _setup_output_file():
         If output file doesn't exist, write csv header.
-    save_to_csv(state):
-        Write current test as new row in output csv file.
+    _read_tail(block_size=4096, max_bytes=1 << 16):
+        Read the last rows of the output csv file without reading the whole
+        file.
+    _repair_output_file():
+        Cut off a torn last row of the output csv file.
+    _upgrade_output_file():
+        Add the "Critical rules" column to an older output csv file.
+    restore_counter(state):
+        Continue GameState.counter from the last saved roll number.
+    save_to_csv(state, writer=None):
+        Write current test as new row in output csv file, or hand it to a
+        background ResultWriter.
+    make_row(state):
+        Create the output csv row for the current test.
+    check_row(row):
+        Check if the output format can store a row.
+    record_save(desc, counter):
+        Add a save to the session trace.
+    write_rows(rows):
+        Append a list of rows to the output csv file.
     _read_attributes(root):
         Make one Attribute object for each attribute entry and add it to list.
     _read_skills(root):
@@ -132,11 +299,17 @@ class GameLogic:
         Test the categories attribute, fight talent, advantage.
     _test_3dice(state):
         Test the categories skill, spell.
+    _related_attrs(state):
+        Get the 3 attributes related to the selected skill/spell.
+    extended_test(state, target, tries, samples=1000000, seed=None):
+        Chance of an extended test and how many tries it needs.
     _test_misc(state):
         Add the values of a user specified number of dice to create the misc
         dice sum.
     _roll_dice(dice_count, min_value, max_value):
         Random number generator.
+    dice_position():
+        How many random numbers the session drew so far.
     autocomplete(state):
         Creates a list of hero entries (attributes, skills, spells,
         fight talents, special skills, advantages) that contain the user's
@@ -155,60 +328,149 @@ class GameLogic:
     def __init__(self, configs, lang):
         self.supported_tests = ["attr", "skill", "spell", "fight_talent",
                                 "advantage"]
-        random.seed(a=None, version=2)
         self._result_csv = configs["output file"]
+        # older config files don't have this entry, csv stays the default
+        self._output_format = configs.get("output format", "csv")
+        self._store = None
         self._hero_folder = configs["hero folder"]
         self._lang = lang
+        # older config files don't have this entry, criticals stay off
+        self._rules = configs.get("critical rules", DEFAULT_RULES)
+        if self._rules not in RULE_SETS:
+            raise ValueError("critical rules: " + self._rules)
 
-        self._heroes = dict()  # entries are namedtuple Hero
+        self._heroes = None  # entries are namedtuple Hero
         self._xml_list = list()
+        self._hero_version = 0
+        self._columns = None
+        # a replayed session uses the seed of its trace
+        self._dice = SessionDice(configs.get("session seed"))
+        self._recorder = None
+        if configs.get("session recording") == "on":
+            # only imported when it's used
+            from libs.backend.dsa_trace import SessionRecorder
+            self._recorder = SessionRecorder(
+                configs["session trace file"], self._dice.seed, self._rules,
+                self._hero_folder)
 
         self._get_all_xml()
 
         self._setup_output_file()
 
     def _get_all_xml(self):
-        """ checks current working directory for xml files, reads all their
-        relevant entries and stores them (using data types specified in
-        dsa_data.py) as separate heroes (namedtuple Hero) """
+        """ checks the hero folder for xml files. they are only parsed when
+        their hero is used, so the start doesn't wait for all heroes """
 
         # add all xml files to list
         for file in os.listdir(self._hero_folder):
             if file.endswith(".xml"):
                 self._xml_list.append(file)
 
-        # read all attr, skill, spell, fight_talent entries of hero file
-        for _, value in enumerate(self._xml_list):
-            name = value.replace(".xml", '')
-            hero_root = self._parse_xml(value)
-            attrs = self._read_attributes(hero_root)
-            skills = self._read_skills(hero_root)
-            spells = self._read_spells(hero_root)
-            fight_talents = self._read_fight_talents(hero_root)
-            advantages = self._read_advantages(hero_root)
-            special_skills = self._read_special_skills(hero_root)
-
-            # some entries are both skill and special skill, e.g.
-            # "Ritualkenntnis: Hexe", special skill does not need to be tested
-            # so it is removed
-            for skill in skills:
-                for index, special_skill in enumerate(special_skills):
-                    if skill.name == special_skill.name:
-                        special_skills.pop(index)
-
-            self._heroes.update({name: Hero(name,
-                                            hero_root,
-                                            attrs,
-                                            skills,
-                                            spells,
-                                            fight_talents,
-                                            advantages,
-                                            special_skills)})
+        self._heroes = HeroCache([i.replace(".xml", '') for i in
+                                  self._xml_list], self._read_hero)
+
+    def reload_heroes(self):
+        """ find the hero xml files again, heroes that were already parsed
+        are parsed again on their next use. the entry columns are rebuilt on
+        their next use """
+        self._xml_list = list()
+        self._get_all_xml()
+        self._hero_version += 1
+
+    def entry_columns(self):
+        """ column store of all entries of all heroes, e.g. to find all
+        skills >= 10 that use KL. building it parses every hero file, it is
+        kept until the heroes are reloaded
+        output: columns:libs.backend.dsa_columns.EntryColumns """
+        if self._columns is None or \
+                self._columns.version != self._hero_version:
+            # only imported when it's used, it imports numpy if available
+            from libs.backend.dsa_columns import EntryColumns
+            self._columns = EntryColumns(self._heroes, self._hero_version)
+        return self._columns
+
+    def group_test(self, test_input, mod, heroes=None, seed=None):
+        """ test one entry for every given hero, all dice are rolled in one
+        batch. raises ValueError if no entry or more than one entry matches
+        the test input
+        input: test_input:str, e.g. "sinnenschärfe (suchen)"
+               mod:int, test modifier, the same for every hero
+               heroes:iterable, hero names, None for all heroes
+               seed:int, makes the rolls repeatable, None draws it from the
+                    session's dice
+        output: results:list of libs.backend.dsa_group.GroupResult, ranked
+                by result """
+        # only imported when it's used
+        from libs.backend.dsa_group import matching_names, testable_rows, \
+            roll_group
+        columns = self.entry_columns()
+        names = matching_names(columns, test_input)
+        if not names:
+            raise ValueError(self._lang["no_hero_match"] + ": " + test_input)
+        if len(names) > 1 and names[0].lower() != test_input.lower():
+            raise ValueError(self._lang["entry_match"] +
+                             ", ".join(names[:10]))
+        position = self._dice.position
+        results = roll_group(columns,
+                             testable_rows(columns, names[0], heroes), mod,
+                             self._dice.draw_seed() if seed is None else seed,
+                             self._rules)
+        if self._recorder is not None:
+            self._recorder.record_group(test_input, mod, heroes, seed,
+                                        position, results)
+        return results
+
+    def group_rows(self, state, results):
+        """ create the output csv rows of a group test, GameState.counter
+        is increased for every row. the rows are written with write_rows(),
+        all at once
+        input: state:GameState, counter and desc are used
+               results:list, created by group_test()
+        output: rows:list, one row per tested hero """
+        rows = []
+        for result in results:
+            # GroupResult has name, category and value like a hero entry
+            hero_state = GameState(dice="auto", current_hero=result.hero,
+                                   counter=state.counter, attrs=result.attrs,
+                                   mod=result.mod, rolls=result.rolls,
+                                   result=result.result, desc=state.desc,
+                                   selection=result, rules=self._rules)
+            rows.append(self.make_row(hero_state))
+            state.counter += 1
+        return rows
+
+    def _read_hero(self, name):
+        """ reads all attr, skill, spell, fight_talent entries of a hero file
+        and stores them (using data types specified in dsa_data.py) as
+        namedtuple Hero
+        input: name:str, hero name, file name without ".xml"
+        output: Hero """
+        hero_root = self._parse_xml(name + ".xml")
+        attrs = self._read_attributes(hero_root)
+        skills = self._read_skills(hero_root)
+        spells = self._read_spells(hero_root)
+        fight_talents = self._read_fight_talents(hero_root)
+        advantages = self._read_advantages(hero_root)
+        special_skills = self._read_special_skills(hero_root)
+
+        # some entries are both skill and special skill, e.g.
+        # "Ritualkenntnis: Hexe", special skill does not need to be tested
+        # so it is removed
+        for skill in skills:
+            for index, special_skill in enumerate(special_skills):
+                if skill.name == special_skill.name:
+                    special_skills.pop(index)
+
+        return Hero(name, hero_root, attrs, skills, spells, fight_talents,
+                    advantages, special_skills)
 
     def _parse_xml(self, hero_file):
         """ use xml.etree.ElementTree to parse xml file.
         input: hero_file:str, name of xml file
         output: root:xml.etree.ElementTree.Element """
+        # only imported when the first hero is used
+        import xml.etree.ElementTree
+
         filepath = os.path.join(self._hero_folder, hero_file)
 
         tree = xml.etree.ElementTree.parse(filepath)
@@ -217,41 +479,185 @@ class GameLogic:
 
     def _setup_output_file(self):
         """ prepares first line of output csv file if it doesn't already exist
+        or opens the result database. raises ValueError if the output file
+        has another format than the config entry "output format"
         output: bool, True if first line had to be written """
 
-        columns = ["Hero file",
-                   "Test type",
-                   "Name of tested entry",
-                   "Misc dice sum input",
-                   "Value of tested entry",
-                   "Modifier",
-                   "Values of related attributes",
-                   "Rolls",
-                   "Result",
-                   "Description",
-                   "Timestamp",
-                   "Type of dice input"]
+        if os.path.isfile(self._result_csv) and \
+                os.path.getsize(self._result_csv) > 0:
+            # only imported when it's used, dsa_results imports this module
+            from libs.backend.dsa_results import detect_format
+            found_format = detect_format(self._result_csv)
+            # appending in another format would damage the file
+            if found_format != self._output_format:
+                raise ValueError(self._lang["format_mismatch"].format(
+                    self._result_csv, found_format, self._output_format))
+
+        if self._output_format == "sqlite":
+            # only imported when it's used
+            from libs.backend.dsa_sqlite import SqliteResultStore
+            self._store = SqliteResultStore(self._result_csv)
+            return False
+        if self._output_format == "binary":
+            from libs.backend.dsa_binlog import BinaryResultLog
+            self._store = BinaryResultLog(self._result_csv)
+            return False
+
+        # a crash while writing can leave half a row at the end of the file
+        self._repair_output_file()
+        # files from before the "Critical rules" column get it first
+        self._upgrade_output_file()
 
         # if file does not exist, add first row of column names
-        if not os.path.isfile(self._result_csv):
+        if not os.path.isfile(self._result_csv) or \
+                os.path.getsize(self._result_csv) == 0:
             with open(self._result_csv, "w", encoding="utf-8") as csv_file:
                 file_writer = csv.writer(csv_file, delimiter=',',
                                          quotechar='|',
                                          quoting=csv.QUOTE_MINIMAL)
-                file_writer.writerow(columns)
+                file_writer.writerow(COLUMNS)
             return True
         return False
 
-    def save_to_csv(self, state):
+    def _read_tail(self, block_size=4096, max_bytes=1 << 16):
+        """ read the end of the output csv file backwards in blocks until it
+        contains a few complete rows. the cost does not depend on the file
+        size
+        input: block_size:int, bytes per read
+               max_bytes:int, stop reading backwards after this many bytes
+        output: (data, start):tuple, data are the last bytes of the file,
+                start is the file position where data begins """
+        with open(self._result_csv, "rb") as csv_file:
+            start = csv_file.seek(0, os.SEEK_END)
+            data = b''
+            # 3 line breaks mean at least one complete row, even if the file
+            # ends with a torn row and blank lines
+            while start > 0 and data.count(b"\n") < 3 and \
+                    len(data) < max_bytes:
+                step = min(block_size, start)
+                start -= step
+                csv_file.seek(start)
+                data = csv_file.read(step) + data
+        return data, start
+
+    def _repair_output_file(self):
+        """ every row written to the output csv file ends with a line break.
+        if the file doesn't, the last row is torn (e.g. the program was
+        killed while writing) and is cut off
+        output: bool, True if the file had to be repaired """
+        if self._store is not None or not os.path.isfile(self._result_csv):
+            return False
+
+        data, start = self._read_tail()
+        if not data or data.endswith(b"\n"):
+            return False
+
+        cut = data.rfind(b"\n")
+        if cut == -1 and start > 0:
+            # torn row is longer than what was read, don't guess
+            return False
+        with open(self._result_csv, "r+b") as csv_file:
+            csv_file.truncate(start + cut + 1)
+        print(self._lang["torn_row"] + self._result_csv)
+        return True
+
+    def _upgrade_output_file(self):
+        """ an output csv file that was started before the "Critical rules"
+        column existed has one column less. its header gets the new column
+        and its rows get the default rule set, so every row has as many
+        columns as the header. the file is rewritten once, row by row
+        output: bool, True if the file was upgraded """
+        if not os.path.isfile(self._result_csv):
+            return False
+        with open(self._result_csv, newline='', encoding="utf-8") as \
+                csv_file:
+            header = next(csv.reader(csv_file, delimiter=',',
+                                     quotechar='|'), None)
+        if header != COLUMNS[:-1]:
+            return False
+
+        upgraded = self._result_csv + ".upgrade"
+        with open(self._result_csv, newline='', encoding="utf-8") as \
+                csv_file, open(upgraded, "w", encoding="utf-8") as new_file:
+            file_writer = csv.writer(new_file, delimiter=',', quotechar='|',
+                                     quoting=csv.QUOTE_MINIMAL)
+            for row in csv.reader(csv_file, delimiter=',', quotechar='|'):
+                if row == COLUMNS[:-1]:
+                    row = COLUMNS
+                elif len(row) == len(COLUMNS) - 1:
+                    # saved before rule sets existed
+                    row.append(DEFAULT_RULES)
+                file_writer.writerow(row)
+        os.replace(upgraded, self._result_csv)
+        print(self._lang["header_upgraded"] + self._result_csv)
+        return True
+
+    def restore_counter(self, state):
+        """ continue the roll numbers of the output file, GameState.counter is
+        set to the number after the last saved "Roll#N" description. only the
+        end of the file is read
+        input: state:GameState
+        output: state:GameState """
+
+        if self._store is not None:
+            last = self._store.last_roll_number()
+        else:
+            last = None
+            data, start = self._read_tail()
+            lines = data.split(b"\n")
+            if start > 0:
+                # first line is probably only the end of a row
+                lines = lines[1:]
+            for line in reversed(lines):
+                line = line.decode("utf-8", errors="replace").strip()
+                if not line:
+                    continue
+                row = next(csv.reader([line], delimiter=',', quotechar='|'))
+                last = roll_number(row[9] if len(row) > 9 else '')
+                if last is not None:
+                    break
+
+        if last is not None:
+            state.counter = last + 1
+        return state
+
+    def save_to_csv(self, state, writer=None):
         """ adds current test to csv file as new row and increments
-        GameState.counter
+        GameState.counter. if a ResultWriter is given, the row is handed to
+        its queue instead of being written on the calling thread. raises
+        ValueError if the output format can't store the row
         input: state:GameState
+               writer:ResultWriter, optional background writer
         output: state:GameState """
 
         if state.rolls == [] or state.rolls is None:
             # this should never happen but cancel save process just in case
             return state
 
+        row = self.make_row(state)
+        # checked here, a background writer would only report it later
+        self.check_row(row)
+
+        if writer is None:
+            self.write_rows([row])
+        else:
+            # raises queue.Full if the writer can't keep up, the counter is
+            # not increased in that case
+            writer.submit(row)
+        # a save the user has to repeat isn't traced
+        self.record_save(state.desc, state.counter)
+
+        # only saved rolls increase the roll count
+        state.counter += 1
+
+        return state
+
+    @staticmethod
+    def make_row(state):
+        """ create the csv row for the current test
+        input: state:GameState
+        output: save_values:list, one value per column of the output file """
+
         if state.selection.category == "misc":
             misc = str(state.selection.dice_count) + "D" + str(
                 state.selection.dice_eyes)
@@ -291,19 +697,47 @@ class GameLogic:
                        state.result,
                        desc,
                        timestamp,
-                       state.dice]
+                       state.dice,
+                       state.rules]
+
+        return save_values
+
+    def check_row(self, row):
+        """ the binary log stores numbers in fixed width fields, a row with
+        larger numbers can't be saved there
+        input: row:list, created by make_row()
+        output: raises ValueError if the output format can't store the row
+        """
+        if self._output_format == "binary":
+            # only imported when it's used
+            from libs.backend.dsa_binlog import check_row
+            check_row(row)
+
+    def record_save(self, desc, counter):
+        """ add a save to the session trace. save_to_csv() does this itself,
+        rows that are written with write_rows() (batch mode, group tests)
+        need it to be replayed
+        input: desc:str, description of the saved rows
+               counter:int, roll number of the first saved row """
+        if self._recorder is not None:
+            self._recorder.record("save", desc=desc, counter=counter)
+
+    def write_rows(self, rows):
+        """ append rows to the output csv file, the file is opened once for
+        all given rows. with output format "sqlite" or "binary" the rows are
+        written to that store instead
+        input: rows:list, list of rows created by make_row() """
+
+        if self._store is not None:
+            self._store.write_rows(rows)
+            return
 
         with open(self._result_csv, "a", encoding="utf-8") as csv_file:
             file_writer = csv.writer(csv_file,
                                      delimiter=',',
                                      quotechar='|',
                                      quoting=csv.QUOTE_MINIMAL)
-            file_writer.writerow(save_values)
-
-        # only saved rolls increase the roll count
-        state.counter += 1
-
-        return state
+            file_writer.writerows(rows)
 
     @staticmethod
     def _read_attributes(root):
@@ -442,8 +876,14 @@ class GameLogic:
                      "spell": self._test_3dice,
                      "misc": self._test_misc}
 
+        # saved with the result, so results of different rule sets can be
+        # told apart
+        state.rules = self._rules
+        position = self._dice.position
         state = test_dict[state.selection.category](state)
 
+        if self._recorder is not None:
+            self._recorder.record_test(state, position)
         return state
 
     def _test_1dice(self, state):
@@ -460,7 +900,8 @@ class GameLogic:
         if state.dice == "auto":
             state.rolls = self._roll_dice(1, 1, 20)
 
-        state.result = state.selection.value + state.mod - state.rolls[0]
+        state.result = result_1dice(state.selection.value + state.mod,
+                                    state.rolls[0], self._rules)
         return state
 
     def _test_3dice(self, state):
@@ -474,18 +915,7 @@ class GameLogic:
         if state.selection.value is None:
             return state
 
-        attr_values = []
-        attr_abbrs = []
-
-        hero = self._heroes[state.current_hero]
-
-        # from all available attributes get the 3 related to the entry being
-        # tested
-        for attr in hero.attrs:
-            for _, entry_attr in enumerate(state.selection.attrs):
-                if attr.abbr == entry_attr:
-                    attr_values.append(attr.value)
-                    attr_abbrs.append(attr.abbr)
+        attr_abbrs, attr_values = self._related_attrs(state)
 
         # Ritualkenntnis: Hexe has no values, can't be tested
         if not attr_abbrs:
@@ -515,6 +945,10 @@ class GameLogic:
             if attr_value < 0:
                 state.result += attr_value
 
+        # double 1s and double 20s, if the rule set has criticals
+        state.result = result_3dice(state.result, modded_value, state.rolls,
+                                    self._rules)
+
         # to print the result, for every tested attribute a namedtuple is
         # created which holds the abbreviation, the unmodified and modified
         # values and how much is remaining after the test
@@ -527,6 +961,52 @@ class GameLogic:
 
         return state
 
+    def _related_attrs(self, state):
+        """ the 3 attributes related to the selected skill/spell of the
+        current hero
+        input: state:GameState
+        output: (attr_abbrs, attr_values):tuple of lists, empty if the entry
+                has no related attributes """
+        attr_values = []
+        attr_abbrs = []
+
+        hero = self._heroes[state.current_hero]
+
+        # from all available attributes get the 3 related to the entry being
+        # tested
+        for attr in hero.attrs:
+            for _, entry_attr in enumerate(state.selection.attrs or []):
+                if attr.abbr == entry_attr:
+                    attr_values.append(attr.value)
+                    attr_abbrs.append(attr.abbr)
+        return attr_abbrs, attr_values
+
+    def extended_test(self, state, target, tries, samples=1000000,
+                      seed=None):
+        """ chance of an extended test (Sammelprobe) of the selected
+        skill/spell of the current hero and how many tries it needs. the
+        modifier of every try is GameState.mod
+        input: state:GameState
+               target:int, points that have to be reached
+               tries:int, try limit
+               samples:int, simulated extended tests if the exact
+                       computation is too big
+               seed:int, makes the simulation repeatable
+        output: result:libs.backend.dsa_extended.ExtendedResult, None if the
+                entry can't be tested """
+        if state.selection is None or \
+                state.selection.category not in ("skill", "spell") or \
+                state.selection.value is None:
+            return None
+        _, attr_values = self._related_attrs(state)
+        if len(attr_values) != 3:
+            return None
+        # only imported when it's used
+        from libs.backend.dsa_extended import extended_test
+        return extended_test(attr_values, state.selection.value,
+                             state.mod or 0, target, tries, samples, seed,
+                             rules=self._rules)
+
     def _test_misc(self, state):
         """ used for misc dice sum tests, calculate result based on dice count,
         dice type and modifier. results are stored in GameState
@@ -550,16 +1030,19 @@ class GameLogic:
         state.result += state.mod
         return state
 
-    @staticmethod
-    def _roll_dice(dice_count, min_value, max_value):
-        """ random number generator
+    def _roll_dice(self, dice_count, min_value, max_value):
+        """ random number generator, the dice of the session
         input: dice_count:int, how many numbers to generate
                min_value:int, lowest possible number
                max_value:int, highest possible number
         output: rolls:list, list of generated numbers """
-        rolls = [random.randint(min_value, max_value) for _ in
-                 range(dice_count)]
-        return rolls
+        return self._dice.roll(dice_count, min_value, max_value)
+
+    def dice_position(self):
+        """ how many random numbers the session drew so far, a replay has
+        to be at the same position as its trace
+        output: int """
+        return self._dice.position
 
     def autocomplete(self, state):
         """ creates a list of hero entries (attributes, skills, spells, fight
@@ -603,9 +1086,8 @@ class GameLogic:
         """ create a list of all available hero files to show to user in
         interface
         output: out_list:list, list of hero names"""
-        out_list = []
-        for key, _ in self._heroes.items():
-            out_list.append(key)
+        # the keys are enough, no hero file gets parsed
+        out_list = list(self._heroes)
         out_list.sort()
         return out_list
 
@@ -616,6 +1098,10 @@ class GameLogic:
         input: state:Gamestate
         output: state:Gamestate """
 
+        if self._recorder is not None:
+            self._recorder.record("search", hero=state.current_hero,
+                                  input=state.test_input)
+
         # check for misc dice input using regex
         # regex:
         # ^, $: match from start to end of string
@@ -0,0 +1,216 @@
+"""
+Group tests: one entry tested for many heroes at once. The entries are taken
+from the column store of GameLogic and all dice are rolled in one batch,
+following the rules of GameLogic._test_1dice and GameLogic._test_3dice
+"""
+import random  # Dice rolls if numpy is missing
+from collections import namedtuple
+
+from libs.backend.dsa_columns import CATEGORIES, ATTRIBUTES, NO_ATTR, \
+    NO_VALUE, np
+from libs.backend.dsa_game import SkillAttr
+from libs.backend.dsa_probability import chance_1dice, chance_3dice
+from libs.backend.dsa_rules import DEFAULT_RULES, result_1dice, result_3dice
+
+# one tested hero. name, category and value make it usable as
+# GameState.selection, attrs is a list of namedtuple SkillAttr for skill and
+# spell tests and empty otherwise
+GroupResult = namedtuple("GroupResult", ["hero",
+                                         "category",
+                                         "name",
+                                         "value",
+                                         "mod",
+                                         "attrs",
+                                         "rolls",
+                                         "result",
+                                         "chance"])
+
+# categories that are tested with 1 or 3 dice
+ONE_DICE = ("attr", "fight_talent", "advantage")
+THREE_DICE = ("skill", "spell")
+
+
+def matching_names(columns, test_input):
+    """ entry names of any hero that contain the test input, an entry whose
+    name is the test input comes first
+    input: columns:EntryColumns
+           test_input:str
+    output: names:list """
+    test_input = test_input.lower()
+    names = sorted(i for i in columns.names
+                   if i is not None and test_input in i.lower())
+    exact = [i for i in names if i.lower() == test_input]
+    return exact + [i for i in names if i not in exact]
+
+
+def testable_rows(columns, name, heroes=None):
+    """ rows of one entry that can be tested: the entry has a value and,
+    for skills and spells, 3 related attributes
+    input: columns:EntryColumns
+           name:str, entry name, None for every entry
+           heroes:iterable, hero names, None for all heroes
+    output: indexes:list """
+    indexes = columns.select(name=name)
+    hero_ids = columns.columns["hero_id"]
+    if heroes is not None:
+        wanted = {columns.heroes.index(i) for i in heroes
+                  if i in columns.heroes}
+        indexes = [i for i in indexes if hero_ids[i] in wanted]
+
+    out_list = []
+    for index in indexes:
+        category = CATEGORIES[columns.columns["category"][index]]
+        if columns.columns["value"][index] == NO_VALUE:
+            continue
+        if category in THREE_DICE:
+            if NO_ATTR in (columns.columns["attr_1"][index],
+                           columns.columns["attr_2"][index],
+                           columns.columns["attr_3"][index]):
+                # e.g. Ritualkenntnis: Hexe has no related attributes
+                continue
+        elif category not in ONE_DICE:
+            continue
+        out_list.append(int(index))
+    return out_list
+
+
+def roll_group(columns, indexes, mod, seed=None, rules=DEFAULT_RULES):
+    """ roll the tests of all given rows in one batch
+    input: columns:EntryColumns
+           indexes:list, created by testable_rows()
+           mod:int, test modifier, the same for every hero
+           seed:int, makes the rolls repeatable, None for fresh rolls
+           rules:str, critical rule set, one of dsa_rules.RULE_SETS
+    output: results:list of GroupResult, ranked by result, then by success
+            chance """
+    if not indexes:
+        return []
+    if np is not None:
+        rolls, results, attr_codes, attr_values = _roll_numpy(
+            columns, indexes, mod, seed, rules)
+    else:
+        rolls, results, attr_codes, attr_values = _roll_loop(
+            columns, indexes, mod, seed, rules)
+
+    hero_ids, categories, name_ids, values = (
+        _take(columns.columns[key], indexes)
+        for key in ("hero_id", "category", "name_id", "value"))
+    out_list = []
+    for row in range(len(indexes)):
+        hero = columns.heroes[hero_ids[row]]
+        category = CATEGORIES[categories[row]]
+        name = columns.names[name_ids[row]]
+        value = values[row]
+        modded_value = value + mod
+
+        if category in ONE_DICE:
+            out_list.append(GroupResult(hero, category, name, value, mod, [],
+                                        rolls[row][:1], results[row],
+                                        chance_1dice(value, mod, rules)))
+            continue
+
+        attrs = []
+        for number in range(3):
+            modified = attr_values[row][number] + min(modded_value, 0)
+            attrs.append(SkillAttr(ATTRIBUTES[attr_codes[row][number]],
+                                   attr_values[row][number], modified,
+                                   modified - rolls[row][number]))
+        out_list.append(GroupResult(hero, category, name, value, mod, attrs,
+                                    rolls[row], results[row],
+                                    chance_3dice(tuple(attr_values[row]),
+                                                 value, mod, rules)))
+
+    out_list.sort(key=lambda i: (-i.result, -i.chance, i.hero))
+    return out_list
+
+
+def _take(column, indexes):
+    """ values of one column at the given rows as python ints
+    input: column:numpy.ndarray or array.array
+           indexes:list
+    output: list """
+    if np is not None:
+        return column[np.asarray(indexes)].tolist()
+    return [column[i] for i in indexes]
+
+
+def _attr_columns(columns, indexes):
+    """ attribute codes and values of the rows, sorted by attribute like
+    GameLogic._test_3dice does
+    input: columns:EntryColumns
+           indexes:list
+    output: (codes, values):tuple, one list of 3 per row """
+    codes = []
+    values = []
+    for index in indexes:
+        pairs = sorted((columns.columns["attr_" + i][index],
+                        columns.columns["attr_value_" + i][index])
+                       for i in ("1", "2", "3"))
+        codes.append([i[0] for i in pairs])
+        values.append([i[1] for i in pairs])
+    return codes, values
+
+
+def _roll_numpy(columns, indexes, mod, seed, rules):
+    """ rolls and results of all rows as numpy arrays
+    input: see roll_group()
+    output: (rolls, results, attr_codes, attr_values):tuple, lists of python
+            ints """
+    rows = np.asarray(indexes)
+    codes = np.stack([columns.columns["attr_" + i][rows]
+                      for i in ("1", "2", "3")], axis=1)
+    values = np.stack([columns.columns["attr_value_" + i][rows]
+                       for i in ("1", "2", "3")], axis=1).astype(np.int64)
+    # same order of attributes as GameLogic._test_3dice
+    order = np.argsort(codes, axis=1, kind="stable")
+    codes = np.take_along_axis(codes, order, axis=1)
+    values = np.take_along_axis(values, order, axis=1)
+
+    modded_value = columns.columns["value"][rows].astype(np.int64) + mod
+    rolls = np.random.default_rng(seed).integers(1, 21, size=(len(rows), 3))
+
+    # if the modifier lowers the value below zero, the attributes are lowered
+    remaining = values + np.minimum(modded_value, 0)[:, None] - rolls
+    three_dice = np.maximum(modded_value, 0) + \
+        np.minimum(remaining, 0).sum(axis=1)
+    one_dice = modded_value - rolls[:, 0]
+    if rules == "dsa4.1":
+        # same as dsa_rules.result_1dice and dsa_rules.result_3dice
+        one_dice = np.where(rolls[:, 0] == 1, np.maximum(one_dice, 0),
+                            one_dice)
+        one_dice = np.where(rolls[:, 0] == 20, np.minimum(one_dice, -1),
+                            one_dice)
+        three_dice = np.where((rolls == 20).sum(axis=1) >= 2,
+                              np.minimum(three_dice, -1), three_dice)
+        three_dice = np.where((rolls == 1).sum(axis=1) >= 2,
+                              np.maximum(modded_value, 0), three_dice)
+    is_three = np.isin(columns.columns["category"][rows],
+                       [CATEGORIES.index(i) for i in THREE_DICE])
+    results = np.where(is_three, three_dice, one_dice)
+    return rolls.tolist(), results.tolist(), codes.tolist(), values.tolist()
+
+
+def _roll_loop(columns, indexes, mod, seed, rules):
+    """ rolls and results of all rows without numpy
+    input: see roll_group()
+    output: (rolls, results, attr_codes, attr_values):tuple, lists of python
+            ints """
+    generator = random if seed is None else random.Random(seed)
+    codes, values = _attr_columns(columns, indexes)
+    rolls = []
+    results = []
+    for row, index in enumerate(indexes):
+        modded_value = columns.columns["value"][index] + mod
+        roll = [generator.randint(1, 20) for _ in range(3)]
+        rolls.append(roll)
+        if CATEGORIES[columns.columns["category"][index]] in ONE_DICE:
+            results.append(result_1dice(modded_value, roll[0], rules))
+            continue
+        result = max(modded_value, 0)
+        for number in range(3):
+            remaining = values[row][number] + min(modded_value, 0) - \
+                roll[number]
+            result += min(remaining, 0)
+        results.append(result_3dice(result, modded_value, roll, rules))
+    return rolls, results, codes, values
+
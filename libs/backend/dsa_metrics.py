@@ -0,0 +1,293 @@
+"""
+Optional latency instrumentation: per call histograms with a fixed number of
+buckets, a text dump and a metrics file in Prometheus text format
+"""
+import contextlib  # To time code blocks
+import functools  # To keep names and docstrings of wrapped methods
+import os  # To replace the metrics file atomically
+import threading  # For the lock and the periodic writer
+import time  # To measure durations
+
+# every power of two is split into this many buckets, so a recorded duration
+# is off by at most 1/SUB_BUCKETS
+SUB_BUCKETS = 16
+SUB_BITS = SUB_BUCKETS.bit_length() - 1
+
+# the histograms of the dump show these quantiles
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+# public GameLogic methods that are timed when the instrumentation is on
+GAME_METHODS = ("test", "autocomplete", "match_test_input", "save_to_csv",
+                "write_rows", "get_hero_list", "restore_counter",
+                "match_manual_dice")
+
+
+def _bucket_index(nanoseconds):
+    """ index of the bucket a duration falls into, the buckets grow
+    exponentially and every power of two has SUB_BUCKETS linear buckets
+    input: nanoseconds:int
+    output: int """
+    if nanoseconds < SUB_BUCKETS:
+        return nanoseconds
+    exponent = nanoseconds.bit_length() - SUB_BITS - 1
+    return ((exponent + 1) << SUB_BITS) + (nanoseconds >> exponent) - \
+        SUB_BUCKETS
+
+
+def _bucket_upper(index):
+    """ largest duration that falls into a bucket
+    input: index:int
+    output: int, nanoseconds """
+    if index < SUB_BUCKETS:
+        return index
+    exponent = (index >> SUB_BITS) - 1
+    return ((SUB_BUCKETS + (index & (SUB_BUCKETS - 1)) + 1) << exponent) - 1
+
+
+class LatencyHistogram:
+    """
+    Counts durations in exponentially growing buckets. Memory only depends on
+    the range of the durations, not on how many are recorded
+
+    ...
+
+    Attributes
+    ----------
+    count: int
+        number of recorded durations
+    total: int
+        sum of all durations in nanoseconds
+    max: int
+        longest duration in nanoseconds
+    buckets: dict
+        bucket index -> count, only buckets that were hit exist
+
+    Methods
+    -------
+    record(nanoseconds):
+        Count one duration.
+    quantile(fraction):
+        Upper bound of the bucket that holds the given quantile.
+    cumulative():
+        Upper bounds and cumulative counts of all used buckets.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.max = 0
+        self.buckets = {}
+
+    def record(self, nanoseconds):
+        """ count one duration
+        input: nanoseconds:int """
+        index = _bucket_index(nanoseconds)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += nanoseconds
+        if nanoseconds > self.max:
+            self.max = nanoseconds
+
+    def quantile(self, fraction):
+        """ upper bound of the bucket that holds the given quantile
+        input: fraction:float, e.g. 0.99
+        output: int, nanoseconds """
+        if not self.count:
+            return 0
+        rank = fraction * self.count
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(_bucket_upper(index), self.max)
+        return self.max
+
+    def cumulative(self):
+        """ upper bounds and cumulative counts of all used buckets, as a
+        Prometheus histogram needs them
+        output: list of (nanoseconds, count) tuples """
+        out_list = []
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            out_list.append((_bucket_upper(index), seen))
+        return out_list
+
+
+class Metrics:
+    """
+    Collection of named latency histograms. Nothing is measured unless
+    methods are wrapped with instrument(), so a disabled instrumentation
+    costs nothing
+
+    ...
+
+    Attributes
+    ----------
+    _histograms: dict
+        name -> LatencyHistogram
+    _lock: threading.Lock
+        the GUI records from the tkinter thread and the background writer
+    _stop: threading.Event
+        ends the periodic writer
+    _exporter: threading.Thread
+        periodic writer of the metrics file, None if it isn't running
+
+    Methods
+    -------
+    record(name, nanoseconds):
+        Count one duration in the histogram of a name.
+    timer(name):
+        Context manager that records the duration of a code block.
+    wrap(name, function):
+        Return a function that records the duration of every call.
+    instrument(obj, method_names, prefix):
+        Replace methods of an object by timed versions.
+    dump():
+        Text table of all histograms.
+    prometheus_text():
+        All histograms in Prometheus text format.
+    write_file(path):
+        Atomically write the Prometheus text to a file.
+    start_exporter(path, interval):
+        Write the metrics file every interval seconds on a daemon thread.
+    stop_exporter():
+        End the periodic writer.
+    """
+
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._exporter = None
+
+    def record(self, name, nanoseconds):
+        """ count one duration in the histogram of a name
+        input: name:str
+               nanoseconds:int """
+        with self._lock:
+            try:
+                histogram = self._histograms[name]
+            except KeyError:
+                histogram = self._histograms[name] = LatencyHistogram()
+            histogram.record(nanoseconds)
+
+    @contextlib.contextmanager
+    def timer(self, name):
+        """ record the duration of a code block
+        input: name:str """
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter_ns() - start)
+
+    def wrap(self, name, function):
+        """ return a function that records the duration of every call, also
+        of calls that raise
+        input: name:str
+               function:callable
+        output: callable """
+        record = self.record
+        clock = time.perf_counter_ns
+
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                record(name, clock() - start)
+        return timed
+
+    def instrument(self, obj, method_names, prefix):
+        """ replace methods of an object by timed versions, only this object
+        is changed, not its class
+        input: obj:object
+               method_names:iterable of str
+               prefix:str, put in front of the method names, e.g. "GameLogic"
+        output: obj """
+        for method_name in method_names:
+            setattr(obj, method_name,
+                    self.wrap(prefix + "." + method_name,
+                              getattr(obj, method_name)))
+        return obj
+
+    def _snapshot(self):
+        """ copy of all histograms, so they can be formatted without holding
+        the lock
+        output: list of (name, LatencyHistogram) tuples """
+        with self._lock:
+            out_list = []
+            for name, histogram in sorted(self._histograms.items()):
+                copy = LatencyHistogram()
+                copy.count = histogram.count
+                copy.total = histogram.total
+                copy.max = histogram.max
+                copy.buckets = dict(histogram.buckets)
+                out_list.append((name, copy))
+        return out_list
+
+    def dump(self):
+        """ text table of all histograms, durations in microseconds
+        output: str """
+        lines = ["{0:35s} {1:>8s} {2:>10s} {3}".format(
+            "call", "count", "mean us",
+            " ".join("{0:>10s}".format("p" + format(100 * i, "g"))
+                     for i in QUANTILES) + " {0:>10s}".format("max us"))]
+        for name, histogram in self._snapshot():
+            lines.append("{0:35s} {1:8d} {2:10.1f} {3} {4:10.1f}".format(
+                name, histogram.count,
+                histogram.total / histogram.count / 1000,
+                " ".join("{0:10.1f}".format(histogram.quantile(i) / 1000)
+                         for i in QUANTILES),
+                histogram.max / 1000))
+        return "\n".join(lines)
+
+    def prometheus_text(self):
+        """ all histograms as one Prometheus histogram with a call label
+        output: str """
+        metric = "dsatester_call_duration_seconds"
+        lines = ["# HELP {0} Duration of instrumented calls.".format(metric),
+                 "# TYPE {0} histogram".format(metric)]
+        for name, histogram in self._snapshot():
+            label = 'call="{0}"'.format(name)
+            for upper, seen in histogram.cumulative():
+                lines.append('{0}_bucket{{{1},le="{2:.9g}"}} {3}'.format(
+                    metric, label, upper / 1e9, seen))
+            lines.append('{0}_bucket{{{1},le="+Inf"}} {2}'.format(
+                metric, label, histogram.count))
+            lines.append("{0}_sum{{{1}}} {2:.9g}".format(
+                metric, label, histogram.total / 1e9))
+            lines.append("{0}_count{{{1}}} {2}".format(
+                metric, label, histogram.count))
+        return "\n".join(lines) + "\n"
+
+    def write_file(self, path):
+        """ atomically write the Prometheus text to a file, so a scraper never
+        reads half a file
+        input: path:str """
+        temp_path = path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as metrics_file:
+            metrics_file.write(self.prometheus_text())
+        os.replace(temp_path, path)
+
+    def start_exporter(self, path, interval):
+        """ write the metrics file every interval seconds on a daemon thread
+        input: path:str
+               interval:float, seconds """
+        def run():
+            while not self._stop.wait(interval):
+                self.write_file(path)
+
+        self._stop.clear()
+        self._exporter = threading.Thread(target=run, name="metrics",
+                                          daemon=True)
+        self._exporter.start()
+
+    def stop_exporter(self):
+        """ end the periodic writer """
+        if self._exporter is not None:
+            self._stop.set()
+            self._exporter.join()
+            self._exporter = None
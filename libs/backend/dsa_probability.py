@@ -0,0 +1,141 @@
+"""
+Exact probabilities of DSA 4.1 tests, following the rules of
+GameLogic._test_1dice and GameLogic._test_3dice and the critical rule sets
+of dsa_rules
+"""
+import functools  # To cache distributions
+import itertools  # To find the roll combinations critical rules change
+
+from libs.backend.dsa_rules import DEFAULT_RULES, result_1dice, \
+    critical_3dice, critical_result
+
+# every face of a 20 sided die is equally likely
+D20 = range(1, 21)
+
+
+@functools.lru_cache(maxsize=4096)
+def distribution_1dice(value, mod, rules=DEFAULT_RULES):
+    """ all possible results of a 1d20 test (attribute, fight talent,
+    advantage) and how many of the 20 rolls lead to them
+    input: value:int, value of the tested entry
+           mod:int, test modifier
+           rules:str, critical rule set, one of dsa_rules.RULE_SETS
+    output: counts:dict, result -> number of rolls, sums up to 20 """
+    counts = {}
+    for roll in D20:
+        result = result_1dice(value + mod, roll, rules)
+        counts[result] = counts.get(result, 0) + 1
+    return counts
+
+
+@functools.lru_cache(maxsize=65536)
+def distribution_3dice(attr_values, value, mod, rules=DEFAULT_RULES):
+    """ all possible results of a 3d20 test (skill, spell) and how many of
+    the 8000 roll combinations lead to them. without critical rules every die
+    only lowers the result by how far it exceeds its attribute, so the three
+    dice are combined by convolution instead of looking at every combination.
+    critical rules depend on all three dice, they are applied afterwards to
+    the few combinations they can change
+    input: attr_values:tuple, the 3 unmodified attribute values
+           value:int, value of the tested entry
+           mod:int, test modifier
+           rules:str, critical rule set, one of dsa_rules.RULE_SETS
+    output: counts:dict, result -> number of combinations, sums up to 8000 """
+    modded_value = value + mod
+    if modded_value < 0:
+        # the modifier lowers the attributes instead of the value
+        attr_values = tuple(i + modded_value for i in attr_values)
+
+    counts = {modded_value if modded_value > 0 else 0: 1}
+    for attr_value in attr_values:
+        # how much this die lowers the result, for every face
+        deficits = {}
+        for roll in D20:
+            deficit = min(0, attr_value - roll)
+            deficits[deficit] = deficits.get(deficit, 0) + 1
+        combined = {}
+        for result, count in counts.items():
+            for deficit, deficit_count in deficits.items():
+                combined[result + deficit] = combined.get(
+                    result + deficit, 0) + count * deficit_count
+        counts = combined
+
+    if rules != DEFAULT_RULES:
+        _apply_criticals(counts, attr_values, modded_value, rules)
+    return counts
+
+
+@functools.lru_cache(maxsize=None)
+def _critical_rolls(rules):
+    """ roll combinations a critical rule set changes. only combinations
+    with at least two 1s or 20s are looked at
+    input: rules:str, critical rule set
+    output: tuple of (rolls, critical) pairs, critical is created by
+            dsa_rules.critical_3dice() and never 0 """
+    out_list = []
+    for rolls in itertools.product(D20, repeat=3):
+        if sum(1 for i in rolls if i in (1, 20)) < 2:
+            continue
+        critical = critical_3dice(rolls, rules)
+        if critical:
+            out_list.append((rolls, critical))
+    return tuple(out_list)
+
+
+def _apply_criticals(counts, attr_values, modded_value, rules):
+    """ move the combinations whose result is changed by the critical rules
+    from their normal result to their critical result
+    input: counts:dict, results without critical rules, changed in place
+           attr_values:tuple, the 3 attribute values, already lowered by a
+                              negative modded value
+           modded_value:int, value of the tested entry plus modifier
+           rules:str, critical rule set """
+    start = modded_value if modded_value > 0 else 0
+    first, second, third = attr_values
+    for (roll_1, roll_2, roll_3), critical in _critical_rolls(rules):
+        result = start + min(0, first - roll_1) + min(0, second - roll_2) + \
+            min(0, third - roll_3)
+        changed = critical_result(critical, result, modded_value)
+        if changed == result:
+            continue
+        counts[result] -= 1
+        if not counts[result]:
+            del counts[result]
+        counts[changed] = counts.get(changed, 0) + 1
+
+
+def success_chance(counts):
+    """ chance of a result >= 0
+    input: counts:dict, created by distribution_1dice/distribution_3dice
+    output: float """
+    total = sum(counts.values())
+    return sum(count for result, count in counts.items()
+               if result >= 0) / total
+
+
+def mean_result(counts):
+    """ expected result
+    input: counts:dict, created by distribution_1dice/distribution_3dice
+    output: float """
+    total = sum(counts.values())
+    return sum(result * count for result, count in counts.items()) / total
+
+
+def chance_1dice(value, mod, rules=DEFAULT_RULES):
+    """ chance to pass a 1d20 test
+    input: value:int
+           mod:int
+           rules:str, critical rule set
+    output: float """
+    return success_chance(distribution_1dice(value, mod, rules))
+
+
+def chance_3dice(attr_values, value, mod, rules=DEFAULT_RULES):
+    """ chance to pass a 3d20 test
+    input: attr_values:tuple, the 3 unmodified attribute values
+           value:int
+           mod:int
+           rules:str, critical rule set
+    output: float """
+    return success_chance(distribution_3dice(tuple(attr_values), value, mod,
+                                             rules))
@@ -0,0 +1,110 @@
+"""
+Read saved test results from any output format as a stream of rows
+"""
+import csv  # To read output csv files
+import re  # To read the related attributes column
+
+from libs.backend.dsa_game import COLUMNS
+from libs.backend.dsa_rules import DEFAULT_RULES
+
+# first bytes of the file formats, used to tell them apart
+SQLITE_MAGIC = b"SQLite format 3\x00"
+BINARY_MAGIC = b"DSALOG01"
+
+# regex: "KL(14->12)" -> 'KL', '14'
+# (\w+): match the attribute abbreviation
+# \((-?\d+): match the opening parenthesis and the unmodified value
+ATTR_PATTERN = re.compile(r"(\w+)\((-?\d+)")
+
+# rows saved before the "Critical rules" column existed are one column
+# shorter, their tests used the default rule set
+LEGACY_COLUMN_COUNT = len(COLUMNS) - 1
+
+# categories that are tested against a 20 sided die
+D20_CATEGORIES = ("attr", "skill", "spell", "fight_talent", "advantage")
+
+
+def detect_format(path):
+    """ look at the first bytes of a result file to find its output format
+    input: path:str
+    output: str, "csv", "sqlite" or "binary" """
+    with open(path, "rb") as result_file:
+        start = result_file.read(len(SQLITE_MAGIC))
+    if start.startswith(SQLITE_MAGIC):
+        return "sqlite"
+    if start.startswith(BINARY_MAGIC):
+        return "binary"
+    return "csv"
+
+
+def read_csv_rows(csv_file):
+    """ lazily yield the rows of an open output csv file, the header, blank
+    lines and incomplete rows are skipped. older rows get the default rule
+    set
+    input: csv_file:file object, opened in text mode with newline=''
+    output: row:list, in the output csv column order """
+    for row in csv.reader(csv_file, delimiter=',', quotechar='|'):
+        if len(row) < LEGACY_COLUMN_COUNT or row[0] == COLUMNS[0]:
+            continue
+        if len(row) == LEGACY_COLUMN_COUNT:
+            row.append(DEFAULT_RULES)
+        yield row
+
+
+def as_text(rows):
+    """ the SQLite database and the binary log give numbers as ints, a csv
+    file gives every cell as str
+    input: rows:iterable of rows in the output csv column order
+    output: row:list, every cell as str like in a csv file """
+    for row in rows:
+        yield [cell if isinstance(cell, str) else str(cell) for cell in row]
+
+
+def read_rows(path):
+    """ lazily yield all saved tests of a result file, whatever its output
+    format is. only one row is kept in memory at a time. the cells are
+    strings for every format
+    input: path:str, output csv file, SQLite database or binary log
+    output: row:list, in the output csv column order """
+    output_format = detect_format(path)
+    if output_format == "sqlite":
+        # only imported when it's used
+        from libs.backend.dsa_sqlite import SqliteResultStore
+        store = SqliteResultStore(path, readonly=True)
+        try:
+            yield from as_text(store.read_rows())
+        finally:
+            store.close()
+    elif output_format == "binary":
+        from libs.backend.dsa_binlog import BinaryResultLog
+        log = BinaryResultLog(path, readonly=True)
+        yield from as_text(log.read_rows())
+    else:
+        with open(path, "r", encoding="utf-8", newline='') as csv_file:
+            yield from read_csv_rows(csv_file)
+
+
+def parse_rolls(rolls):
+    """ the rolls column holds the dice values separated by semicolons
+    input: rolls:str, e.g. "3; 6; 13"
+    output: list of ints """
+    return [int(i) for i in rolls.split(";") if i.strip()]
+
+
+def dice_eyes(row):
+    """ what kind of die produced the rolls of a row
+    input: row:list, in the output csv column order
+    output: int, e.g. 20, None if the category rolls no dice """
+    if row[1] in D20_CATEGORIES:
+        return 20
+    if row[1] == "misc" and row[3]:
+        return int(row[3].upper().split("D")[1])
+    return None
+
+
+def parse_attrs(attrs):
+    """ the related attributes column holds abbreviation and unmodified
+    value of the 3 attributes of a skill or spell test
+    input: attrs:str, e.g. "KL(14); IN(13->11); CH(11)"
+    output: list of (abbr, value) tuples, empty if the column is empty """
+    return [(abbr, int(value)) for abbr, value in ATTR_PATTERN.findall(attrs)]
@@ -0,0 +1,68 @@
+"""
+Rule sets for critical rolls. Every saved test records the rule set its
+result was computed with, rows saved before rule sets existed used "none"
+
+    none: rolls of 1 and 20 are normal rolls
+    dsa4.1: 1d20 tests (attribute, fight talent, advantage) always succeed
+            with a 1 and always fail with a 20. 3d20 tests (skill, spell)
+            always succeed with two or three 1s, keeping all points of the
+            (modified) value, and always fail with two or three 20s
+"""
+
+RULE_SETS = ("none", "dsa4.1")
+
+# rule set of rows that were saved without one
+DEFAULT_RULES = "none"
+
+
+def result_1dice(modded_value, roll, rules):
+    """ result of a 1d20 test
+    input: modded_value:int, value of the entry plus modifier
+           roll:int
+           rules:str, one of RULE_SETS
+    output: result:int, success if >= 0 """
+    result = modded_value - roll
+    if rules == "dsa4.1":
+        if roll == 1:
+            return max(result, 0)
+        if roll == 20:
+            return min(result, -1)
+    return result
+
+
+def critical_3dice(rolls, rules):
+    """ if the rolls of a 3d20 test are a critical success or failure
+    input: rolls:list, the 3 dice values
+           rules:str, one of RULE_SETS
+    output: int, 1 for a critical success, -1 for a critical failure, 0
+            otherwise """
+    if rules == "dsa4.1":
+        if sum(1 for i in rolls if i == 1) >= 2:
+            return 1
+        if sum(1 for i in rolls if i == 20) >= 2:
+            return -1
+    return 0
+
+
+def result_3dice(result, modded_value, rolls, rules):
+    """ apply the critical rules to the result of a 3d20 test
+    input: result:int, result without critical rules
+           modded_value:int, value of the entry plus modifier
+           rolls:list, the 3 dice values
+           rules:str, one of RULE_SETS
+    output: result:int """
+    return critical_result(critical_3dice(rolls, rules), result,
+                           modded_value)
+
+
+def critical_result(critical, result, modded_value):
+    """ result of a 3d20 test after a critical success or failure
+    input: critical:int, created by critical_3dice()
+           result:int, result without critical rules
+           modded_value:int, value of the entry plus modifier
+    output: result:int """
+    if critical > 0:
+        return max(modded_value, 0)
+    if critical < 0:
+        return min(result, -1)
+    return result
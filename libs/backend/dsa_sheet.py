@@ -0,0 +1,96 @@
+"""
+Probability sheets: the exact success chance of every testable entry of
+every hero at a range of modifiers. The chance of a test only depends on the
+modified value and, for skills and spells, the sorted attribute values, so
+every distinct test of the whole party is computed once and the table of
+chances is shared by all heroes. Distinct tests are split into chunks that
+can be computed on worker processes
+"""
+import concurrent.futures  # To compute chunks of chances on worker processes
+from collections import namedtuple
+
+from libs.backend.dsa_columns import CATEGORIES
+from libs.backend.dsa_group import THREE_DICE, testable_rows
+from libs.backend.dsa_probability import chance_1dice, chance_3dice
+from libs.backend.dsa_rules import DEFAULT_RULES
+
+# modifiers of a sheet, from -10 to +5
+MODIFIERS = tuple(range(-10, 6))
+
+# one entry of a hero. attrs is a tuple of (abbr, value) pairs for skills
+# and spells and empty otherwise, chances has one chance per modifier
+SheetRow = namedtuple("SheetRow", ["hero",
+                                   "category",
+                                   "name",
+                                   "value",
+                                   "attrs",
+                                   "chances"])
+
+
+def chance_chunk(job):
+    """ chances of a chunk of test keys, runs on a worker process. the
+    distribution caches of dsa_probability are kept for every chunk the
+    process computes
+    input: job:tuple, (keys, rules), keys is a list of (attr_values,
+           modded_value) pairs, attr_values is None for 1d20 tests
+    output: chances:list, one float per key """
+    keys, rules = job
+    return [chance_1dice(modded_value, 0, rules) if attr_values is None
+            else chance_3dice(attr_values, modded_value, 0, rules)
+            for attr_values, modded_value in keys]
+
+
+def compute_chances(keys, rules=DEFAULT_RULES, processes=1, chunks=None):
+    """ chances of many test keys, every key is computed once
+    input: keys:iterable of (attr_values, modded_value) pairs, see
+                chance_chunk()
+           rules:str, critical rule set, one of dsa_rules.RULE_SETS
+           processes:int, worker processes, 1 computes on this process
+           chunks:int, number of chunks, 4 per process if None
+    output: chances:dict, key -> float """
+    keys = sorted(set(keys), key=lambda i: (i[0] or (), i[1]))
+    if processes == 1:
+        return dict(zip(keys, chance_chunk((keys, rules))))
+
+    chunks = chunks or processes * 4
+    size = max(1, -(-len(keys) // chunks))
+    # neighbouring keys share attribute values and cached distributions
+    jobs = [(keys[i:i + size], rules) for i in range(0, len(keys), size)]
+    chances = {}
+    with concurrent.futures.ProcessPoolExecutor(processes) as pool:
+        for (chunk, _), chunk_chances in zip(jobs,
+                                             pool.map(chance_chunk, jobs)):
+            chances.update(zip(chunk, chunk_chances))
+    return chances
+
+
+def build_sheet(columns, mods=MODIFIERS, rules=DEFAULT_RULES, processes=1,
+                heroes=None):
+    """ success chances of every testable entry of the heroes
+    input: columns:libs.backend.dsa_columns.EntryColumns
+           mods:tuple, modifiers of the sheet
+           rules:str, critical rule set, one of dsa_rules.RULE_SETS
+           processes:int, worker processes
+           heroes:iterable, hero names, None for all heroes
+    output: rows:list of SheetRow, sorted by hero, category and name """
+    entries = []
+    keys = set()
+    for hero, category, name, value, attrs in columns.rows(
+            testable_rows(columns, None, heroes)):
+        # the three dice are rolled the same way, so only the sorted
+        # attribute values and the modified value matter
+        attr_values = tuple(sorted(i[1] for i in attrs)) \
+            if category in THREE_DICE else None
+        entries.append((hero, category, name, value,
+                        attrs if attr_values else (), attr_values))
+        keys.update((attr_values, value + mod) for mod in mods)
+
+    chances = compute_chances(keys, rules, processes)
+    out_list = []
+    for hero, category, name, value, attrs, attr_values in entries:
+        out_list.append(SheetRow(
+            hero, category, name, value, attrs,
+            tuple(chances[attr_values, value + mod] for mod in mods)))
+    out_list.sort(key=lambda i: (i.hero, CATEGORIES.index(i.category),
+                                 i.name))
+    return out_list
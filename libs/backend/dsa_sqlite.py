@@ -0,0 +1,350 @@
+"""
+SQLite storage for test results, an alternative to the output csv file
+"""
+import sqlite3  # Storage backend from the standard library
+import threading  # The writer thread and the interface share one connection
+import urllib.parse  # Read only databases are opened by URI
+
+from libs.backend.dsa_game import roll_number
+from libs.backend.dsa_results import read_csv_rows
+from libs.backend.dsa_rules import DEFAULT_RULES
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS heroes (
+    id INTEGER PRIMARY KEY,
+    file TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    category TEXT NOT NULL,
+    name TEXT NOT NULL,
+    UNIQUE (category, name)
+);
+CREATE TABLE IF NOT EXISTS tests (
+    id INTEGER PRIMARY KEY,
+    hero_id INTEGER NOT NULL REFERENCES heroes (id),
+    entry_id INTEGER NOT NULL REFERENCES entries (id),
+    misc TEXT,
+    value INTEGER,
+    modifier INTEGER,
+    attrs TEXT,
+    result INTEGER,
+    description TEXT,
+    timestamp TEXT,
+    dice TEXT,
+    rules TEXT
+);
+CREATE TABLE IF NOT EXISTS rolls (
+    test_id INTEGER NOT NULL REFERENCES tests (id),
+    position INTEGER NOT NULL,
+    value INTEGER NOT NULL,
+    PRIMARY KEY (test_id, position)
+) WITHOUT ROWID;
+-- hero and entry indexes also cover the result so statistics queries
+-- never touch the table itself
+CREATE INDEX IF NOT EXISTS tests_hero ON tests (hero_id, entry_id, result);
+CREATE INDEX IF NOT EXISTS tests_entry ON tests (entry_id, hero_id, result);
+CREATE INDEX IF NOT EXISTS tests_timestamp ON tests (timestamp);
+CREATE INDEX IF NOT EXISTS entries_category ON entries (category);
+"""
+
+
+def _to_int(value):
+    """ csv cells are strings, empty cells are stored as NULL
+    input: value:str/int/None
+    output: int or None """
+    if value is None or value == '':
+        return None
+    return int(value)
+
+
+class SqliteResultStore:
+    """
+    Stores test results in a normalized SQLite database. Hero files and
+    entry names are stored once, every saved test references them and its
+    rolls are kept in their own table.
+
+    ...
+
+    Attributes
+    ----------
+    _path: str
+        file path of the database
+    _connection: sqlite3.Connection
+        connection to the database, shared by all threads
+    _lock: threading.Lock
+        serializes access to the connection
+    _hero_ids: dict
+        cache of hero file name -> heroes.id
+    _entry_ids: dict
+        cache of (category, name) -> entries.id
+    _readonly: bool
+        the database is only read, it is never changed
+    _rules_column: str
+        what read_rows() selects as the rules of a test, NULL for a read
+        only database from before the rules column
+
+    Methods
+    -------
+    write_rows(rows, skip_stored=False):
+        Insert rows in the output csv column order inside one transaction.
+    read_rows(chunk_size=10000):
+        Yield all stored tests as rows in the output csv column order.
+    import_csv(csv_path, batch_size=10000):
+        Insert the rows of an existing output csv file that aren't stored
+        yet.
+    hero_stats(hero_file):
+        Count, successes and mean result of every tested entry of one hero.
+    entry_stats(name):
+        Count, successes and mean result of one entry for every hero.
+    last_roll_number():
+        Roll number of the last saved test.
+    close():
+        Close the database connection.
+    _add_rules_column():
+        Add the rules column to databases created before it existed.
+    _columns(table):
+        Column names of a table.
+    _insert(rows, skip_stored):
+        Insert rows inside one transaction.
+    _hero_id(file):
+        Look up or create the id of a hero file.
+    _entry_id(category, name):
+        Look up or create the id of an entry.
+    """
+
+    def __init__(self, path, readonly=False):
+        """
+        Parameters:
+            path (str): file path of the database, created if it doesn't
+            exist
+
+            readonly (bool): only read the database. it has to exist and
+                neither its schema nor its journal mode are changed
+        """
+        self._path = path
+        self._readonly = readonly
+        self._rules_column = "t.rules"
+        # the background writer inserts on its own thread, access is
+        # serialized with self._lock
+        if readonly:
+            self._connection = sqlite3.connect(
+                "file:" + urllib.parse.quote(path) + "?mode=ro", uri=True,
+                check_same_thread=False)
+            if "rules" not in self._columns("tests"):
+                self._rules_column = "NULL"
+        else:
+            self._connection = sqlite3.connect(path, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.executescript(SCHEMA)
+            self._add_rules_column()
+        self._lock = threading.Lock()
+        self._hero_ids = {}
+        self._entry_ids = {}
+
+    def write_rows(self, rows, skip_stored=False):
+        """ insert rows inside one transaction, can be used as sink of
+        libs.backend.dsa_writer.ResultWriter
+        input: rows:list, rows in the output csv column order
+               skip_stored:bool, skip rows with the hero file, description
+                           and timestamp of a stored test
+        output: count:int, number of inserted rows """
+        if self._readonly:
+            raise ValueError(self._path + " is opened read only")
+        with self._lock:
+            try:
+                return self._insert(rows, skip_stored)
+            except Exception:
+                # ids created in the failed transaction are gone
+                self._hero_ids.clear()
+                self._entry_ids.clear()
+                raise
+
+    def _add_rules_column(self):
+        """ databases created before the critical rule sets don't have the
+        rules column, their tests read as the default rule set """
+        if "rules" not in self._columns("tests"):
+            with self._connection:
+                self._connection.execute(
+                    "ALTER TABLE tests ADD COLUMN rules TEXT")
+
+    def _columns(self, table):
+        """ column names of a table
+        input: table:str
+        output: list of str """
+        return [i[1] for i in self._connection.execute(
+            "PRAGMA table_info({0})".format(table))]
+
+    def _insert(self, rows, skip_stored):
+        """ insert rows inside one transaction, caller holds the lock
+        input: rows:list, rows in the output csv column order
+               skip_stored:bool, see write_rows()
+        output: count:int, number of inserted rows """
+        count = 0
+        with self._connection:
+            cursor = self._connection.cursor()
+            roll_values = []
+            for row in rows:
+                # a saved test is told apart by its hero, its roll number in
+                # the description and its timestamp. the timestamp index
+                # finds it
+                if skip_stored and cursor.execute(
+                        "SELECT 1 FROM tests WHERE timestamp = ? AND "
+                        "description = ? AND hero_id = ?",
+                        (row[10], row[9], self._hero_id(row[0]))).fetchone():
+                    continue
+                count += 1
+                cursor.execute(
+                    "INSERT INTO tests (hero_id, entry_id, misc, value, "
+                    "modifier, attrs, result, description, timestamp, dice, "
+                    "rules) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (self._hero_id(row[0]),
+                     self._entry_id(row[1], row[2]),
+                     row[3],
+                     _to_int(row[4]),
+                     _to_int(row[5]),
+                     row[6],
+                     _to_int(row[8]),
+                     row[9],
+                     row[10],
+                     row[11],
+                     row[12] if len(row) > 12 else DEFAULT_RULES))
+                test_id = cursor.lastrowid
+                rolls = row[7]
+                if isinstance(rolls, str):
+                    rolls = [int(i) for i in rolls.split(";") if i.strip()]
+                for position, roll in enumerate(rolls):
+                    roll_values.append((test_id, position, roll))
+            cursor.executemany("INSERT INTO rolls (test_id, position, value) "
+                               "VALUES (?, ?, ?)", roll_values)
+        return count
+
+    def read_rows(self, chunk_size=10000):
+        """ yield all stored tests in the order they were saved. tests are
+        fetched in chunks so the lock isn't held while the caller works
+        input: chunk_size:int, tests per query
+        output: row:list, in the output csv column order """
+        last_id = 0
+        while True:
+            with self._lock:
+                tests = self._connection.execute(
+                    "SELECT t.id, h.file, e.category, e.name, t.misc, "
+                    "t.value, t.modifier, t.attrs, "
+                    "(SELECT group_concat(r.value, '; ') FROM rolls r "
+                    "WHERE r.test_id = t.id), "
+                    "t.result, t.description, t.timestamp, t.dice, " +
+                    self._rules_column + " FROM tests t "
+                    "JOIN heroes h ON h.id = t.hero_id "
+                    "JOIN entries e ON e.id = t.entry_id "
+                    "WHERE t.id > ? ORDER BY t.id LIMIT ?",
+                    (last_id, chunk_size)).fetchall()
+            if not tests:
+                return
+            last_id = tests[-1][0]
+            for test in tests:
+                yield [test[1], test[2], test[3], test[4] or '',
+                       '' if test[5] is None else test[5],
+                       '' if test[6] is None else test[6],
+                       test[7] or '',
+                       test[8] or '',
+                       '' if test[9] is None else test[9],
+                       test[10], test[11], test[12],
+                       test[13] or DEFAULT_RULES]
+
+    def import_csv(self, csv_path, batch_size=10000):
+        """ insert the rows of an existing output csv file, batch_size rows
+        per transaction. rows that are already stored are skipped, so
+        importing a file again only adds its new rows
+        input: csv_path:str, file written by GameLogic.save_to_csv()
+               batch_size:int
+        output: count:int, number of imported rows """
+        count = 0
+        with open(csv_path, "r", encoding="utf-8", newline='') as csv_file:
+            batch = []
+            # header and broken rows are skipped
+            for row in read_csv_rows(csv_file):
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    count += self.write_rows(batch, skip_stored=True)
+                    batch = []
+            if batch:
+                count += self.write_rows(batch, skip_stored=True)
+        return count
+
+    def hero_stats(self, hero_file):
+        """ statistics of every tested entry of one hero
+        input: hero_file:str, e.g. "01_testchar.xml"
+        output: list of (category, name, count, successes, mean result) """
+        with self._lock:
+            return self._connection.execute(
+                "SELECT e.category, e.name, COUNT(*), "
+                "SUM(t.result >= 0), AVG(t.result) FROM tests t "
+                "JOIN entries e ON e.id = t.entry_id "
+                "WHERE t.hero_id = (SELECT id FROM heroes WHERE file = ?) "
+                "GROUP BY t.entry_id ORDER BY e.category, e.name",
+                (hero_file,)).fetchall()
+
+    def entry_stats(self, name):
+        """ statistics of one entry for every hero that tested it
+        input: name:str, e.g. "Klettern"
+        output: list of (hero file, count, successes, mean result) """
+        with self._lock:
+            return self._connection.execute(
+                "SELECT h.file, COUNT(*), SUM(t.result >= 0), "
+                "AVG(t.result) FROM tests t "
+                "JOIN heroes h ON h.id = t.hero_id "
+                "WHERE t.entry_id IN (SELECT id FROM entries WHERE name = ?) "
+                "GROUP BY t.hero_id ORDER BY h.file", (name,)).fetchall()
+
+    def last_roll_number(self):
+        """ roll number of the last saved test, a lookup of the newest row
+        output: int, None if there is no test with a roll number """
+        with self._lock:
+            for (desc,) in self._connection.execute(
+                    "SELECT description FROM tests ORDER BY id DESC "
+                    "LIMIT 100"):
+                number = roll_number(desc)
+                if number is not None:
+                    return number
+        return None
+
+    def close(self):
+        """ close the database connection """
+        with self._lock:
+            self._connection.close()
+
+    def _hero_id(self, file):
+        """ look up or create the id of a hero file, caller holds the lock
+        input: file:str
+        output: int """
+        try:
+            return self._hero_ids[file]
+        except KeyError:
+            pass
+        self._connection.execute(
+            "INSERT OR IGNORE INTO heroes (file) VALUES (?)", (file,))
+        hero_id = self._connection.execute(
+            "SELECT id FROM heroes WHERE file = ?", (file,)).fetchone()[0]
+        self._hero_ids[file] = hero_id
+        return hero_id
+
+    def _entry_id(self, category, name):
+        """ look up or create the id of an entry, caller holds the lock.
+        misc tests have no name and are stored with an empty one
+        input: category:str
+               name:str
+        output: int """
+        name = name or ''
+        try:
+            return self._entry_ids[(category, name)]
+        except KeyError:
+            pass
+        self._connection.execute(
+            "INSERT OR IGNORE INTO entries (category, name) VALUES (?, ?)",
+            (category, name))
+        entry_id = self._connection.execute(
+            "SELECT id FROM entries WHERE category = ? AND name = ?",
+            (category, name)).fetchone()[0]
+        self._entry_ids[(category, name)] = entry_id
+        return entry_id
@@ -0,0 +1,274 @@
+"""
+Session traces: the input events of a session (searches, tests with hero,
+test input, selection, modifier and manual dice, group tests, saves) are
+appended to a trace file, one json object per line. Every session starts
+with a header line holding the seed of its dice. A GameLogic with the same
+seed draws the same dice, so feeding the events back through it replays the
+session without an interface, as fast as GameLogic can run it
+
+Header line:
+    {"event": "session", "version": 1, "seed": ..., "rules": ...,
+     "hero folder": ..., "time": ...}
+Event lines:
+    search: hero, input
+    test: hero, input, category, name, mod, dice, rolls, result, position
+    group: input, mod, heroes, seed, position, numpy, results
+    save: desc, counter
+position is the number of random numbers the session drew before the
+event, rolls of a test with manual dice are the typed in dice. a save
+saves the test or group test before it, counter is its first roll number
+"""
+import json  # Trace lines
+import os  # Replays save to os.devnull
+import threading  # The GUI searches on a worker thread
+import time  # Header timestamp and replay duration
+from collections import namedtuple
+
+TRACE_VERSION = 1
+
+# header:dict, the session line, events:list of dict
+Session = namedtuple("Session", ["header", "events"])
+
+# events: number of replayed events
+# tests: number of replayed tests and group tests
+# mismatches: list of str, events whose rolls or results differ from the
+#             trace
+# seconds: duration of the replay
+ReplayResult = namedtuple("ReplayResult", ["events",
+                                           "tests",
+                                           "mismatches",
+                                           "seconds"])
+
+
+class SessionRecorder:
+    """
+    Appends the events of one session to a trace file. Every line is
+    written as soon as its event happens, so a trace survives a crash
+
+    ...
+
+    Attributes
+    ----------
+    path: str
+        file path of the trace file
+    events: int
+        number of recorded events
+
+    Methods
+    -------
+    record(event, **fields):
+        Append one event.
+    record_test(state, position):
+        Append a finished test.
+    record_group(test_input, mod, heroes, seed, position, results):
+        Append a finished group test.
+    close():
+        Close the trace file.
+    """
+
+    def __init__(self, path, seed, rules, hero_folder):
+        """
+        Parameters:
+            path (str): trace file, sessions are appended
+
+            seed (int): seed of the session's dice
+
+            rules (str): critical rule set of the session
+
+            hero_folder (str): directory of the hero xml files
+        """
+        self.path = path
+        self.events = 0
+        self._lock = threading.Lock()
+        # line buffered, every event is flushed
+        self._file = open(path, 'a', encoding="utf-8", buffering=1)
+        self._write({"event": "session", "version": TRACE_VERSION,
+                     "seed": seed, "rules": rules,
+                     "hero folder": hero_folder, "time": time.time()})
+
+    def _write(self, line):
+        """ write one trace line
+        input: line:dict """
+        with self._lock:
+            self._file.write(json.dumps(line, ensure_ascii=False,
+                                        separators=(',', ':')) + '\n')
+
+    def record(self, event, **fields):
+        """ append one event
+        input: event:str, e.g. "search"
+               fields: the values of the event """
+        self._write(dict(event=event, **fields))
+        self.events += 1
+
+    def record_test(self, state, position):
+        """ append a finished test
+        input: state:GameState, after GameLogic.test()
+               position:int, numbers the dice drew before the test """
+        self.record("test", hero=state.current_hero, input=state.test_input,
+                    category=state.selection.category,
+                    name=state.selection.name, mod=state.mod,
+                    dice=state.dice, rolls=state.rolls, result=state.result,
+                    position=position)
+
+    def record_group(self, test_input, mod, heroes, seed, position, results):
+        """ append a finished group test
+        input: test_input:str
+               mod:int
+               heroes:iterable, None for all heroes
+               seed:int, seed given to GameLogic.group_test(), None if the
+                    session's dice drew it
+               position:int, numbers the dice drew before the group test
+               results:list of libs.backend.dsa_group.GroupResult """
+        # already imported by the group test. numpy and the random module
+        # roll different dice from the same seed
+        from libs.backend.dsa_columns import np
+        self.record("group", input=test_input, mod=mod,
+                    heroes=None if heroes is None else list(heroes),
+                    seed=seed, position=position, numpy=np is not None,
+                    results=[[i.hero, i.result] for i in results])
+
+    def close(self):
+        """ close the trace file """
+        with self._lock:
+            self._file.close()
+
+
+def read_sessions(path):
+    """ all sessions of a trace file
+    input: path:str
+    output: sessions:list of Session, raises ValueError if the file doesn't
+            start with a session header """
+    sessions = []
+    with open(path, 'r', encoding="utf-8") as trace_file:
+        for number, line in enumerate(trace_file, 1):
+            if not line.strip():
+                continue
+            event = json.loads(line)
+            if event["event"] == "session":
+                if event.get("version") != TRACE_VERSION:
+                    raise ValueError("trace version {0} in line {1}".format(
+                        event.get("version"), number))
+                sessions.append(Session(event, []))
+            elif not sessions:
+                raise ValueError("no session header before line " +
+                                 str(number))
+            else:
+                sessions[-1].events.append(event)
+    return sessions
+
+
+def replay_session(session, lang, hero_folder=None, output_file=os.devnull):
+    """ feed the events of a session through a new GameLogic with the
+    session's seed and compare the rolls and results with the trace
+    input: session:Session
+           lang:dict, language dictionary of GameLogic
+           hero_folder:str, None for the folder of the trace
+           output_file:str, saved tests are written here
+    output: ReplayResult """
+    # only imported when it's used, dsa_game imports this module when it
+    # records
+    from libs.backend.dsa_game import GameLogic, GameState
+    from libs.backend.dsa_columns import np
+    header = session.header
+    game = GameLogic({"output file": output_file,
+                      "hero folder": hero_folder or header["hero folder"],
+                      "critical rules": header["rules"],
+                      "session seed": header["seed"]}, lang)
+    state = GameState()
+    # the entries found by the last search, a test uses its selection from
+    # them like the interfaces do
+    last_search = (None, None, [])
+    # results of the last group test, until they are saved or a test
+    # follows
+    group_results = None
+    mismatches = []
+    tests = 0
+
+    start = time.perf_counter()
+    for number, event in enumerate(session.events, 1):
+        kind = event["event"]
+        if kind == "search":
+            found = game.match_test_input(GameState(
+                current_hero=event["hero"], test_input=event["input"]))
+            last_search = (event["hero"], event["input"],
+                           found.option_list or [])
+        elif kind == "test":
+            tests += 1
+            if game.dice_position() != event["position"]:
+                mismatches.append("{0}: test at position {1}, trace {2}"
+                                  .format(number, game.dice_position(),
+                                          event["position"]))
+            options = last_search[2] if last_search[:2] == (
+                event["hero"], event["input"]) else None
+            group_results = None
+            state = _replay_test(game, GameState(counter=state.counter),
+                                 event, options)
+            if state is None:
+                mismatches.append("{0}: no entry {1} for {2}".format(
+                    number, event["name"], event["hero"]))
+                state = GameState()
+            elif (state.rolls, state.result) != (event["rolls"],
+                                                 event["result"]):
+                mismatches.append("{0}: rolls {1} result {2}, trace {3} "
+                                  "{4}".format(number, state.rolls,
+                                               state.result, event["rolls"],
+                                               event["result"]))
+        elif kind == "group":
+            tests += 1
+            if game.dice_position() != event["position"]:
+                mismatches.append("{0}: group test at position {1}, trace "
+                                  "{2}".format(number, game.dice_position(),
+                                               event["position"]))
+            results = game.group_test(event["input"], event["mod"],
+                                      event["heroes"], event["seed"])
+            if [[i.hero, i.result] for i in results] != event["results"]:
+                mismatches.append("{0}: group results differ from the "
+                                  "trace{1}".format(number, "" if event[
+                                      "numpy"] == (np is not None) else
+                                      ", it was rolled {0} numpy".format(
+                                          "with" if event["numpy"] else
+                                          "without")))
+            group_results = results
+        elif kind == "save" and group_results is not None:
+            state.desc = event["desc"]
+            # older traces don't have the counter
+            state.counter = event.get("counter", state.counter)
+            game.write_rows(game.group_rows(state, group_results))
+            group_results = None
+        elif kind == "save" and state.selection is not None:
+            state.desc = event["desc"]
+            state.counter = event.get("counter", state.counter)
+            state = game.save_to_csv(state)
+    return ReplayResult(len(session.events), tests, mismatches,
+                        time.perf_counter() - start)
+
+
+def _replay_test(game, state, event, options):
+    """ repeat one test of a trace
+    input: game:GameLogic
+           state:GameState, a new state
+           event:dict, test event
+           options:list, entries found by the search for the test input,
+                   None if the trace has no such search
+    output: state:GameState, None if the hero doesn't have the entry """
+    state.current_hero = event["hero"]
+    state.test_input = event["input"]
+    if event["category"] == "misc":
+        # the dice of a misc test are in its test input
+        state = game.match_test_input(state)
+        if state.selection is None:
+            return None
+    else:
+        if options is None:
+            options = game.autocomplete(GameState(
+                current_hero=event["hero"],
+                test_input=event["name"].lower())).option_list or []
+        found = [i for i in options if i.category == event["category"] and
+                 i.name == event["name"]]
+        if not found:
+            return None
+        state.selection = found[0]
+    state.mod = event["mod"]
+    state.dice = event["dice"]
+    state.rolls = event["rolls"] if event["dice"] == "manual" else None
+    return game.test(state)
@@ -0,0 +1,144 @@
+"""
+Background writer that takes finished result rows from an interface and
+writes them to the output file on its own thread
+"""
+import queue  # Bounded hand-over between interface and writer thread
+import threading  # To run the writer next to the interface
+
+
+class ResultWriter:
+    """
+    Drains a bounded queue of result rows on a dedicated thread and passes
+    them to a sink, e.g. GameLogic.write_rows. Interfaces only pay for putting
+    a row into the queue.
+
+    ...
+
+    Attributes
+    ----------
+    _sink: callable
+        called with a list of rows, does the actual (slow) writing
+    _queue: queue.Queue
+        bounded queue of rows waiting to be written
+    _errors: queue.Queue
+        exceptions raised by the sink together with the rows that were not
+        written, collected for the interface
+    _thread: threading.Thread
+        the writer thread
+    _closed: bool
+        True once close() was called, no more rows are accepted
+    _unwritten: int
+        rows that were submitted and are not written or given up yet
+    _lock: threading.Lock
+        guards _unwritten
+
+    Methods
+    -------
+    submit(row):
+        Put a row into the queue without blocking, raises queue.Full if the
+        writer can't keep up.
+    pending():
+        Number of rows that are waiting to be written.
+    idle():
+        True if every submitted row was written or given up.
+    pop_errors():
+        Return and forget all errors the sink raised so far.
+    close():
+        Write every queued row, then stop the writer thread.
+    _run():
+        Loop of the writer thread.
+    """
+
+    # put into the queue by close() to tell the writer thread to stop
+    _STOP = object()
+
+    def __init__(self, sink, max_size=64):
+        """
+        Parameters:
+            sink (callable): takes a list of rows and writes them
+
+            max_size (int): how many rows can wait in the queue before
+            submit() reports back-pressure
+        """
+        self._sink = sink
+        # one extra slot so close() never blocks on a full queue
+        self._queue = queue.Queue(maxsize=max_size + 1)
+        self._max_size = max_size
+        self._errors = queue.Queue()
+        self._closed = False
+        self._unwritten = 0
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run,
+                                        name="ResultWriter", daemon=True)
+        self._thread.start()
+
+    def submit(self, row):
+        """ put a row into the queue without blocking
+        input: row:list, created by GameLogic.make_row()
+        raises: queue.Full if max_size rows are already waiting
+                RuntimeError if the writer was closed """
+        if self._closed:
+            raise RuntimeError("ResultWriter is closed")
+        if self._queue.qsize() >= self._max_size:
+            raise queue.Full
+        with self._lock:
+            self._unwritten += 1
+        self._queue.put_nowait(row)
+
+    def pending(self):
+        """ number of rows that are waiting to be written
+        output: int """
+        return self._queue.qsize()
+
+    def idle(self):
+        """ if every submitted row was written or given up, e.g. to read the
+        output file after an error
+        output: bool """
+        with self._lock:
+            return self._unwritten == 0
+
+    def pop_errors(self):
+        """ return and forget all errors the sink raised so far
+        output: errors:list, list of (exception, rows) tuples, rows are the
+                ones that could not be written """
+        errors = []
+        while True:
+            try:
+                errors.append(self._errors.get_nowait())
+            except queue.Empty:
+                return errors
+
+    def close(self):
+        """ write every queued row, then stop the writer thread. calling
+        close() more than once does nothing """
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(self._STOP)
+        self._thread.join()
+
+    def _run(self):
+        """ take rows from the queue and write them. all rows that are
+        already waiting are written with one sink call """
+        while True:
+            rows = [self._queue.get()]
+            while True:
+                try:
+                    rows.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = any(row is self._STOP for row in rows)
+            rows = [row for row in rows if row is not self._STOP]
+
+            if rows:
+                try:
+                    self._sink(rows)
+                except Exception as error:  # pylint: disable=broad-except
+                    # the interface decides how to show this
+                    self._errors.put((error, rows))
+                with self._lock:
+                    self._unwritten -= len(rows)
+
+            if stop:
+                return
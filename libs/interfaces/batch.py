@@ -0,0 +1,267 @@
+""" file that holds the Batch class """
+import re
+import shlex
+import sys
+
+from libs.backend.dsa_game import GameState
+
+# keys a batch command can have
+COMMAND_KEYS = ("hero", "test", "mod", "dice", "save", "party")
+
+
+class Batch:
+    """
+    Non-interactive interface, runs one-line commands without any menus, e.g.
+    hero=02_testchar test="Klettern" mod=-3 save="desc"
+    The hero stays selected for the following commands. party=all (or hero
+    names separated by commas) tests the entry for these heroes at once.
+    Output and saved tests are written in blocks
+
+    ...
+
+    Attributes
+    ---------
+    _game: class libs.backend.dsa_game.GameLogic
+        instance of the GameLogic class, does all the DSA game mechanics
+    _state: class libs.backend.dsa_game.GameState
+        contains user input, selected test, rolls, result
+    _lang: dict
+        dictionary holding all strings that will be printed
+    _lines: iterable
+        the commands, one per line
+    _block_size: int
+        commands per block of output and saved rows
+    _hero_list: list
+        names of all heroes
+    _errors: int
+        number of commands that failed
+
+    Methods
+    ------
+
+    loop():
+        Executed by main.py, runs all commands and raises SystemExit with
+        status 1 if a command failed.
+    run_command(line):
+        Run one command, return its output lines and the rows to save.
+    _run_party(command):
+        Run a party command, one test per hero.
+    _parse(line):
+        Split a command into its key=value pairs.
+    _select(test_input):
+        Find the hero entry for the test input.
+    _format(row, saved):
+        Output line of a test.
+    """
+
+    def __init__(self, game, state, configs, lang, lines, block_size=10000):
+        """
+        Parameters:
+            game (libs.backend.dsa_game.GameLogic): DSA game mechanics
+
+            state (libs.backend.dsa_game.GameState): contains user input,
+            matching and selected hero entries, rolls, result
+
+            configs (dict): user input from config file
+
+            lang (dict): holds all strings that will be printed
+
+            lines (iterable): the commands, one per line
+
+            block_size (int): commands per block of output and saved rows
+        """
+        self._game = game
+        self._state = state
+        self._lang = lang
+        self._state.dice = configs["dice"]
+        self._lines = lines
+        self._block_size = block_size
+        self._hero_list = game.get_hero_list()
+        self._errors = 0
+
+    def loop(self):
+        """
+        This method is executed by main.py. Output lines and rows to save are
+        collected and written once per block of commands
+        """
+        output = []
+        rows = []
+        for line_nr, line in enumerate(self._lines, 1):
+            line = line.strip()
+            # empty lines and comments are skipped
+            if not line or line.startswith('#'):
+                continue
+            try:
+                out_lines, new_rows = self.run_command(line)
+            except ValueError as error:
+                self._errors += 1
+                out_lines = ["error\t{0}\t{1}".format(line_nr, error)]
+                new_rows = []
+            output.extend(out_lines)
+            rows.extend(new_rows)
+            if len(output) >= self._block_size:
+                self._flush(output, rows)
+        self._flush(output, rows)
+
+        if self._errors:
+            raise SystemExit(1)
+
+    def _flush(self, output, rows):
+        """ write the collected rows and output lines, then empty the lists
+        input: output:list of str
+               rows:list, in the output csv column order """
+        if rows:
+            self._game.write_rows(rows)
+            rows.clear()
+        if output:
+            sys.stdout.write("\n".join(output) + "\n")
+            sys.stdout.flush()
+            output.clear()
+
+    def run_command(self, line):
+        """ run one command
+        input: line:str, e.g. 'hero=02_testchar test="Klettern" mod=-3'
+        output: (out_lines, rows):tuple, rows are the rows to save.
+                raises ValueError if the command can't be run """
+        command = self._parse(line)
+        state = self._state
+
+        if "party" in command:
+            return self._run_party(command)
+
+        if "hero" in command:
+            if command["hero"] not in self._hero_list:
+                raise ValueError(self._lang["key_error"] + ": " +
+                                 command["hero"])
+            state.current_hero = command["hero"]
+        if "test" not in command:
+            return ["hero\t" + state.current_hero], []
+        if state.current_hero is None:
+            raise ValueError(self._lang["key_error"])
+
+        self._select(command["test"])
+
+        # misc tests have their modifier in the test input
+        if state.selection.category != "misc":
+            if not re.match(r"^-?\d+$", command.get("mod", "0")):
+                raise ValueError(self._lang["invalid"] + ": mod")
+            state.mod = int(command.get("mod", "0"))
+
+        state.rolls = None
+        if "dice" in command:
+            state.dice = "manual"
+            state = self._game.match_manual_dice(state, command["dice"])
+            if state.rolls is None:
+                raise ValueError(self._lang["invalid"] + ": dice")
+        else:
+            state.dice = "auto"
+
+        state = self._state = self._game.test(state)
+        if state.result is None:
+            raise ValueError(self._lang["invalid"] + ": " + line)
+
+        row = None
+        if "save" in command:
+            state.desc = command["save"]
+            row = self._game.make_row(state)
+            self._game.check_row(row)
+            self._game.record_save(state.desc, state.counter)
+            state.counter += 1
+        else:
+            # the same columns as a saved row, without the description
+            state.desc = None
+        return [self._format(row or self._game.make_row(state),
+                             row is not None)], [] if row is None else [row]
+
+    def _run_party(self, command):
+        """ test one entry for several heroes at once, the current hero stays
+        the same. manual dice can't be used
+        input: command:dict, created by _parse()
+        output: (out_lines, rows):tuple, one line and row per tested hero,
+                ranked by result """
+        if "test" not in command or "dice" in command:
+            raise ValueError(self._lang["invalid"] + ": party")
+        if not re.match(r"^-?\d+$", command.get("mod", "0")):
+            raise ValueError(self._lang["invalid"] + ": mod")
+        heroes = None
+        if command["party"] != "all":
+            heroes = command["party"].split(',')
+            for hero in heroes:
+                if hero not in self._hero_list:
+                    raise ValueError(self._lang["key_error"] + ": " + hero)
+
+        results = self._game.group_test(command["test"],
+                                        int(command.get("mod", "0")), heroes)
+        if not results:
+            raise ValueError(self._lang["party_none"] + ": " +
+                             command["test"])
+        # the counter only moves on when the rows are saved
+        state = GameState(counter=self._state.counter,
+                          desc=command.get("save"))
+        rows = self._game.group_rows(state, results)
+        if "save" in command:
+            for row in rows:
+                self._game.check_row(row)
+            self._game.record_save(state.desc, self._state.counter)
+            self._state.counter = state.counter
+        out_lines = [self._format(row, "save" in command) for row in rows]
+        return out_lines, rows if "save" in command else []
+
+    def _parse(self, line):
+        """ split a command into its key=value pairs, values may be quoted
+        input: line:str
+        output: command:dict, key -> value """
+        command = {}
+        try:
+            tokens = shlex.split(line)
+        except ValueError as error:
+            raise ValueError(self._lang["invalid"] + ": " + str(error))
+        for token in tokens:
+            key, sep, value = token.partition('=')
+            if not sep or key not in COMMAND_KEYS:
+                raise ValueError(self._lang["invalid"] + ": " + token)
+            command[key] = value
+        return command
+
+    def _select(self, test_input):
+        """ find the hero entry for the test input: a misc dice sum, the only
+        matching entry or the entry whose name is the input
+        input: test_input:str """
+        state = self._state
+        state.test_input = test_input.lower()
+        state.option_list = None
+        state = self._state = self._game.match_test_input(state)
+        if state.selection is not None:
+            return
+
+        options = state.option_list or []
+        exact = [i for i in options if i.name.lower() == state.test_input]
+        if len(options) == 1:
+            state.selection = options[0]
+        elif exact:
+            state.selection = exact[0]
+        elif not options:
+            raise ValueError(self._lang["no_hero_match"] + ": " + test_input)
+        else:
+            raise ValueError(self._lang["entry_match"] + ", ".join(
+                i.name for i in options[:10]))
+
+        if state.selection.category == "special_skill" or (
+                state.selection.category == "advantage" and
+                state.selection.value is None):
+            raise ValueError(self._lang["invalid"] + ": " +
+                             state.selection.name)
+
+    @staticmethod
+    def _format(row, saved):
+        """ output line of a test: hero, category, entry, value, modifier,
+        related attributes, rolls, result and, if it was saved, its roll
+        number, separated by tabs
+        input: row:list, in the output csv column order
+               saved:bool
+        output: str """
+        values = row[:9]
+        values[0] = values[0][:-len(".xml")]
+        if saved:
+            values.append(row[9].split(':')[0])
+        return "\t".join('' if i is None else str(i) for i in values)
@@ -16,6 +16,8 @@ class CLI:
         contains user input, selected test, rolls, result
     _lang: dict
         dictionary holding all strings that will be printed
+    _metrics: class libs.backend.dsa_metrics.Metrics
+        latency measurements, None if they are turned off
 
     Methods
     ------
@@ -31,6 +33,10 @@ class CLI:
     _get_hero():
         Show the user all found hero xml files. Then the user is asked for
         an integer input to choose one hero.
+    _party_test():
+        Test one entry for all heroes at once and show them ranked.
+    _format_party_result(results):
+        Format the ranked results of a party test.
     _get_mod():
         Ask user for integer (positive or negative). Empty string is
         interpreted as zero.
@@ -52,7 +58,7 @@ class CLI:
         test and save them in the GameState.
     """
 
-    def __init__(self, game, state, configs, lang):
+    def __init__(self, game, state, configs, lang, metrics=None):
         """
         Parameters:
             game (libs.backend.dsa_game.GameLogic): DSA game mechanics
@@ -63,10 +69,14 @@ class CLI:
             configs (dict): user input from config file
 
             lang (dict): holds all strings that will be printed
+
+            metrics (libs.backend.dsa_metrics.Metrics): latency
+            measurements, None if they are turned off
         """
         self._game = game
         self._state = state
         self._lang = lang
+        self._metrics = metrics
         self._state.dice = configs["dice"]
 
     def loop(self):
@@ -102,7 +112,11 @@ class CLI:
             self._state = self._game.test(self._state)
             self._show_result()
             if self._get_save_choice():
-                self._game.save_to_csv(self._state)
+                try:
+                    self._game.save_to_csv(self._state)
+                except ValueError as error:
+                    # the output format can't store the result
+                    print(self._lang["save_error"] + str(error))
             self.reset()
 
     def reset(self):
@@ -173,12 +187,83 @@ class CLI:
             if hero_input.lower() in ("exit", "quit"):
                 raise SystemExit
 
+            # show the latency measurements so far
+            if hero_input.lower() == "metrics":
+                if self._metrics is None:
+                    print(self._lang["metrics_off"])
+                else:
+                    print(self._metrics.dump())
+                continue
+
+            # test one entry for every hero
+            if hero_input.lower() == "party":
+                self._party_test()
+                continue
+
             match = re.match(pattern, hero_input)
             if match and int(hero_input) in range(1, len(hero_options) + 1):
                 self._state.current_hero = hero_options[int(hero_input) - 1]
                 break
             print(self._lang["invalid"])
 
+    def _party_test(self):
+        """
+        Ask for a test input and a modifier, test the matching entry for all
+        heroes at once and show them ranked. The dice are always rolled,
+        saved tests are written in one go.
+        """
+        test_input = input(self._lang["input"]).lower()
+        self._get_mod()
+        try:
+            results = self._game.group_test(test_input, self._state.mod)
+        except ValueError as error:
+            print(error)
+            self.reset()
+            return
+
+        if not results:
+            print(self._lang["party_none"])
+            self.reset()
+            return
+
+        print(self._format_party_result(results))
+        if self._get_save_choice():
+            first = self._state.counter
+            try:
+                self._game.write_rows(self._game.group_rows(self._state,
+                                                            results))
+            except ValueError as error:
+                # the output format can't store the results. group_rows()
+                # already counted them, but nothing was saved
+                self._state.counter = first
+                print(self._lang["save_error"] + str(error))
+            else:
+                self._game.record_save(self._state.desc, first)
+        self.reset()
+
+    def _format_party_result(self, results):
+        """
+        Format the ranked results of a party test, one line per hero
+
+        Parameters:
+            results (list): libs.backend.dsa_group.GroupResult, ranked
+
+        Returns:
+            out_str (str)
+        """
+        out_str = results[0].name + " (" + self._lang[
+            results[0].category] + "), " + self._lang["test_mod"] + str(
+            results[0].mod) + "\n"
+        out_str += "\t" + self._lang["party_header"]
+        for rank, result in enumerate(results, 1):
+            attrs_string = ", ".join(i.abbr + '(' + str(i.value) + ')'
+                                     for i in result.attrs)
+            out_str += "\n\t{0}\t{1}\t{2}\t{3}\t{4}\t{5}\t{6:.1f}%".format(
+                rank, result.hero, result.value, attrs_string,
+                ", ".join(map(str, result.rolls)), result.result,
+                100 * result.chance)
+        return out_str
+
     def _get_mod(self):
         """
         Ask user for integer (positive or negative). Empty string is
@@ -1,7 +1,16 @@
 """ file that holds the GUI class """
+import queue
 import re
 import tkinter as tk
 
+from libs.backend.dsa_writer import ResultWriter
+from libs.interfaces.gui_matchlist import MatchList
+from libs.interfaces.gui_model import GuiModel
+from libs.interfaces.gui_search import LatestSearch
+
+# rows of the match list, more matching entries are reached by scrolling
+MATCH_ROWS = 10
+
 
 class GUI:
     """
@@ -28,16 +37,35 @@ class GUI:
         dictionary holding all strings that will be printed
     _window: tkinter.Tk
         the tkinter window object
-    _old_hero_input: str
-        variable to see if state/user hero input has changed
-    _printable_options: list
-        list of all possible hero entries matching user input
+    _model: libs.interfaces.gui_model.GuiModel
+        decides which layout and which label texts are shown
+    _layouts: dict
+        every screen layout that was shown once, layout name -> dict with
+        the "outputs", "inputs" and "buttons" widget dicts. layouts are
+        hidden and shown again instead of being rebuilt
+    _layout: str
+        name of the shown layout
+    _shown_texts: dict
+        (layout, label key) -> text, to only configure labels whose text
+        changed
+    _match_list: libs.interfaces.gui_matchlist.MatchList
+        scrollable list of the entries matching the test input, part of the
+        input screen
+    _search: libs.interfaces.gui_search.LatestSearch
+        runs the search for the test input on a worker thread
+    _search_delay: int
+        milliseconds without a keystroke before the search starts
+    _search_after: str
+        tkinter id of the scheduled search start, None if none is scheduled
+    _poll_after: str
+        tkinter id of the scheduled check for search results, None if none
+        is scheduled
     _text_outputs: dict
-        contains all tkinter text strings to be displayed
+        contains all tkinter text strings that are shown
     _text_inputs: dict
-        contains all tkinter text input objects
+        contains all tkinter text input objects that are shown
     _buttons: dict
-        contains all tkinter button objects
+        contains all tkinter button objects that are shown
     _var_hero: tkinter.StringVar
         the variable linked to the hero name text input box
     _perm_input_hero: tkinter.Entry
@@ -46,6 +74,13 @@ class GUI:
         the variable linked to the test input text input box
     _perm_input_test: tkinter.Entry
         the text input object for the test name
+    _writer: libs.backend.dsa_writer.ResultWriter
+        background thread that writes saved tests to the output file
+    _resync_counter: bool
+        True after a failed save until the roll number was read from the
+        output file again
+    _perm_status: tkinter.Label
+        shows problems of the background writer, e.g. a full save queue
 
     Methods
     ------
@@ -53,16 +88,26 @@ class GUI:
     loop():
         Gets executed by main.py, only executes the tkinter mainloop, every
         change is event driven.
+    _close():
+        Gets executed when the window is closed. Writes all queued saves,
+        then destroys the window.
+    _poll_writer():
+        Periodically checks the background writer for errors and shows them.
+        After an error the roll number continues after the last written row.
     _reset():
         Every variable of GameState back to None (save is set to False),
         deletes user input typed into the test input field.
-    _clear_screen():
-        Destroy all widgets except for roll number, test input field and
-        hero input field.
-    _get_hero():
-        Gets user input from hero input field, gets all available heroes as
-        list from GameLogic and looks for a match. If only one hero matches the
-        input, this hero is selected for the test.
+    _render(texts):
+        Show the layout of the current selection, empty its text inputs and
+        set the given label texts.
+    _set_text(key, text):
+        Configure a label of the shown layout if its text changed.
+    _select_match(index):
+        Gets executed when an entry of the match list is chosen, uses it for
+        the test.
+    _key_match(event):
+        Up, down, page up, page down and return in the test input field move
+        through the match list and choose an entry.
     _get_mod(mod_string):
         Use regular expression to read the modifier as an integer from the
         given string. No match or empty string is interpreted as 0. The matched
@@ -71,21 +116,30 @@ class GUI:
         Method that gets executed when "Test" button is clicked. Calls
         GameLogic.test and displays result.
     _button_save():
-        Gets executed when "Test" button is clicked. Runs
-        GameLogic.save_to_csv(), then calls _reset() and shows the updated
-        current roll number and the selected hero file.
+        Gets executed when "Test" button is clicked. Hands the test to the
+        background writer using GameLogic.save_to_csv(), then calls _reset()
+        and shows the updated current roll number and the selected hero file.
     _trace_hero():
-        Gets executed when the hero text input changes. Calls _get_hero().
-        If hero selection has changed the screen is reset. The full hero file
-        name is shown on screen.
+        Gets executed when the hero text input changes. Lets the view-model
+        select the hero. If hero selection has changed the screen is reset.
+        The full hero file name is shown on screen.
     _trace_test():
-        Gets executed when the test text input changes. Calls
-        GameLogic.match_test_input(). If test selection has changed the screen
-        is reset, then (based on the current test category) matching entries
-        and the hero file name are shown.
-    _setup_window():
-        Clear all widgets and, based on current test category, set up screen
-        again.
+        Gets executed when the test text input changes. Cancels the search
+        of the previous input and schedules a new one after the search
+        delay.
+    _start_search():
+        Hands the test input to the search worker.
+    _poll_search():
+        Checks for the result of the search and shows it: matching entries
+        or, based on the current test category, the test screen.
+    _cancel_search():
+        Drop the scheduled and the running search.
+    _setup_common():
+        Create the labels that every layout shows.
+    _show_layout(key):
+        Hide the shown layout and show another one, it is built on first use.
+    _build_layout(key):
+        Create the widgets of a layout.
     _setup_input_screen():
         Create tkinter widgets for the input screen, when GameState.category is
         None.
@@ -103,7 +157,7 @@ class GUI:
         GameState.category is special_skill.
     """
 
-    def __init__(self, game, state, configs, lang):
+    def __init__(self, game, state, configs, lang, metrics=None):
         self._game = game
         self._state = state
         self._font = "none " + str(configs["font size"]) + " bold"
@@ -121,10 +175,20 @@ class GUI:
         self._window.title("DSATester")
         self._window.configure(background="black")
 
-        # variables to see if state has changed
-        self._old_hero_input = None
+        self._model = GuiModel(game, state, lang)
+
+        # every layout is built once and then only hidden and shown
+        self._layouts = {}
+        self._layout = None
+        self._shown_texts = {}
+        self._match_list = None
 
-        self._printable_options = None
+        # searching waits until typing pauses and runs on a worker thread
+        self._search = LatestSearch(self._model.search)
+        # older config files don't have this entry
+        self._search_delay = configs.get("search delay", 150)
+        self._search_after = None
+        self._poll_after = None
 
         # these dicts hold all widgets shown in the GUI
         self._text_outputs = {}
@@ -150,19 +214,78 @@ class GUI:
                                          textvariable=self._var_input,
                                          width=20, bg="white")
         self._perm_input_test.grid(row=3, column=1, sticky=tk.W)
+        # the match list is controlled from the test input, so typing never
+        # loses focus
+        for key in ("<Up>", "<Down>", "<Prior>", "<Next>", "<Return>"):
+            self._perm_input_test.bind(key, self._key_match)
+
+        # label for messages of the background writer, it also persists
+        # through window changes
+        self._perm_status = tk.Label(self._window, text='', bg="black",
+                                     fg="red", font=self._font)
+        self._perm_status.grid(row=20, column=0, columnspan=2, sticky=tk.W)
+
+        # saving happens on a separate thread so a slow disk doesn't freeze
+        # the window
+        # older config files don't have this entry
+        self._writer = ResultWriter(self._game.write_rows,
+                                    configs.get("save queue size", 64))
+        # set after a failed save, the roll number is read from the output
+        # file again once the writer is idle
+        self._resync_counter = False
+        self._window.protocol("WM_DELETE_WINDOW", self._close)
+        self._window.after(200, self._poll_writer)
+
+        # the callbacks are wrapped before tkinter gets them
+        if metrics is not None:
+            metrics.instrument(self, ("_trace_hero", "_trace_test",
+                                      "_poll_search", "_button_test",
+                                      "_button_save"), "GUI")
 
         self._var_hero.trace('w', self._trace_hero)
         self._var_input.trace('w', self._trace_test)
 
-        self._setup_window()
-        self._text_outputs["var_roll_nr"].configure(
-            text=str(self._state.counter))
+        self._common_outputs = self._setup_common()
+        self._show_layout("none")
+        self._set_text("var_roll_nr", str(self._state.counter))
 
     def loop(self):
         """ gets executed by main.py, only executes the tkinter mainloop, every
         change is event driven """
 
-        self._window.mainloop()
+        try:
+            self._window.mainloop()
+        finally:
+            # write every queued save before the program ends
+            self._writer.close()
+            self._search.close()
+
+    def _close(self):
+        """ gets executed when the window is closed. writes all queued saves,
+        then destroys the window """
+        self._writer.close()
+        self._search.close()
+        self._window.destroy()
+
+    def _poll_writer(self):
+        """ periodically checks the background writer for errors and shows
+        them """
+        errors = self._writer.pop_errors()
+        if errors:
+            error, rows = errors[-1]
+            print(self._lang["save_error"] + repr(error))
+            self._perm_status.configure(
+                text=self._lang["save_error"] + str(len(rows)))
+            self._resync_counter = True
+        if self._resync_counter and self._writer.idle():
+            # the counter was increased for rows that were never written,
+            # the next save continues after the last written roll
+            self._resync_counter = False
+            # stays 1 if no row was written at all
+            self._state.counter = 1
+            self._state = self._game.restore_counter(self._state)
+            self._set_text("var_roll_nr", str(self._state.counter))
+        self._window.after(200, self._poll_writer)
 
     def _reset(self):
         """ every variable of GameState back to None (save is set to False),
@@ -179,35 +302,56 @@ class GUI:
 
         self._perm_input_test.delete(0, 'end')
 
-    def _clear_screen(self):
-        """ destroy all widgets except for roll number, test input field and
-        hero input field """
-        for key, field in self._text_outputs.items():
-            if key == "var_roll_nr":
-                continue
-            field.destroy()
-
+    def _render(self, texts):
+        """ show the layout of the current selection, empty its text inputs
+        and set the given label texts
+        input: texts:dict, label key -> text """
+        self._show_layout(self._model.layout())
         for key, field in self._text_inputs.items():
             if key in ("test_input", "hero_input"):
                 continue
-            field.destroy()
-
-        for key, field in self._buttons.items():
-            field.destroy()
-
-    def _get_hero(self):
-        """ gets user input from hero input field, gets all available heroes as
-        list from GameLogic and looks for a match. if only one hero matches the
-        input, this hero is selected for the test """
-
-        hero_input = self._text_inputs["hero_input"].get().lower()
-        hero_options = self._game.get_hero_list()
-        temp_list = []
-        for _, value in enumerate(hero_options):
-            if hero_input in value.lower():
-                temp_list.append(value)
-        if len(temp_list) == 1:
-            self._state.current_hero = temp_list[0]
+            if field.get():
+                field.delete(0, 'end')
+        for key, text in texts.items():
+            self._set_text(key, text)
+        if self._layout == "none":
+            self._match_list.set_items(self._model.options(),
+                                       self._model.option_text)
+
+    def _select_match(self, index):
+        """ gets executed when an entry of the match list is chosen, by click
+        or return key. the entry is used for the test
+        input: index:int, position of the entry in the match list """
+        self._render(self._model.select_option(index))
+
+    def _key_match(self, event):
+        """ up, down, page up, page down and return in the test input field
+        move through the match list and choose an entry
+        input: event:tkinter.Event
+        output: str, "break" stops tkinter from handling the key further """
+        if self._layout != "none":
+            return None
+        if event.keysym == "Return":
+            self._match_list.choose()
+        elif event.keysym in ("Up", "Down"):
+            self._match_list.move(-1 if event.keysym == "Up" else 1)
+        else:
+            self._match_list.page(-1 if event.keysym == "Prior" else 1)
+        return "break"
+
+    def _set_text(self, key, text):
+        """ configure a label of the shown layout, but only if its text
+        changed. labels that the layout doesn't have are skipped
+        input: key:str, e.g. "var_result"
+               text:str, None shows nothing """
+        if key not in self._text_outputs:
+            return
+        text = '' if text is None else text
+        shown_key = (None if key in self._common_outputs else self._layout,
+                     key)
+        if self._shown_texts.get(shown_key) != text:
+            self._shown_texts[shown_key] = text
+            self._text_outputs[key].configure(text=text)
 
     def _get_mod(self, mod_string):
         """ use regular expression to read the modifier as an integer from the
@@ -228,8 +372,8 @@ class GUI:
             self._state.mod = 0
 
     def _button_test(self):
-        """ method that gets executed when "test" button is clicked. calls
-        GameLogic.test and displays result
+        """ method that gets executed when "test" button is clicked. lets the
+        view-model call GameLogic.test and displays result
         output: bool, False if test was not successful"""
 
         # misc test has modifier already typed in
@@ -240,64 +384,11 @@ class GUI:
             dice_string = self._text_inputs["dice_input"].get()
             self._state = self._game.match_manual_dice(self._state, dice_string)
 
-        self._state = self._game.test(self._state)
-
-        if self._state.result is None or self._state.rolls is None:
+        texts = self._model.test()
+        if texts is None:
             return False
-
-        rolls = ", ".join(map(str, self._state.rolls))
-
-        if self._state.selection.category == "misc":
-            self._text_outputs["var_rolls"].configure(text=str(rolls))
-            self._text_outputs["var_result"].configure(
-                text=str(self._state.result))
-
-        if self._state.selection.category in ("attr",
-                                              "fight_talent", "advantage"):
-            if self._state.result is not None:
-                self._text_outputs["var_tested"].configure(
-                    text=self._state.selection.name)
-                self._text_outputs["var_value"].configure(
-                    text=str(self._state.selection.value))
-                self._text_outputs["var_rolls"].configure(
-                    text=str(self._state.rolls[0]))
-                self._text_outputs["var_result"].configure(
-                    text=str(self._state.result))
-
-        if self._state.selection.category in ("skill", "spell"):
-            if self._state.result is not None:
-                # if a negative modifier changed the attribute values, this
-                # change has to be shown on screen
-                if self._state.mod + self._state.selection.value < 0:
-                    # value string example "8 -> 5"
-                    value_string = str(self._state.selection.value) + " -> " + \
-                                   str(
-                                       self._state.selection.value +
-                                       self._state.mod)
-                    # attrs_string example: "KL(14->12), IN(13->11), FF(12->10)"
-                    attrs_list = [i.abbr + '(' + str(i.value) + "->" +
-                                  str(i.modified) + ')' for _, i in
-                                  enumerate(self._state.attrs)]
-                else:
-                    attrs_list = [i.abbr + '(' + str(i.value) + ')' for _, i in
-                                  enumerate(self._state.attrs)]
-                    value_string = str(self._state.selection.value)
-                attrs_string = ", ".join(map(str, attrs_list))
-
-                remaining_string = [i.remaining for _, i in
-                                    enumerate(self._state.attrs)]
-                remaining_string = ", ".join(map(str, remaining_string))
-
-                self._text_outputs["var_tested"].configure(
-                    text=self._state.selection.name)
-                self._text_outputs["var_tested_attrs"].configure(
-                    text=attrs_string)
-                self._text_outputs["var_value"].configure(text=value_string)
-                self._text_outputs["var_rolls"].configure(text=rolls)
-                self._text_outputs["var_remaining"].configure(
-                    text=remaining_string)
-                self._text_outputs["var_result"].configure(
-                    text=str(self._state.result))
+        for key, text in texts.items():
+            self._set_text(key, text)
         return True
 
     def _button_save(self):
@@ -312,139 +403,144 @@ class GUI:
 
         self._state.desc = self._text_inputs["desc"].get()
 
-        self._state = self._game.save_to_csv(self._state)
+        try:
+            self._state = self._game.save_to_csv(self._state, self._writer)
+        except queue.Full:
+            # the writer is behind, keep the result on screen so the user
+            # can try again
+            self._perm_status.configure(text=self._lang["save_busy"])
+            return False
+        except ValueError as error:
+            # the output format can't store the result
+            self._perm_status.configure(
+                text=self._lang["save_error"] + str(error))
+            return False
+        self._perm_status.configure(text='')
         self._reset()
-        self._clear_screen()
-        self._setup_window()
-        self._text_outputs["var_roll_nr"].configure(
-            text=str(self._state.counter))
-        self._text_outputs["var_matching_hero"].configure(
-            text=self._state.current_hero)
+        self._cancel_search()
+        self._render(self._model.test_input(''))
+        self._set_text("var_roll_nr", str(self._state.counter))
 
         return True
 
     # tkinter trace method passes 3 arguments that are not used
     def _trace_hero(self, *_):
-        """ gets executed when the hero text input changes. calls get_hero(),
-        if hero selection has changed the screen is reset. the full hero file
-        name is shown on screen
+        """ gets executed when the hero text input changes. lets the
+        view-model select the hero, if hero selection has changed the screen
+        is reset. the full hero file name is shown on screen
         input: a, b, c are all passed from the tkinter trace method but are not
         used """
-        self._get_hero()
-        if self._old_hero_input != self._state.current_hero:
-            self._state.result = None
-            self._state.selection = None
-            self._clear_screen()
-            self._setup_window()
-            self._old_hero_input = self._state.current_hero
-        self._text_outputs["var_matching_hero"].configure(
-            text=self._state.current_hero)
+        changed, texts = self._model.hero_input(self._perm_input_hero.get())
+        if changed:
+            # a search for the previous hero must not show up
+            self._cancel_search()
+            self._render(texts)
+        else:
+            self._set_text("var_matching_hero", texts["var_matching_hero"])
 
     # tkinter trace method passes 3 arguments that are not used
     def _trace_test(self, *_):
-        """ gets executed when the test text input changes. calls
-        GameLogic.match_test_input(), if test selection has changed the screen
-        is reset, then (based on the current test category) matching entries
-        and the hero file name are shown
+        """ gets executed when the test text input changes. the search of the
+        previous input is cancelled and a new one is scheduled, so fast typing
+        only searches once typing pauses
         input: a, b, c are all passed from the tkinter trace method but are not
         used """
         if self._state.current_hero is None:
             print("can't look up a test without a given hero file")
             return False
 
-        self._state.selection = None
-
-        self._state.test_input = self._text_inputs["test_input"].get().lower()
-
-        # if no input
-        if self._state.test_input == '':
-            self._printable_options = ''
-        else:
-            self._state = self._game.match_test_input(self._state)
-
-            # if input is no misc roll
-            if self._state.selection is None:
-
-                self._printable_options = list()
-
-                # print number of matching entries plus all matching entries
-                # below
-                self._printable_options.append(
-                    str(len(self._state.option_list)) + " matches\n")
-
-                for _, value in enumerate(self._state.option_list):
-                    #                    option_string = "{0} ({1})".format(
-                    #                    value.name, value.category)
-                    option_string = "{0} ({1})".format(value.name, self._lang[
-                        value.category])
-                    self._printable_options.append(option_string)
-
-                # join list to string, each list element in new line
-                self._printable_options = "\n".join(
-                    map(str, self._printable_options))
-
-                # if just 1 entry matches, this entry is used for the current
-                # test
-                if self._state.option_list and len(
-                        self._state.option_list) == 1:
-                    self._state.selection = self._state.option_list[0]
-                # if more than 1 entries match but 1 entry matches the user
-                # input
-                # exactly, this entry is used for the current test
-                elif self._state.option_list and \
-                        self._state.test_input.lower() \
-                        == self._state.option_list[0].name.lower():
-                    self._state.selection = self._state.option_list[0]
-                else:
-                    self._state.selection = None
-
-        self._clear_screen()
-        self._setup_window()
-        self._state.result = None
-
-        self._text_outputs["var_matching_hero"].configure(
-            text=self._state.current_hero)
-
-        if self._state.selection is None:
-            self._text_outputs["var_matching"].configure(
-                text=self._printable_options)
-            return False
-
-        if self._state.selection.category != "misc":
-            self._text_outputs["var_matching"].configure(
-                text=self._state.selection.name)
-
+        self._cancel_search()
+        self._search_after = self._window.after(self._search_delay,
+                                                self._start_search)
         return True
 
-    def _setup_window(self):
-        """ clear all widgets and, based on current test category, set up
-        screen again """
+    def _start_search(self):
+        """ hands the test input to the search worker and starts checking
+        for its result """
+        self._search_after = None
+        self._search.submit(self._state.current_hero,
+                            self._perm_input_test.get())
+        if self._poll_after is None:
+            self._poll_after = self._window.after(10, self._poll_search)
+
+    def _poll_search(self):
+        """ checks for the result of the search and shows it: matching
+        entries or, based on the current test category, the test screen """
+        self._poll_after = None
+        found = self._search.pop_result()
+        if found is not None:
+            self._render(self._model.apply_search(found))
+        if self._search.pending():
+            self._poll_after = self._window.after(10, self._poll_search)
+
+    def _cancel_search(self):
+        """ drop the scheduled and the running search """
+        if self._search_after is not None:
+            self._window.after_cancel(self._search_after)
+            self._search_after = None
+        self._search.cancel()
+
+    def _setup_common(self):
+        """ create the labels that every layout shows, they are never hidden
+        output: outputs:dict, label key -> tkinter.Label """
+        outputs = {}
+        for key, text, row, column, sticky in (
+                ["roll_nr", self._lang["roll_nr"], 0, 0, tk.E],
+                ["var_roll_nr", '', 0, 1, tk.W],
+                ["hero_prompt", self._lang["hero_file"], 1, 0, tk.E],
+                ["matching_hero", self._lang["hero_match"], 2, 0, tk.E],
+                ["var_matching_hero", '', 2, 1, tk.W],
+                ["input_prompt", self._lang["input"], 3, 0, tk.E]):
+            temp = tk.Label(self._window, text=text, bg="black", fg="white",
+                            font=self._font)
+            temp.grid(row=row, column=column, sticky=sticky)
+            outputs.update({key: temp})
+        return outputs
+
+    def _show_layout(self, key):
+        """ hide the shown layout and show another one. a layout is built the
+        first time it is shown, later it keeps its widgets and positions
+        input: key:str, name of the layout, see GuiModel.layout() """
+        if key == self._layout:
+            return
+        if self._layout is not None:
+            for widgets in self._layouts[self._layout].values():
+                for field in widgets.values():
+                    field.grid_remove()
+        if key in self._layouts:
+            for widgets in self._layouts[key].values():
+                for field in widgets.values():
+                    field.grid()
+        else:
+            self._layouts[key] = self._build_layout(key)
+        self._layout = key
+
+        layout = self._layouts[key]
+        self._text_outputs = dict(self._common_outputs, **layout["outputs"])
+        self._text_inputs = {"hero_input": self._perm_input_hero,
+                             "test_input": self._perm_input_test}
+        self._text_inputs.update(layout["inputs"])
+        self._buttons = layout["buttons"]
+
+    def _build_layout(self, key):
+        """ create the widgets of a layout
+        input: key:str, name of the layout, see GuiModel.layout()
+        output: dict, "outputs", "inputs" and "buttons" widget dicts, the
+                input screen also has "lists" with the match list """
 
         format_dict = {"none": self._setup_input_screen,
                        "special_skill": self._setup_special_skill_screen,
                        "attr": self._setup_attr_screen,
-                       "fight_talent": self._setup_attr_screen,
                        "skill": self._setup_skill_screen,
-                       "spell": self._setup_skill_screen,
                        "misc": self._setup_misc_screen}
-
-        self._text_outputs.clear()
-        self._text_inputs.clear()
-        self._buttons.clear()
-
-        if self._state.selection is None:
-            key = "none"
-        # if an advantage has a value it can be tested, otherwise just show
-        # it like a special talent
-        elif self._state.selection.category == "advantage":
-            if self._state.selection.value is None:
-                key = "special_skill"
-            else:
-                key = "attr"
-        else:
-            key = self._state.selection.category
-
         outputs, inputs, buttons = format_dict[key]()
+        layout = {"outputs": {}, "inputs": {}, "buttons": {}}
+        # the matching entries are only listed on the input screen
+        if key == "none":
+            self._match_list = MatchList(self._window, MATCH_ROWS, self._font,
+                                         self._select_match)
+            self._match_list.frame.grid(row=5, column=1, sticky=tk.W)
+            layout["lists"] = {"matches": self._match_list.frame}
 
         # set up outputs dictionary
         for _, value in enumerate(outputs):
@@ -458,11 +554,7 @@ class GUI:
                             font=self._font)
             temp.grid(row=row, column=column, sticky=sticky)
 
-            self._text_outputs.update({key: temp})
-
-        # set up inputs dictionary
-        self._text_inputs.update({"hero_input": self._perm_input_hero})
-        self._text_inputs.update({"test_input": self._perm_input_test})
+            layout["outputs"].update({key: temp})
 
         for _, value in enumerate(inputs):
             key = value[0]
@@ -474,7 +566,7 @@ class GUI:
             temp = tk.Entry(self._window, width=width, bg="white")
             temp.grid(row=row, column=column, sticky=sticky)
 
-            self._text_inputs.update({key: temp})
+            layout["inputs"].update({key: temp})
 
         # set up button dictionary
         for _, value in enumerate(buttons):
@@ -494,7 +586,9 @@ class GUI:
             else:
                 temp.grid(row=row, column=column)
 
-            self._buttons.update({key: temp})
+            layout["buttons"].update({key: temp})
+
+        return layout
 
     def _setup_input_screen(self):
         """ create tkinter widgets for the input screen, when
@@ -503,13 +597,7 @@ class GUI:
                 inputs:list
                 buttons:list """
 
-        outputs = [["roll_nr", self._lang["roll_nr"], 0, 0, tk.E],
-                   ["var_roll_nr", '', 0, 1, tk.W],
-                   ["hero_prompt", self._lang["hero_file"], 1, 0, tk.E],
-                   ["matching_hero", self._lang["hero_match"], 2, 0, tk.E],
-                   ["var_matching_hero", '', 2, 1, tk.W],
-                   ["input_prompt", self._lang["input"], 3, 0, tk.E],
-                   ["matching", self._lang["matching"], 4, 0, tk.NE],
+        outputs = [["matching", self._lang["matching"], 4, 0, tk.NE],
                    ["var_matching", '', 4, 1, tk.W]]
 
         inputs = []
@@ -519,18 +607,12 @@ class GUI:
 
     def _setup_attr_screen(self):
         """ create tkinter widgets for the attribute test screen, when
-        GameState.category is attr
+        GameState.category is attr, fight_talent or a tested advantage
         output: outputs:list
                 inputs:list
                 buttons:list """
 
-        outputs = [["roll_nr", self._lang["roll_nr"], 0, 0, tk.E],
-                   ["var_roll_nr", '', 0, 1, tk.W],
-                   ["hero_prompt", self._lang["hero_file"], 1, 0, tk.E],
-                   ["matching_hero", self._lang["hero_match"], 2, 0, tk.E],
-                   ["var_matching_hero", '', 2, 1, tk.W],
-                   ["input_prompt", self._lang["input"], 3, 0, tk.E],
-                   ["matching", self._lang["matching"], 4, 0, tk.E],
+        outputs = [["matching", self._lang["matching"], 4, 0, tk.E],
                    ["var_matching", '', 4, 1, tk.W],
                    ["mod", self._lang["mod"], 5, 0, tk.E],
                    ["var_tested", '', 8, 1, tk.W],
@@ -542,12 +624,9 @@ class GUI:
                    ["var_result", '', 12, 1, tk.W],
                    ["desc", self._lang["gui_desc"], 13, 0, tk.E]]
 
-        if self._state.selection.category == "attr":
-            outputs.append(["tested", self._lang["test_attr"], 8, 0, tk.E])
-        elif self._state.selection.category == "fight_talent":
-            outputs.append(["tested", self._lang["test_fight"], 8, 0, tk.E])
-        elif self._state.selection.category == "advantage":
-            outputs.append(["tested", self._lang["test_adv"], 8, 0, tk.E])
+        # attributes, fight talents and advantages share this layout, the
+        # text of this label is set for the selected category
+        outputs.append(["tested", '', 8, 0, tk.E])
 
         if self._state.dice == "manual":
             outputs.append(["dice_input", self._lang["gui_manual"], 6, 0, tk.E])
@@ -579,13 +658,7 @@ class GUI:
                 inputs:list
                 buttons:list """
 
-        outputs = [["roll_nr", self._lang["roll_nr"], 0, 0, tk.E],
-                   ["var_roll_nr", '', 0, 1, tk.W],
-                   ["hero_prompt", self._lang["hero_file"], 1, 0, tk.E],
-                   ["matching_hero", self._lang["hero_match"], 2, 0, tk.E],
-                   ["var_matching_hero", '', 2, 1, tk.W],
-                   ["input_prompt", self._lang["input"], 3, 0, tk.E],
-                   ["matching", self._lang["matching"], 4, 0, tk.E],
+        outputs = [["matching", self._lang["matching"], 4, 0, tk.E],
                    ["var_matching", '', 4, 1, tk.W],
                    ["mod", self._lang["mod"], 5, 0, tk.E],
                    ["var_tested", '', 8, 1, tk.W],
@@ -604,10 +677,9 @@ class GUI:
         if self._state.dice == "manual":
             outputs.append(["dice_input", self._lang["gui_manual"], 6, 0, tk.E])
 
-        if self._state.selection.category == "skill":
-            outputs.append(["tested", self._lang["test_skill"], 8, 0, tk.E])
-        elif self._state.selection.category == "spell":
-            outputs.append(["tested", self._lang["test_spell"], 8, 0, tk.E])
+        # skills and spells share this layout, the text of this label is set
+        # for the selected category
+        outputs.append(["tested", '', 8, 0, tk.E])
 
         # pressing the tab key while inside a text entry jumps to the next one
         # in the list. because of this, this list has to be created in the
@@ -636,13 +708,7 @@ class GUI:
                 inputs:list
                 buttons:list """
 
-        outputs = [["roll_nr", self._lang["roll_nr"], 0, 0, tk.E],
-                   ["var_roll_nr", '', 0, 1, tk.W],
-                   ["hero_prompt", self._lang["hero_file"], 1, 0, tk.E],
-                   ["matching_hero", self._lang["hero_match"], 2, 0, tk.E],
-                   ["var_matching_hero", '', 2, 1, tk.W],
-                   ["input_prompt", self._lang["input"], 3, 0, tk.E],
-                   ["rolls", self._lang["test_dice"], 6, 0, tk.E],
+        outputs = [["rolls", self._lang["test_dice"], 6, 0, tk.E],
                    ["var_rolls", '', 6, 1, tk.W],
                    ["result", self._lang["dice_sum"], 7, 0, tk.E],
                    ["var_result", '', 7, 1, tk.W],
@@ -672,13 +738,7 @@ class GUI:
                 inputs:list
                 buttons:list """
 
-        outputs = [["roll_nr", self._lang["roll_nr"], 0, 0, tk.E],
-                   ["var_roll_nr", '', 0, 1, tk.W],
-                   ["hero_prompt", self._lang["hero_file"], 1, 0, tk.E],
-                   ["matching_hero", self._lang["hero_match"], 2, 0, tk.E],
-                   ["var_matching_hero", '', 2, 1, tk.W],
-                   ["input_prompt", self._lang["input"], 3, 0, tk.E],
-                   ["matching", self._lang["matching"], 4, 0, tk.E],
+        outputs = [["matching", self._lang["matching"], 4, 0, tk.E],
                    ["var_matching", '', 4, 1, tk.W]]
 
         # pressing the tab key while inside a text entry jumps to the next one
@@ -0,0 +1,184 @@
+""" file that holds the MatchList class, a scrollable list of matching hero
+entries for the GUI """
+import tkinter as tk
+
+
+class MatchList:
+    """
+    Scrollable list that only has one label per visible row. Scrolling and
+    new items only change the texts of these labels, so showing 5 or 5000
+    matching entries costs the same
+
+    ...
+
+    Attributes
+    ----------
+    frame: tkinter.Frame
+        holds the row labels and the scrollbar, placed by the GUI
+    _labels: list
+        one tkinter.Label per visible row
+    _scrollbar: tkinter.Scrollbar
+        shows and changes which part of the items is visible
+    _on_select: callable
+        called with the index of an item when it is chosen
+    _items: list
+        all items, only the visible ones are formatted
+    _format_item: callable
+        turns an item into the text of its row
+    _top: int
+        index of the item in the first row
+    _active: int
+        index of the highlighted item, chosen by the return key
+    _shown: list
+        (text, highlighted) of every row, to only configure changed rows
+
+    Methods
+    -------
+    set_items(items, format_item):
+        Show new items, scrolled to the top.
+    move(step):
+        Move the highlight by step items and scroll it into view.
+    page(pages):
+        Move the highlight by whole pages.
+    choose():
+        Choose the highlighted item.
+    _click(row):
+        Highlight and choose the item of a clicked row.
+    _wheel(event):
+        Scroll with the mouse wheel.
+    _yview(*args):
+        Scroll as the scrollbar asks for.
+    _render():
+        Update the texts of the rows and the scrollbar.
+    """
+
+    def __init__(self, master, rows, font, on_select):
+        """
+        Parameters:
+            master (tkinter.Tk): window the list is placed in
+
+            rows (int): number of visible rows
+
+            font (str): font of the row labels
+
+            on_select (callable): gets the index of a chosen item
+        """
+        self.frame = tk.Frame(master, bg="black")
+        self._on_select = on_select
+        self._items = []
+        self._format_item = str
+        self._top = 0
+        self._active = 0
+        self._shown = [None] * rows
+
+        self._labels = []
+        for row in range(rows):
+            label = tk.Label(self.frame, text='', bg="black", fg="white",
+                             font=font, anchor=tk.W)
+            label.grid(row=row, column=0, sticky=tk.W + tk.E)
+            # the row is bound, not the item, the item of a row changes when
+            # scrolling
+            label.bind("<Button-1>", lambda _, index=row: self._click(index))
+            # windows and macOS send MouseWheel, X11 sends buttons 4 and 5
+            label.bind("<MouseWheel>", self._wheel)
+            label.bind("<Button-4>", self._wheel)
+            label.bind("<Button-5>", self._wheel)
+            self._labels.append(label)
+
+        self._scrollbar = tk.Scrollbar(self.frame, orient=tk.VERTICAL,
+                                       command=self._yview)
+        self._scrollbar.grid(row=0, column=1, rowspan=rows,
+                             sticky=tk.N + tk.S)
+
+    def set_items(self, items, format_item):
+        """ show new items, scrolled to the top with the first one
+        highlighted
+        input: items:list
+               format_item:callable, item -> str """
+        self._items = items
+        self._format_item = format_item
+        self._top = 0
+        self._active = 0
+        self._render()
+
+    def move(self, step):
+        """ move the highlight by step items and scroll it into view
+        input: step:int, negative moves up """
+        if not self._items:
+            return
+        self._active = max(0, min(len(self._items) - 1, self._active + step))
+        if self._active < self._top:
+            self._top = self._active
+        elif self._active >= self._top + len(self._labels):
+            self._top = self._active - len(self._labels) + 1
+        self._render()
+
+    def page(self, pages):
+        """ move the highlight by whole pages
+        input: pages:int, negative moves up """
+        self.move(pages * len(self._labels))
+
+    def choose(self):
+        """ choose the highlighted item
+        output: bool, False if there is nothing to choose """
+        if not self._items:
+            return False
+        self._on_select(self._active)
+        return True
+
+    def _click(self, row):
+        """ highlight and choose the item of a clicked row
+        input: row:int, index of the label """
+        if self._top + row < len(self._items):
+            self._active = self._top + row
+            self._render()
+            self.choose()
+
+    def _wheel(self, event):
+        """ scroll 3 rows per step of the mouse wheel
+        input: event:tkinter.Event """
+        if event.num == 4 or event.delta > 0:
+            self._scroll_to(self._top - 3)
+        else:
+            self._scroll_to(self._top + 3)
+
+    def _yview(self, *args):
+        """ scroll as the scrollbar asks for
+        input: args: ("moveto", fraction) or ("scroll", count, "units" or
+                     "pages") """
+        if args[0] == "moveto":
+            self._scroll_to(int(float(args[1]) * len(self._items)))
+        elif args[0] == "scroll":
+            count = int(args[1])
+            if args[2] == "pages":
+                count *= len(self._labels)
+            self._scroll_to(self._top + count)
+
+    def _scroll_to(self, top):
+        """ show the items from top on, the highlight stays on its item
+        input: top:int, index of the item in the first row """
+        last_top = max(0, len(self._items) - len(self._labels))
+        self._top = max(0, min(last_top, top))
+        self._render()
+
+    def _render(self):
+        """ update the texts of the rows that changed and the scrollbar """
+        for row, label in enumerate(self._labels):
+            index = self._top + row
+            if index < len(self._items):
+                shown = (self._format_item(self._items[index]),
+                         index == self._active)
+            else:
+                shown = ('', False)
+            if self._shown[row] != shown:
+                self._shown[row] = shown
+                label.configure(text=shown[0],
+                                bg="white" if shown[1] else "black",
+                                fg="black" if shown[1] else "white")
+
+        if self._items:
+            self._scrollbar.set(self._top / len(self._items),
+                                min(1.0, (self._top + len(self._labels)) /
+                                    len(self._items)))
+        else:
+            self._scrollbar.set(0.0, 1.0)
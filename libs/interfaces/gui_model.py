@@ -0,0 +1,245 @@
+""" file that holds the GuiModel class, the part of the GUI that decides what
+is shown without needing tkinter """
+from libs.backend.dsa_game import GameState
+
+# labels that show the current test, they are emptied when the test input
+# changes
+RESULT_KEYS = ("var_matching", "var_tested", "var_tested_attrs", "var_value",
+               "var_rolls", "var_remaining", "var_result")
+
+# text of the "tested" label per test category
+TESTED_LABELS = {"attr": "test_attr",
+                 "fight_talent": "test_fight",
+                 "advantage": "test_adv",
+                 "skill": "test_skill",
+                 "spell": "test_spell"}
+
+
+class GuiModel:
+    """
+    View-model of the GUI. Turns user input into the layout that has to be
+    shown and the text of its labels, so the GUI only has to apply them. It
+    doesn't use tkinter and can be driven headless
+
+    ...
+
+    Attributes
+    ----------
+    state: libs.backend.dsa_game.GameState
+        contains user input, selected test, rolls, result. the GUI holds the
+        same object
+    _game: libs.backend.dsa_game.GameLogic
+        does all the DSA game mechanics
+    _lang: dict
+        dictionary holding all strings that will be printed
+    _hero_list: list
+        names of all heroes, the hero files don't change while the GUI runs
+    _old_hero: str
+        hero selected before the last hero input
+
+    Methods
+    -------
+    layout():
+        Name of the screen layout for the current selection.
+    hero_input(hero_input):
+        Select the hero matching the hero input, return the label texts.
+    test_input(test_input):
+        Match the test input with the hero entries, return the label texts.
+    search(hero, test_input):
+        Match a test input without changing the state, can run on another
+        thread.
+    apply_search(found):
+        Take the result of search() into the state, return the label texts.
+    options():
+        All entries matching the test input.
+    option_text(option):
+        Text of one matching entry in the match list.
+    select_option(index):
+        Use one of the matching entries for the test, return the label texts.
+    test():
+        Run the selected test, return the label texts of the result.
+    """
+
+    def __init__(self, game, state, lang):
+        self.state = state
+        self._game = game
+        self._lang = lang
+        self._hero_list = None
+        self._old_hero = None
+
+    def layout(self):
+        """ name of the screen layout for the current selection. attribute,
+        fight talent and advantage tests share one layout, skill and spell
+        tests share another
+        output: str, "none", "special_skill", "attr", "skill" or "misc" """
+        selection = self.state.selection
+        if selection is None:
+            return "none"
+        # if an advantage has a value it can be tested, otherwise just show
+        # it like a special talent
+        if selection.category == "advantage":
+            if selection.value is None:
+                return "special_skill"
+            return "attr"
+        if selection.category in ("fight_talent", "attr"):
+            return "attr"
+        if selection.category in ("skill", "spell"):
+            return "skill"
+        return selection.category
+
+    def _reset_texts(self):
+        """ label texts of a screen without a test result
+        output: texts:dict, label key -> text """
+        texts = dict.fromkeys(RESULT_KEYS, '')
+        texts["var_matching_hero"] = self.state.current_hero
+        if self.state.selection is not None and \
+                self.state.selection.category in TESTED_LABELS:
+            texts["tested"] = self._lang[TESTED_LABELS[
+                self.state.selection.category]]
+        return texts
+
+    def hero_input(self, hero_input):
+        """ gets all available heroes from GameLogic and looks for a match. if
+        only one hero matches the input, this hero is selected for the test.
+        if the selected hero changed, the screen is reset
+        input: hero_input:str, text of the hero input field
+        output: (changed, texts):tuple, changed is True if the screen has to
+                be reset, texts maps label keys to text """
+        if self._hero_list is None:
+            self._hero_list = self._game.get_hero_list()
+        hero_input = hero_input.lower()
+        temp_list = [i for i in self._hero_list if hero_input in i.lower()]
+        if len(temp_list) == 1:
+            self.state.current_hero = temp_list[0]
+
+        if self._old_hero == self.state.current_hero:
+            return False, {"var_matching_hero": self.state.current_hero}
+        self._old_hero = self.state.current_hero
+        self.state.result = None
+        self.state.selection = None
+        self.state.option_list = None
+        return True, self._reset_texts()
+
+    def test_input(self, test_input):
+        """ calls GameLogic.match_test_input(), then (based on the current
+        test category) matching entries or the selected entry are shown
+        input: test_input:str, text of the test input field
+        output: texts:dict, label key -> text """
+        return self.apply_search(self.search(self.state.current_hero,
+                                             test_input))
+
+    def search(self, hero, test_input):
+        """ match a test input with the entries of a hero. works on its own
+        GameState, so the GUI can run it on a worker thread while the user
+        keeps typing
+        input: hero:str, name of the hero
+               test_input:str, text of the test input field
+        output: found:GameState, test_input, option_list, selection and, for
+                misc tests, mod are set """
+        found = GameState(current_hero=hero, test_input=test_input.lower())
+        if found.test_input == '':
+            return found
+        found = self._game.match_test_input(found)
+
+        # if input is no misc roll
+        if found.selection is None:
+            # if just 1 entry matches, this entry is used for the current
+            # test
+            if len(found.option_list) == 1:
+                found.selection = found.option_list[0]
+            # if more than 1 entries match but 1 entry matches the user input
+            # exactly, this entry is used for the current test
+            elif found.option_list and found.test_input == \
+                    found.option_list[0].name.lower():
+                found.selection = found.option_list[0]
+        return found
+
+    def apply_search(self, found):
+        """ take the result of search() into the state
+        input: found:GameState, created by search()
+        output: texts:dict, label key -> text """
+        state = self.state
+        state.test_input = found.test_input
+        state.option_list = found.option_list
+        state.selection = found.selection
+        if found.selection is not None and found.selection.category == "misc":
+            state.mod = found.mod
+        state.result = None
+
+        texts = self._reset_texts()
+        if state.selection is None:
+            # only the number of matching entries, the entries themselves are
+            # shown by the match list
+            texts["var_matching"] = '' if state.option_list is None else \
+                str(len(state.option_list)) + " matches"
+        elif state.selection.category != "misc":
+            texts["var_matching"] = state.selection.name
+        return texts
+
+    def options(self):
+        """ all entries matching the test input, in the order of
+        GameLogic.match_test_input()
+        output: list, empty if there is no test input """
+        return self.state.option_list or []
+
+    def option_text(self, option):
+        """ text of one matching entry in the match list, the match list only
+        formats the entries it shows
+        input: option:libs.backend.dsa_data entry
+        output: str, e.g. "Klettern (skill)" """
+        return "{0} ({1})".format(option.name, self._lang[option.category])
+
+    def select_option(self, index):
+        """ use one of the matching entries for the test, e.g. when it is
+        clicked in the match list
+        input: index:int, position in options()
+        output: texts:dict, label key -> text """
+        self.state.selection = self.options()[index]
+        self.state.result = None
+        texts = self._reset_texts()
+        texts["var_matching"] = self.state.selection.name
+        return texts
+
+    def test(self):
+        """ calls GameLogic.test and formats the result. modifier and manual
+        dice have to be in the state already
+        output: texts:dict, label key -> text, None if the test could not be
+                done """
+        state = self.state = self._game.test(self.state)
+
+        if state.result is None or state.rolls is None:
+            return None
+
+        rolls = ", ".join(map(str, state.rolls))
+        category = state.selection.category
+
+        if category == "misc":
+            return {"var_rolls": rolls, "var_result": str(state.result)}
+
+        if category in ("attr", "fight_talent", "advantage"):
+            return {"var_tested": state.selection.name,
+                    "var_value": str(state.selection.value),
+                    "var_rolls": str(state.rolls[0]),
+                    "var_result": str(state.result)}
+
+        # if a negative modifier changed the attribute values, this change has
+        # to be shown on screen
+        if state.mod + state.selection.value < 0:
+            # value string example "8 -> 5"
+            value_string = str(state.selection.value) + " -> " + \
+                str(state.selection.value + state.mod)
+            # attrs_string example: "KL(14->12), IN(13->11), FF(12->10)"
+            attrs_list = [i.abbr + '(' + str(i.value) + "->" +
+                          str(i.modified) + ')' for i in state.attrs]
+        else:
+            attrs_list = [i.abbr + '(' + str(i.value) + ')' for i in
+                          state.attrs]
+            value_string = str(state.selection.value)
+
+        return {"var_tested": state.selection.name,
+                "var_tested_attrs": ", ".join(attrs_list),
+                "var_value": value_string,
+                "var_rolls": rolls,
+                "var_remaining": ", ".join(str(i.remaining) for i in
+                                           state.attrs),
+                "var_result": str(state.result)}
@@ -0,0 +1,126 @@
+""" file that holds the LatestSearch class, runs the GUI's searches on a
+worker thread """
+import threading
+
+
+class LatestSearch:
+    """
+    Runs a search function on one worker thread. Only the latest query
+    matters: a new query replaces a query that didn't start yet, and the
+    result of an outdated query is dropped
+
+    ...
+
+    Attributes
+    ----------
+    _search: callable
+        the search, called with the arguments of a query
+    _condition: threading.Condition
+        guards all other attributes and wakes up the worker
+    _generation: int
+        number of the latest query, increased by submit() and cancel()
+    _query: tuple
+        (generation, args) of the query that waits for the worker, None if
+        there is none
+    _running: bool
+        True while the worker runs a search
+    _result: tuple
+        (generation, value, error) of the last finished search
+    _closed: bool
+        True after close()
+    _thread: threading.Thread
+        the worker
+
+    Methods
+    -------
+    submit(*args):
+        Search with new arguments, outdated queries are dropped.
+    cancel():
+        Drop the waiting query and the result of the running one.
+    pending():
+        True if the latest query didn't finish yet.
+    pop_result():
+        Take the result of the latest query if it is done.
+    close():
+        Stop the worker.
+    _run():
+        Loop of the worker thread.
+    """
+
+    def __init__(self, search):
+        self._search = search
+        self._condition = threading.Condition()
+        self._generation = 0
+        self._query = None
+        self._running = False
+        self._result = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="search",
+                                        daemon=True)
+        self._thread.start()
+
+    def submit(self, *args):
+        """ search with new arguments. a query that waits for the worker is
+        replaced, the result of a running one will be dropped
+        input: args: passed on to the search function """
+        with self._condition:
+            self._generation += 1
+            self._query = (self._generation, args)
+            self._condition.notify()
+
+    def cancel(self):
+        """ drop the waiting query and the result of the running one """
+        with self._condition:
+            self._generation += 1
+            self._query = None
+
+    def pending(self):
+        """ if the latest query didn't finish yet
+        output: bool """
+        with self._condition:
+            return self._query is not None or self._running
+
+    def pop_result(self):
+        """ take the result of the latest query if it is done. errors of the
+        search are raised here, on the thread that asks
+        output: result of the search function, None if there is no new
+                result """
+        with self._condition:
+            result = self._result
+            self._result = None
+        if result is None or result[0] != self._generation:
+            return None
+        if result[2] is not None:
+            raise result[2]
+        return result[1]
+
+    def close(self):
+        """ stop the worker, a running search is finished first """
+        with self._condition:
+            self._closed = True
+            self._query = None
+            self._condition.notify()
+        self._thread.join()
+
+    def _run(self):
+        """ loop of the worker thread, always runs the newest query """
+        while True:
+            with self._condition:
+                while self._query is None and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    return
+                generation, args = self._query
+                self._query = None
+                self._running = True
+
+            value, error = None, None
+            try:
+                value = self._search(*args)
+            except Exception as search_error:  # pylint: disable=broad-except
+                error = search_error
+
+            with self._condition:
+                self._running = False
+                if generation == self._generation:
+                    self._result = (generation, value, error)
@@ -36,6 +36,17 @@ english = {"too_many_dice": "Too many dice to roll",
            "gui_manual": "Manual dice input: ",
            "button_test": "Test",
            "button_save": "Save",
+           "save_busy": "Saving is behind, try again",
+           "save_error": "Could not save rolls: ",
+           "torn_row": "Removed incomplete last row of ",
+           "header_upgraded": "Added the column \"Critical rules\" to ",
+           "format_mismatch": "{0} is a {1} file, but the output format is "
+                              "{2}. Choose another output file in "
+                              "config.txt",
+           "metrics_off": "Metrics are turned off, see config.txt",
+           "party_header": "Rank\tHero\tValue\tAttributes\tDice\tResult"
+                           "\tChance",
+           "party_none": "No hero can test this entry",
            "attr": "attribute",
            "fight_talent": "fight talent",
            "skill": "skill",
@@ -81,6 +92,17 @@ german = {"too_many_dice": "Zu viele Würfel",
           "gui_manual": "Manuelle Würfeleingabe: ",
           "button_test": "Testen",
           "button_save": "Speichern",
+          "save_busy": "Speichern hängt hinterher, nochmal versuchen",
+          "save_error": "Würfe konnten nicht gespeichert werden: ",
+          "torn_row": "Unvollständige letzte Zeile entfernt aus ",
+          "header_upgraded": "Spalte \"Critical rules\" hinzugefügt in ",
+          "format_mismatch": "{0} ist eine {1}-Datei, das Ausgabeformat ist "
+                             "aber {2}. Wähle in config.txt eine andere "
+                             "Ausgabedatei",
+          "metrics_off": "Messungen sind ausgeschaltet, siehe config.txt",
+          "party_header": "Rang\tHeld\tWert\tEigenschaften\tWürfel"
+                          "\tResultat\tChance",
+          "party_none": "Kein Held kann diesen Eintrag testen",
           "attr": "Attribut",
           "fight_talent": "Kampftechnik",
           "skill": "Talent",
@@ -0,0 +1,196 @@
+""" benchmark suite for the hot paths of DSATester. runs against the bundled
+hero files and against synthetic heroes with thousands of entries, stores
+the timings as json baseline and fails if a hot path got slower than the
+baseline allows """
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+from libs.backend.dsa_game import GameLogic, GameState
+from libs.languages.languages import english
+from libs.tools.binlog_tool import generate_rows
+from libs.tools.hero_generator import generate_hero
+from libs.tools.result_stats import group_stats
+
+# where the baseline is stored if no other path is given. timings depend on
+# the machine, so every machine keeps its own baseline
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "benchmark_baseline.json")
+
+# what a user types letter by letter to test autocomplete
+TYPED_INPUT = "sinnenschärfe"
+
+
+def time_call(function, repeat=7, min_time=0.1):
+    """ best time per call out of several rounds, every round calls the
+    function often enough to take at least min_time
+    input: function:callable, takes no arguments
+           repeat:int, rounds
+           min_time:float, seconds per round
+    output: float, seconds per call """
+    # like timeit, garbage collection would only add noise
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return _time_rounds(function, repeat, min_time)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+def _time_rounds(function, repeat, min_time):
+    """ timing loop of time_call() """
+    calls = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(calls):
+            function()
+        duration = time.perf_counter() - start
+        if duration >= min_time:
+            break
+        calls *= 2
+    best = duration / calls
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(calls):
+            function()
+        best = min(best, (time.perf_counter() - start) / calls)
+    return best
+
+
+def run_suite(hero_folder, output_file, prefix):
+    """ time all hot paths with the heroes of one folder
+    input: hero_folder:str
+           output_file:str, csv file the save benchmark writes to
+           prefix:str, put in front of every benchmark name
+    output: timings:dict, name -> seconds per call """
+    configs = {"output file": output_file, "hero folder": hero_folder}
+    timings = {}
+
+    timings["start"] = time_call(lambda: GameLogic(configs, english),
+                                 repeat=3)
+    # hero files are parsed on first use, this parses all of them
+    timings["load_heroes"] = time_call(
+        lambda: list(GameLogic(configs, english)._heroes.values()), repeat=3)
+    game = GameLogic(configs, english)
+    hero = game.get_hero_list()[0]
+
+    def keystrokes():
+        state = GameState(current_hero=hero)
+        for end in range(1, len(TYPED_INPUT) + 1):
+            state.test_input = TYPED_INPUT[:end]
+            game.autocomplete(state)
+
+    timings["autocomplete_keystroke"] = time_call(keystrokes) / len(
+        TYPED_INPUT)
+
+    match_state = GameState(current_hero=hero, test_input="klettern")
+    timings["match_test_input"] = time_call(
+        lambda: game.match_test_input(match_state))
+    misc_state = GameState(current_hero=hero, test_input="3w20+2")
+    timings["match_test_input_misc"] = time_call(
+        lambda: game.match_test_input(misc_state))
+
+    heroes = game._heroes[hero]
+    attr_state = GameState(dice="auto", current_hero=hero, mod=0,
+                           selection=heroes.attrs[0])
+    timings["test_1dice"] = time_call(lambda: game._test_1dice(attr_state))
+    skill_state = GameState(dice="auto", current_hero=hero, mod=-3,
+                            selection=heroes.skills[0])
+    timings["test_3dice"] = time_call(lambda: game._test_3dice(skill_state))
+    misc_state = game.match_test_input(misc_state)
+    misc_state.dice = "auto"
+    timings["test_misc"] = time_call(lambda: game._test_misc(misc_state))
+
+    skill_state = game._test_3dice(skill_state)
+    skill_state.desc = "benchmark"
+    timings["save_to_csv"] = time_call(lambda: game.save_to_csv(skill_state))
+
+    return {prefix + name: value for name, value in timings.items()}
+
+
+def run_analysis(row_count=20000):
+    """ time the grouped statistics over generated result rows
+    input: row_count:int
+    output: timings:dict, name -> seconds per row """
+    rows = generate_rows(row_count)
+    return {"analysis_group_stats_row": time_call(
+        lambda: group_stats(rows, ["hero", "entry"]), repeat=3) / row_count}
+
+
+def compare(timings, baseline, threshold):
+    """ find the benchmarks that got slower than the baseline allows
+    input: timings:dict
+           baseline:dict
+           threshold:float, e.g. 0.5 allows 50% more time
+    output: regressions:list of (name, baseline, current) """
+    regressions = []
+    for name, value in sorted(timings.items()):
+        if name in baseline and value > baseline[name] * (1 + threshold):
+            regressions.append((name, baseline[name], value))
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--hero-folder", default="hero_files")
+    parser.add_argument("--scale", type=int, nargs="*", default=[1000, 5000],
+                        help="entry counts of the synthetic heroes")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="store this run as new baseline")
+    parser.add_argument("--threshold", type=float, default=0.5,
+                        help="allowed slowdown against the baseline")
+    args = parser.parse_args()
+
+    work_folder = tempfile.mkdtemp()
+    try:
+        results = run_suite(args.hero_folder,
+                            os.path.join(work_folder, "bundled.csv"),
+                            "bundled.")
+        for scale in args.scale:
+            folder = os.path.join(work_folder, str(scale))
+            os.makedirs(folder)
+            # three quarters skills, one quarter spells, always the same hero
+            with open(os.path.join(folder, "synthetic.xml"), "w",
+                      encoding="utf-8") as hero_file:
+                hero_file.write(generate_hero(
+                    0, 1, skills=scale - scale // 4, spells=scale // 4,
+                    sinnenschaerfe=1, attributo=1))
+            results.update(run_suite(folder, os.path.join(
+                work_folder, str(scale) + ".csv"), str(scale) + "."))
+        results.update(run_analysis())
+    finally:
+        shutil.rmtree(work_folder)
+
+    baseline_timings = {}
+    if os.path.isfile(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as baseline_file:
+            baseline_timings = json.load(baseline_file)["timings"]
+
+    for key, seconds in sorted(results.items()):
+        old = baseline_timings.get(key)
+        change = "" if old is None else "{0:+7.1f}%".format(
+            100 * (seconds / old - 1))
+        print("{0:40s} {1:12.2f} us {2}".format(key, 1e6 * seconds, change))
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as baseline_file:
+            json.dump({"python": platform.python_version(),
+                       "machine": platform.machine(),
+                       "timings": results}, baseline_file, indent=1,
+                      sort_keys=True)
+        print("saved baseline " + args.baseline)
+    else:
+        slower = compare(results, baseline_timings, args.threshold)
+        for key, old, new in slower:
+            print("REGRESSION {0}: {1:.2f} us -> {2:.2f} us".format(
+                key, 1e6 * old, 1e6 * new))
+        if slower:
+            sys.exit(1)
@@ -0,0 +1,108 @@
+""" export a binary result log as output csv file, or compare size and
+read/write throughput of the binary log with the csv file """
+import argparse
+import csv
+import os
+import random
+import tempfile
+import time
+
+from libs.backend.dsa_binlog import BinaryResultLog
+from libs.backend.dsa_game import COLUMNS
+
+
+def generate_rows(row_count, seed=1):
+    """ create rows that look like the ones GameLogic.make_row() creates
+    input: row_count:int
+           seed:int
+    output: rows:list """
+    rng = random.Random(seed)
+    skills = ["Klettern", "Schwimmen", "Zechen", "Sinnenschärfe",
+              "Menschenkenntnis", "Wildnisleben"]
+    rows = []
+    for i in range(row_count):
+        if rng.random() < 0.2:
+            rows.append([f"{rng.randint(1, 20):02d}_hero.xml", "attr", "Mut",
+                         '', 12, rng.randint(-5, 5), '',
+                         str(rng.randint(1, 20)), rng.randint(-10, 10),
+                         f"Roll#{i + 1}: generated", "2020-09-11T11:06:21",
+                         "auto", "none"])
+        else:
+            rolls = [rng.randint(1, 20) for _ in range(3)]
+            rows.append([f"{rng.randint(1, 20):02d}_hero.xml", "skill",
+                         rng.choice(skills), '', rng.randint(0, 15),
+                         rng.randint(-5, 5), "KL(12); IN(13); CH(11)",
+                         "; ".join(map(str, rolls)), rng.randint(-10, 10),
+                         f"Roll#{i + 1}: generated", "2020-09-11T11:06:21",
+                         "auto", "none"])
+    return rows
+
+
+def compare(row_count):
+    """ write and read row_count rows as csv and as binary log and print
+    size per row and throughput
+    input: row_count:int """
+    rows = generate_rows(row_count)
+    with tempfile.TemporaryDirectory() as folder:
+        csv_path = os.path.join(folder, "output.csv")
+        log_path = os.path.join(folder, "output.dsalog")
+
+        start = time.perf_counter()
+        with open(csv_path, "w", encoding="utf-8", newline='') as csv_file:
+            file_writer = csv.writer(csv_file, delimiter=',', quotechar='|',
+                                     quoting=csv.QUOTE_MINIMAL)
+            file_writer.writerow(COLUMNS)
+            file_writer.writerows(rows)
+        csv_write = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with open(csv_path, "r", encoding="utf-8", newline='') as csv_file:
+            csv_read_count = sum(1 for _ in csv.reader(
+                csv_file, delimiter=',', quotechar='|')) - 1
+        csv_read = time.perf_counter() - start
+
+        start = time.perf_counter()
+        log = BinaryResultLog(log_path)
+        log.write_rows(rows)
+        log_write = time.perf_counter() - start
+
+        start = time.perf_counter()
+        log_read_count = sum(1 for _ in log.read_records())
+        log_read = time.perf_counter() - start
+
+        start = time.perf_counter()
+        log_rows_count = sum(1 for _ in log.read_rows())
+        log_rows = time.perf_counter() - start
+
+        assert csv_read_count == log_read_count == log_rows_count == \
+            row_count
+
+        csv_size = os.path.getsize(csv_path)
+        log_size = os.path.getsize(log_path) + \
+            os.path.getsize(log_path + ".str")
+    print("{0:24s} {1:>12s} {2:>14s} {3:>14s}".format(
+        "", "bytes/row", "write rows/s", "read rows/s"))
+    print("{0:24s} {1:12.1f} {2:14.0f} {3:14.0f}".format(
+        "csv", csv_size / row_count, row_count / csv_write,
+        row_count / csv_read))
+    print("{0:24s} {1:12.1f} {2:14.0f} {3:14.0f}".format(
+        "binary (records)", log_size / row_count, row_count / log_write,
+        row_count / log_read))
+    print("{0:24s} {1:12s} {2:14s} {3:14.0f}".format(
+        "binary (csv rows)", '', '', row_count / log_rows))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--export", nargs=2, metavar=("LOG", "CSV"),
+                        help="export LOG as csv file CSV")
+    parser.add_argument("--compare", type=int, metavar="ROWS",
+                        help="compare csv and binary log with ROWS rows")
+    args = parser.parse_args()
+
+    if args.export:
+        count = BinaryResultLog(args.export[0],
+                                readonly=True).export_csv(args.export[1])
+        print("exported {0} rows".format(count))
+    if args.compare:
+        compare(args.compare)
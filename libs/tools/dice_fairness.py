@@ -0,0 +1,302 @@
+""" statistical tests that check if the recorded dice rolls are fair: chi
+square goodness of fit per die size, serial correlation, runs test and a
+comparison of manual and auto rolls. prints a report or writes it as json """
+import argparse
+import json
+import math
+import sys
+import time
+from array import array
+from collections import Counter
+
+from libs.backend.dsa_results import read_rows, parse_rolls, dice_eyes, \
+    detect_format
+
+try:
+    import numpy as np
+except ImportError:  # the tests work without numpy, only slower
+    np = None
+
+# p values below this are reported as not fair
+SIGNIFICANCE = 0.01
+
+
+def _upper_gamma(a, x):
+    """ regularized upper incomplete gamma function Q(a, x), series for
+    small x and continued fraction for large x
+    input: a:float, > 0
+           x:float, >= 0
+    output: float """
+    if x <= 0:
+        return 1.0
+    log_prefix = a * math.log(x) - x - math.lgamma(a)
+    if x < a + 1:
+        # series of the lower function P(a, x)
+        term = total = 1.0 / a
+        denominator = a
+        for _ in range(10000):
+            denominator += 1
+            term *= x / denominator
+            total += term
+            if abs(term) < abs(total) * 1e-15:
+                break
+        return max(0.0, 1.0 - total * math.exp(log_prefix))
+
+    # modified Lentz continued fraction of Q(a, x)
+    tiny = 1e-300
+    b = x + 1 - a
+    c = 1 / tiny
+    d = 1 / b
+    h = d
+    for i in range(1, 10000):
+        an = -i * (i - a)
+        b += 2
+        d = an * d + b
+        d = tiny if abs(d) < tiny else d
+        c = b + an / c
+        c = tiny if abs(c) < tiny else c
+        d = 1 / d
+        delta = d * c
+        h *= delta
+        if abs(delta - 1) < 1e-15:
+            break
+    return math.exp(log_prefix) * h
+
+
+def chi2_p_value(statistic, degrees):
+    """ probability of a chi square statistic at least this large
+    input: statistic:float
+           degrees:int, degrees of freedom
+    output: float """
+    return _upper_gamma(degrees / 2, statistic / 2)
+
+
+def normal_p_value(z_score):
+    """ two sided p value of a standard normal z score
+    input: z_score:float
+    output: float """
+    return math.erfc(abs(z_score) / math.sqrt(2))
+
+
+def collect_rolls(path):
+    """ read all rolls of a result file into compact arrays, one per dice
+    type and die size. the order of the rolls is kept for the serial tests
+    input: path:str, output csv file, SQLite database or binary log
+    output: dict, (dice type, eyes) -> array of rolls """
+    streams = {}
+
+    def stream(dice, eyes):
+        try:
+            return streams[(dice, eyes)]
+        except KeyError:
+            # one byte per roll unless the die is bigger than that
+            streams[(dice, eyes)] = array("B" if eyes < 256 else "H")
+            return streams[(dice, eyes)]
+
+    if detect_format(path) == "binary":
+        # the raw records are much faster than building csv rows
+        from libs.backend.dsa_binlog import BinaryResultLog, CATEGORIES, \
+            DICE_TYPES, DICE_MASK
+        misc = CATEGORIES.index("misc")
+        log = BinaryResultLog(path, readonly=True)
+        for record, rolls in log.read_records():
+            if record[0] == misc:
+                eyes = record[4]
+            elif CATEGORIES[record[0]] == "special_skill":
+                continue
+            else:
+                eyes = 20
+            # the high bits of the dice byte are the critical rule set
+            stream(DICE_TYPES[record[10] & DICE_MASK], eyes).extend(rolls)
+        return streams
+
+    for row in read_rows(path):
+        eyes = dice_eyes(row)
+        if eyes is not None:
+            stream(row[11], eyes).extend(parse_rolls(row[7]))
+    return streams
+
+
+def face_counts(rolls, eyes):
+    """ how often every face was rolled
+    input: rolls:array
+           eyes:int
+    output: list, index 0 is face 1 """
+    if np is not None:
+        counts = np.bincount(np.frombuffer(rolls, dtype=rolls.typecode),
+                             minlength=eyes + 1)
+        return [int(i) for i in counts[1:eyes + 1]]
+    counts = Counter(rolls)
+    return [counts[face] for face in range(1, eyes + 1)]
+
+
+def chi_square_test(counts):
+    """ goodness of fit of face counts against a fair die
+    input: counts:list, count per face
+    output: dict """
+    total = sum(counts)
+    expected = total / len(counts)
+    statistic = sum((count - expected) ** 2 / expected for count in counts)
+    degrees = len(counts) - 1
+    p_value = chi2_p_value(statistic, degrees)
+    return {"statistic": statistic, "degrees": degrees, "p_value": p_value,
+            "fair": p_value >= SIGNIFICANCE}
+
+
+def serial_correlation_test(rolls):
+    """ lag 1 autocorrelation of consecutive rolls, about 0 for a fair die
+    input: rolls:array
+    output: dict """
+    count = len(rolls)
+    if count < 3:
+        return None
+    if np is not None:
+        values = np.frombuffer(rolls, dtype=rolls.typecode).astype(np.float64)
+        values -= values.mean()
+        variance = float(np.dot(values, values))
+        covariance = float(np.dot(values[:-1], values[1:]))
+    else:
+        mean = sum(rolls) / count
+        values = [roll - mean for roll in rolls]
+        variance = sum(value * value for value in values)
+        covariance = sum(a * b for a, b in zip(values, values[1:]))
+    correlation = covariance / variance if variance else 0.0
+    z_score = correlation * math.sqrt(count)
+    p_value = normal_p_value(z_score)
+    return {"correlation": correlation, "z_score": z_score,
+            "p_value": p_value, "fair": p_value >= SIGNIFICANCE}
+
+
+def runs_test(rolls, eyes):
+    """ Wald-Wolfowitz runs test above and below the median of the die,
+    too few or too many runs mean the rolls depend on each other. rolls equal
+    to the median (only odd dice have one) are left out
+    input: rolls:array
+           eyes:int
+    output: dict """
+    median = (eyes + 1) / 2
+    if np is not None:
+        values = np.frombuffer(rolls, dtype=rolls.typecode)
+        values = values[values != median]
+        above = values > median
+        high = int(above.sum())
+        low = len(above) - high
+        runs = int(np.count_nonzero(above[1:] != above[:-1])) + 1 \
+            if len(above) else 0
+    else:
+        above = [roll > median for roll in rolls if roll != median]
+        high = sum(above)
+        low = len(above) - high
+        runs = sum(1 for a, b in zip(above, above[1:]) if a != b) + 1 \
+            if above else 0
+
+    total = high + low
+    if not high or not low or total < 3:
+        return None
+    expected = 2 * high * low / total + 1
+    variance = (expected - 1) * (expected - 2) / (total - 1)
+    z_score = (runs - expected) / math.sqrt(variance)
+    p_value = normal_p_value(z_score)
+    return {"runs": runs, "expected": expected, "z_score": z_score,
+            "p_value": p_value, "fair": p_value >= SIGNIFICANCE}
+
+
+def homogeneity_test(counts_a, counts_b):
+    """ chi square test if two sets of face counts come from the same die
+    input: counts_a:list
+           counts_b:list
+    output: dict """
+    total_a = sum(counts_a)
+    total_b = sum(counts_b)
+    total = total_a + total_b
+    statistic = 0.0
+    degrees = -1
+    for count_a, count_b in zip(counts_a, counts_b):
+        face_total = count_a + count_b
+        if not face_total:
+            continue
+        degrees += 1
+        expected_a = face_total * total_a / total
+        expected_b = face_total * total_b / total
+        statistic += (count_a - expected_a) ** 2 / expected_a
+        statistic += (count_b - expected_b) ** 2 / expected_b
+    if degrees < 1:
+        return None
+    p_value = chi2_p_value(statistic, degrees)
+    return {"statistic": statistic, "degrees": degrees, "p_value": p_value,
+            "same_distribution": p_value >= SIGNIFICANCE}
+
+
+def fairness_report(streams):
+    """ run all tests on the collected rolls
+    input: streams:dict, created by collect_rolls()
+    output: report:dict, can be written as json """
+    report = {"significance": SIGNIFICANCE, "numpy": np is not None,
+              "dice": [], "manual_vs_auto": []}
+    counts = {}
+    for (dice, eyes), rolls in sorted(streams.items()):
+        counts[(dice, eyes)] = face_counts(rolls, eyes)
+        report["dice"].append({
+            "dice": dice,
+            "eyes": eyes,
+            "rolls": len(rolls),
+            "counts": counts[(dice, eyes)],
+            "chi_square": chi_square_test(counts[(dice, eyes)]),
+            "serial_correlation": serial_correlation_test(rolls),
+            "runs": runs_test(rolls, eyes)})
+
+    for (dice, eyes), manual_counts in sorted(counts.items()):
+        if dice != "manual" or ("auto", eyes) not in counts:
+            continue
+        report["manual_vs_auto"].append({
+            "eyes": eyes,
+            "test": homogeneity_test(manual_counts, counts[("auto", eyes)])})
+    return report
+
+
+def print_report(report):
+    """ human readable summary of a fairness report
+    input: report:dict """
+    def verdict(test, key="fair"):
+        if test is None:
+            return "too few rolls"
+        return "p={0:.4f} {1}".format(test["p_value"],
+                                      "ok" if test[key] else "SUSPICIOUS")
+
+    for entry in report["dice"]:
+        print("{0:6s} d{1:<4d} {2:12d} rolls".format(
+            entry["dice"], entry["eyes"], entry["rolls"]))
+        print("\tchi square:         " + verdict(entry["chi_square"]))
+        print("\tserial correlation: " + verdict(
+            entry["serial_correlation"]))
+        print("\truns:               " + verdict(entry["runs"]))
+    for entry in report["manual_vs_auto"]:
+        print("manual vs auto d{0}: {1}".format(
+            entry["eyes"], verdict(entry["test"], "same_distribution")))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("path", nargs="?", default="output.csv",
+                        help="output csv file, SQLite database or binary log")
+    parser.add_argument("--json", metavar="FILE",
+                        help="write the report as json, '-' for stdout")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    collected = collect_rolls(args.path)
+    read_time = time.perf_counter() - start
+    start = time.perf_counter()
+    fairness = fairness_report(collected)
+    fairness["seconds"] = {"read": read_time,
+                           "tests": time.perf_counter() - start}
+
+    if args.json == "-":
+        json.dump(fairness, sys.stdout, indent=1)
+    else:
+        print_report(fairness)
+        print("read {0:.2f} s, tests {1:.2f} s".format(
+            read_time, fairness["seconds"]["tests"]))
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as json_file:
+                json.dump(fairness, json_file, indent=1)
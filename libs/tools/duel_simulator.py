@@ -0,0 +1,73 @@
+""" simulates many AT/PA duels between two heroes and prints the win chances
+and how many rounds it takes until the first hit. the same seed always gives
+the same result, no matter how many processes are used """
+import argparse
+import os
+import time
+
+from libs.backend.dsa_duel import fighter, simulate, np
+from libs.backend.dsa_game import GameLogic
+from libs.languages.languages import english
+
+
+def parse_side(text):
+    """ split a duel side given on the command line
+    input: text:str, e.g. "01_testchar:Hiebwaffen"
+    output: (hero, talent):tuple """
+    hero, sep, talent = text.partition(':')
+    if not sep or not talent:
+        raise argparse.ArgumentTypeError("expected hero:talent, got " + text)
+    return hero, talent
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("first", type=parse_side,
+                        help="hero:talent that attacks first, e.g. "
+                             "01_testchar:Hiebwaffen")
+    parser.add_argument("second", type=parse_side, help="hero:talent")
+    parser.add_argument("--hero-folder", default="hero_files")
+    parser.add_argument("--at-mod", type=int, nargs=2, default=[0, 0],
+                        metavar=("FIRST", "SECOND"))
+    parser.add_argument("--pa-mod", type=int, nargs=2, default=[0, 0],
+                        metavar=("FIRST", "SECOND"))
+    parser.add_argument("--duels", type=int, default=1000000)
+    parser.add_argument("--max-rounds", type=int, default=100)
+    parser.add_argument("--no-criticals", action="store_true",
+                        help="rolls of 1 and 20 are normal rolls")
+    parser.add_argument("--processes", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk-size", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--show-rounds", type=int, default=10,
+                        help="rounds shown in the distribution")
+    args = parser.parse_args()
+
+    columns = GameLogic({"output file": os.devnull,
+                         "hero folder": args.hero_folder},
+                        english).entry_columns()
+    try:
+        fighters = [fighter(columns, *side, at_mod=at_mod, pa_mod=pa_mod)
+                    for side, at_mod, pa_mod in zip(
+                        (args.first, args.second), args.at_mod, args.pa_mod)]
+    except KeyError as error:
+        parser.error("no AT and PA value for " + str(error))
+
+    start = time.perf_counter()
+    result = simulate(fighters[0], fighters[1], args.duels, args.seed,
+                      args.processes, args.max_rounds,
+                      not args.no_criticals, args.chunk_size)
+    seconds = time.perf_counter() - start
+
+    for side, duelist in enumerate(fighters):
+        print("{0} {1} (AT {2}, PA {3}): {4:.4f} win chance".format(
+            duelist.hero, duelist.talent, duelist.at, duelist.pa,
+            result.win_chance(side)))
+    print("draws after {0} rounds: {1:.4f}".format(
+        args.max_rounds, result.draws / result.duels))
+    print("mean rounds to first hit: {0:.3f}".format(result.mean_rounds()))
+    for index, share in enumerate(
+            result.rounds_distribution()[:args.show_rounds]):
+        print("\tround {0:3d}: {1:.4f}".format(index + 1, share))
+    print("{0} duels in {1:.2f} s, {2:.0f} duels/s ({3})".format(
+        result.duels, seconds, result.duels / seconds,
+        "numpy" if np is not None else "random"))
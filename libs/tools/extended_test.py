@@ -0,0 +1,58 @@
+""" chance of an extended test (Sammelprobe) of a skill or spell: how likely
+the target points are reached within the try limit and how many tries it
+takes. computed exactly if possible, simulated otherwise """
+import argparse
+import os
+
+from libs.backend.dsa_extended import mean_tries
+from libs.backend.dsa_game import GameLogic, GameState
+from libs.backend.dsa_rules import RULE_SETS, DEFAULT_RULES
+from libs.languages.languages import english
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("hero")
+    parser.add_argument("entry", help="name of the skill or spell, e.g. "
+                                      "Klettern")
+    parser.add_argument("--target", type=int, required=True,
+                        help="points that have to be reached")
+    parser.add_argument("--tries", type=int, required=True,
+                        help="try limit")
+    parser.add_argument("--mod", type=int, default=0)
+    parser.add_argument("--rules", choices=RULE_SETS, default=DEFAULT_RULES,
+                        help="critical rule set of every try")
+    parser.add_argument("--hero-folder", default="hero_files")
+    parser.add_argument("--samples", type=int, default=1000000,
+                        help="simulated extended tests if the exact "
+                             "computation is too big")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    game = GameLogic({"output file": os.devnull,
+                      "hero folder": args.hero_folder,
+                      "critical rules": args.rules}, english)
+    state = GameState(current_hero=args.hero, mod=args.mod,
+                      test_input=args.entry.lower())
+    if args.hero not in game.get_hero_list():
+        parser.error(english["key_error"] + ": " + args.hero)
+    state = game.autocomplete(state)
+    exact = [i for i in state.option_list
+             if i.name.lower() == args.entry.lower()]
+    state.selection = exact[0] if exact else None
+    result = game.extended_test(state, args.target, args.tries,
+                                args.samples, args.seed)
+    if result is None:
+        parser.error("no skill or spell " + args.entry)
+
+    print("{0} {1} ({2}), modifier {3}: {4} points in {5} tries".format(
+        args.hero, state.selection.name, state.selection.value, args.mod,
+        args.target, args.tries))
+    print("success chance {0:.4f}, mean tries {1:.2f} ({2}{3})".format(
+        result.chance, mean_tries(result), result.method,
+        ", {0} samples".format(result.samples) if result.samples else ''))
+    reached = 0.0
+    for index, chance in enumerate(result.tries):
+        reached += chance
+        print("\ttry {0:3d}: {1:.4f}, reached {2:.4f}".format(
+            index + 1, chance, reached))
@@ -0,0 +1,143 @@
+""" measures the keystroke latency of the GUI without a display: the
+view-model of the GUI is driven letter by letter and its label texts are
+applied to a headless view that counts how many labels would be
+reconfigured """
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from libs.backend.dsa_game import GameLogic, GameState
+from libs.backend.dsa_metrics import LatencyHistogram, QUANTILES
+from libs.interfaces.gui_model import GuiModel
+from libs.languages.languages import english
+from libs.tools.hero_generator import generate_hero
+
+
+class HeadlessView:
+    """
+    Stand-in for the tkinter widgets of the GUI, applies label texts the
+    same way GUI._set_text() does
+
+    ...
+
+    Attributes
+    ----------
+    layout: str
+        name of the shown layout
+    shown: dict
+        (layout, label key) -> text, match list rows use the key
+        ("list", row)
+    updates: int
+        how many labels would have been reconfigured
+    rows: int
+        visible rows of the match list
+
+    Methods
+    -------
+    render(layout, texts):
+        Switch to a layout and apply label texts.
+    render_list(items, format_item):
+        Format the visible rows of the match list like MatchList does.
+    """
+
+    def __init__(self, rows=10):
+        self.layout = None
+        self.shown = {}
+        self.updates = 0
+        self.rows = rows
+
+    def render(self, layout, texts):
+        """ switch to a layout and apply label texts, only changed texts
+        count as update
+        input: layout:str
+               texts:dict, label key -> text """
+        self.layout = layout
+        for key, text in texts.items():
+            text = '' if text is None else text
+            if self.shown.get((layout, key)) != text:
+                self.shown[(layout, key)] = text
+                self.updates += 1
+
+    def render_list(self, items, format_item):
+        """ format the visible rows of the match list, scrolled to the top
+        input: items:list
+               format_item:callable, item -> str """
+        for row in range(self.rows):
+            text = format_item(items[row]) if row < len(items) else ''
+            if self.shown.get(("list", row)) != text:
+                self.shown[("list", row)] = text
+                self.updates += 1
+
+
+def type_text(model, view, text, histogram):
+    """ type a text letter by letter and delete it again, every keystroke is
+    timed from the input to the applied label texts
+    input: model:GuiModel
+           view:HeadlessView
+           text:str
+           histogram:LatencyHistogram """
+    inputs = [text[:end] for end in range(1, len(text) + 1)]
+    inputs += inputs[-2::-1] + ['']
+    for test_input in inputs:
+        start = time.perf_counter_ns()
+        texts = model.test_input(test_input)
+        view.render(model.layout(), texts)
+        if model.layout() == "none":
+            view.render_list(model.options(), model.option_text)
+        histogram.record(time.perf_counter_ns() - start)
+
+
+def measure(hero_folder, text, repeat):
+    """ type a text repeat times for every hero of a folder
+    input: hero_folder:str
+           text:str
+           repeat:int
+    output: (histogram, view):tuple """
+    game = GameLogic({"output file": os.devnull, "hero folder": hero_folder},
+                     english)
+    histogram = LatencyHistogram()
+    view = HeadlessView()
+    for hero in game.get_hero_list():
+        model = GuiModel(game, GameState(), english)
+        model.hero_input(hero)
+        for _ in range(repeat):
+            type_text(model, view, text, histogram)
+    return histogram, view
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--hero-folder", default="hero_files")
+    parser.add_argument("--entries", type=int, default=None,
+                        help="use one generated hero with this many skills "
+                             "and spells instead of the hero folder")
+    parser.add_argument("--text", default="sinnenschärfe",
+                        help="what is typed into the test input")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    work_folder = None
+    folder = args.hero_folder
+    if args.entries is not None:
+        work_folder = folder = tempfile.mkdtemp()
+        with open(os.path.join(folder, "synthetic.xml"), "w",
+                  encoding="utf-8") as hero_file:
+            hero_file.write(generate_hero(
+                0, 1, skills=args.entries - args.entries // 4,
+                spells=args.entries // 4, sinnenschaerfe=1, attributo=1))
+    try:
+        latencies, headless = measure(folder, args.text, args.repeat)
+    finally:
+        if work_folder is not None:
+            shutil.rmtree(work_folder)
+
+    print("{0} keystrokes, {1:.2f} label updates per keystroke".format(
+        latencies.count, headless.updates / latencies.count))
+    print("mean {0:.1f} us, {1}, max {2:.1f} us".format(
+        latencies.total / latencies.count / 1000,
+        ", ".join("p{0:g} {1:.1f} us".format(100 * i,
+                                             latencies.quantile(i) / 1000)
+                  for i in QUANTILES),
+        latencies.max / 1000))
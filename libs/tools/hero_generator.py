@@ -0,0 +1,229 @@
+""" generate synthetic hero xml files in the format of Helden-Software, for
+scale tests without real player files. the same seed always creates the same
+heroes """
+import argparse
+import os
+import random
+import time
+from xml.sax.saxutils import quoteattr
+
+ATTRIBUTES = [("Mut", "MU"),
+              ("Klugheit", "KL"),
+              ("Intuition", "IN"),
+              ("Charisma", "CH"),
+              ("Fingerfertigkeit", "FF"),
+              ("Gewandtheit", "GE"),
+              ("Konstitution", "KO"),
+              ("Körperkraft", "KK")]
+
+# derived values that follow the 8 attributes in every hero file
+DERIVED = ['<eigenschaft mod="0" name="Sozialstatus" startwert="5" '
+           'value="5"/>',
+           '<eigenschaft mod="11" name="Lebensenergie" value="0"/>',
+           '<eigenschaft mod="12" name="Ausdauer" value="0"/>',
+           '<eigenschaft grossemeditation="0" mod="13" mrmod="-3" '
+           'name="Astralenergie" value="0"/>',
+           '<eigenschaft karmalqueste="0" mod="0" name="Karmaenergie" '
+           'value="0"/>',
+           '<eigenschaft mod="-3" name="Magieresistenz" value="0"/>',
+           '<eigenschaft mod="0" name="ini" value="9"/>',
+           '<eigenschaft mod="0" name="at" value="6"/>',
+           '<eigenschaft mod="0" name="pa" value="7"/>',
+           '<eigenschaft mod="0" name="fk" value="7"/>']
+
+SKILLS = ["Athletik", "Klettern", "Körperbeherrschung", "Schleichen",
+          "Schwimmen", "Selbstbeherrschung", "Sich verstecken", "Singen",
+          "Tanzen", "Zechen", "Betören", "Gassenwissen", "Menschenkenntnis",
+          "Überreden", "Fährtensuchen", "Orientierung", "Wildnisleben",
+          "Götter und Kulte", "Magiekunde", "Pflanzenkunde", "Rechnen",
+          "Sagen und Legenden", "Heilkunde: Wunden", "Kochen"]
+
+SPELLS = ["Abvenenum reine Speise", "Balsam Salabunde", "Blitz dich find",
+          "Fulminictus Donnerkeil", "Harmlose Gestalt", "Hexenblick",
+          "Radau", "Somnigravis tiefer Schlaf", "Wasseratem"]
+
+FIGHT_TALENTS = ["Dolche", "Hiebwaffen", "Raufen", "Ringen", "Säbel",
+                 "Schwerter", "Speere", "Stäbe"]
+
+ADVANTAGES = ["Vollzauberer", "Feste Gewohnheit", "Randgruppe",
+              "Eisern", "Zäher Hund"]
+VALUE_ADVANTAGES = ["Jähzorn", "Goldgier", "Neugier", "Arroganz",
+                    "Aberglaube"]
+
+SPECIAL_SKILLS = ["Ausweichen I", "Sturmangriff", "Waldkundig",
+                  "Wuchtschlag", "Große Meditation"]
+CULTURES = ["Orks", "Bukanier", "Thorwaler", "Mittelreich"]
+
+# first line(s) of every file and the children of <held> that the readers
+# skip, they only have to exist so the indexes root[0][...] fit
+HEADER = ('<?xml version="1.0" encoding="UTF-8" standalone="no"?>\n'
+          '<?xml-stylesheet type="text/xsl" href="helden.xsl"?>\n'
+          '<helden Version="5.5.3">\n')
+
+
+def _probe(rng):
+    """ random attribute triple of a skill or spell
+    input: rng:random.Random
+    output: str, e.g. " (KL/IN/CH)" """
+    return " ({0}/{1}/{2})".format(*(rng.choice(ATTRIBUTES)[1]
+                                     for _ in range(3)))
+
+
+def _names(base, count, suffix):
+    """ count unique entry names, the base names first, then numbered ones
+    input: base:list
+           count:int
+           suffix:str, e.g. "Talent"
+    output: list """
+    names = base[:count]
+    names += ["{0} {1:05d}".format(suffix, i) for i in
+              range(count - len(names))]
+    return names
+
+
+def generate_hero(index, seed, skills=60, spells=20, fight_talents=6,
+                  advantages=5, sinnenschaerfe=0.8, attributo=0.3):
+    """ create the xml text of one hero
+    input: index:int, number of the hero, part of its name
+           seed:int, together with index this decides every value
+           skills:int, number of skills
+           spells:int, number of spells
+           fight_talents:int, number of fight talents
+           advantages:int, number of (dis)advantages, the patterns without
+                           value, with value and "Vorurteile gegen" are mixed
+           sinnenschaerfe:float, chance that the hero has Sinnenschärfe
+           attributo:float, chance that the hero has Attributo
+    output: str """
+    rng = random.Random(seed * 1000003 + index)
+    lines = [HEADER,
+             '    <held key="{0}" name="synthetic_{1:05d}" stand="0">\n'
+             .format(1000000000000 + index, index),
+             "        <mods/>\n        <basis/>\n        <eigenschaften>\n"]
+
+    for name, _ in ATTRIBUTES:
+        start = rng.randint(8, 15)
+        lines.append('            <eigenschaft mod="{0}" name={1} '
+                     'startwert="{2}" value="{2}"/>\n'.format(
+                         rng.randint(0, 2), quoteattr(name), start))
+    lines += ["            " + i + "\n" for i in DERIVED]
+    lines.append("        </eigenschaften>\n        <vt>\n")
+
+    for i in range(advantages):
+        pattern = i % 3
+        if pattern == 0:
+            lines.append('            <vorteil name={0}/>\n'.format(
+                quoteattr(_names(ADVANTAGES, i // 3 + 1, "Vorteil")[-1])))
+        elif pattern == 1:
+            lines.append('            <vorteil name={0} value="{1}"/>\n'
+                         .format(quoteattr(_names(VALUE_ADVANTAGES,
+                                                  i // 3 + 1,
+                                                  "Nachteil")[-1]),
+                                 rng.randint(3, 10)))
+        else:
+            lines.append(
+                '            <vorteil name="Vorurteile gegen">\n'
+                '                <auswahl position="0" value="{0}"/>\n'
+                '                <auswahl position="1" value={1}/>\n'
+                '            </vorteil>\n'.format(
+                    rng.randint(3, 10),
+                    quoteattr("Gruppe {0}".format(i // 3))))
+    lines.append("        </vt>\n        <sf>\n")
+
+    for name in SPECIAL_SKILLS[:rng.randint(1, len(SPECIAL_SKILLS))]:
+        lines.append('            <sonderfertigkeit name={0}/>\n'.format(
+            quoteattr(name)))
+    lines.append('            <sonderfertigkeit name="Kulturkunde">\n'
+                 '                <kultur name={0}/>\n'
+                 '            </sonderfertigkeit>\n'.format(
+                     quoteattr(rng.choice(CULTURES))))
+    # this one is both a skill and a special skill in real files
+    lines.append('            <sonderfertigkeit name="Ritualkenntnis: '
+                 'Hexe"/>\n')
+    lines.append("        </sf>\n        <ereignisse/>\n"
+                 "        <talentliste>\n")
+
+    skill_names = _names(SKILLS, skills, "Talent")
+    if skill_names and rng.random() < sinnenschaerfe:
+        skill_names[rng.randrange(len(skill_names))] = "Sinnenschärfe"
+    for name in skill_names:
+        probe = " (KL/IN/IN)" if name == "Sinnenschärfe" else _probe(rng)
+        lines.append('            <talent lernmethode="Gegenseitiges Lehren" '
+                     'name={0} probe="{1}" value="{2}"/>\n'.format(
+                         quoteattr(name), probe, rng.randint(0, 15)))
+    lines.append('            <talent lernmethode="Gegenseitiges Lehren" '
+                 'name="Ritualkenntnis: Hexe" probe=" (--/--/--)" '
+                 'value="{0}"/>\n'.format(
+                     rng.randint(0, 10)))
+    lines.append("        </talentliste>\n        <zauberliste>\n")
+
+    spell_names = _names(SPELLS, spells, "Zauber")
+    if spell_names and rng.random() < attributo:
+        spell_names[rng.randrange(len(spell_names))] = "Attributo"
+    for name in spell_names:
+        probe = " (KL/CH/**)" if name == "Attributo" else _probe(rng)
+        lines.append('            <zauber anmerkungen="" hauszauber="false" '
+                     'k="C" kosten="" lernmethode="Gegenseitiges Lehren" '
+                     'name={0} probe="{1}" reichweite="" '
+                     'repraesentation="Hexe" value="{2}" variante="" '
+                     'wirkungsdauer="" zauberdauer="" '
+                     'zauberkommentar=""/>\n'.format(
+                         quoteattr(name), probe, rng.randint(0, 15)))
+    lines.append("        </zauberliste>\n        <kampf>\n")
+
+    for name in _names(FIGHT_TALENTS, fight_talents, "Kampftalent"):
+        lines.append('            <kampfwerte name={0}>\n'
+                     '                <attacke value="{1}"/>\n'
+                     '                <parade value="{2}"/>\n'
+                     '            </kampfwerte>\n'.format(
+                         quoteattr(name), rng.randint(5, 15),
+                         rng.randint(5, 15)))
+    lines.append("        </kampf>\n"
+                 "        <gegenstände/>\n        <BoniWaffenlos/>\n"
+                 "        <kommentare/>\n        <ausrüstungen/>\n"
+                 "        <verbindungen/>\n        <extention/>\n"
+                 "        <geldboerse/>\n        <plugindata/>\n"
+                 "    </held>\n</helden>\n")
+    return "".join(lines)
+
+
+def generate_folder(folder, hero_count, seed=1, **options):
+    """ write hero_count hero files into a folder
+    input: folder:str, created if it doesn't exist
+           hero_count:int
+           seed:int
+           options: passed on to generate_hero()
+    output: paths:list, file paths of the written heroes """
+    os.makedirs(folder, exist_ok=True)
+    paths = []
+    for index in range(hero_count):
+        path = os.path.join(folder, "synthetic_{0:05d}.xml".format(index))
+        with open(path, "w", encoding="utf-8") as hero_file:
+            hero_file.write(generate_hero(index, seed, **options))
+        paths.append(path)
+    return paths
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("folder", help="the hero files are written here")
+    parser.add_argument("--heroes", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--skills", type=int, default=60)
+    parser.add_argument("--spells", type=int, default=20)
+    parser.add_argument("--fight-talents", type=int, default=6)
+    parser.add_argument("--advantages", type=int, default=5)
+    parser.add_argument("--sinnenschaerfe", type=float, default=0.8,
+                        help="chance that a hero has Sinnenschärfe")
+    parser.add_argument("--attributo", type=float, default=0.3,
+                        help="chance that a hero has Attributo")
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    written = generate_folder(args.folder, args.heroes, args.seed,
+                              skills=args.skills, spells=args.spells,
+                              fight_talents=args.fight_talents,
+                              advantages=args.advantages,
+                              sinnenschaerfe=args.sinnenschaerfe,
+                              attributo=args.attributo)
+    print("wrote {0} heroes in {1:.2f} s".format(
+        len(written), time.perf_counter() - start_time))
@@ -0,0 +1,59 @@
+""" queries over the entries of all heroes of a hero folder, e.g. all skills
+of 10 or more that use KL. uses the column store of GameLogic, filters are
+vectorized if numpy is installed """
+import argparse
+import os
+import time
+
+from libs.backend.dsa_columns import CATEGORIES, ATTRIBUTES, np
+from libs.backend.dsa_game import GameLogic
+from libs.languages.languages import english
+
+
+def query(game, args):
+    """ run one query on the column store of a GameLogic
+    input: game:GameLogic
+           args:argparse.Namespace, the filters
+    output: (columns, indexes):tuple """
+    columns = game.entry_columns()
+    indexes = columns.select(category=args.category, hero=args.hero,
+                             name=args.name, min_value=args.min_value,
+                             max_value=args.max_value, uses_attr=args.attr)
+    return columns, indexes
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--hero-folder", default="hero_files")
+    parser.add_argument("--category", choices=CATEGORIES)
+    parser.add_argument("--hero")
+    parser.add_argument("--name", help="exact entry name")
+    parser.add_argument("--min-value", type=int)
+    parser.add_argument("--max-value", type=int)
+    parser.add_argument("--attr", choices=ATTRIBUTES,
+                        help="one of the related attributes")
+    parser.add_argument("--count", action="store_true",
+                        help="only print the number of matches per hero")
+    args = parser.parse_args()
+
+    logic = GameLogic({"output file": os.devnull,
+                       "hero folder": args.hero_folder}, english)
+    start = time.perf_counter()
+    entries = logic.entry_columns()
+    built = time.perf_counter()
+    entries, found = query(logic, args)
+    done = time.perf_counter()
+
+    if args.count:
+        for hero, count in sorted(entries.count_by_hero(found).items()):
+            print("{0}\t{1}".format(hero, count))
+    else:
+        for row in entries.rows(found):
+            print("\t".join([row[0], row[1], str(row[2]),
+                             '' if row[3] is None else str(row[3]),
+                             ", ".join("{0}({1})".format(*i)
+                                       for i in row[4])]))
+    print("{0} of {1} entries, {2} heroes, build {3:.1f} ms, query {4:.2f} "
+          "ms ({5})".format(len(found), len(entries), len(entries.heroes),
+                            (built - start) * 1000, (done - built) * 1000,
+                            "numpy" if np is not None else "array"))
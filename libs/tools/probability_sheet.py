@@ -0,0 +1,169 @@
+""" export a printable sheet of the exact success chances of every attribute,
+skill, spell, fight talent and advantage of all heroes of a hero folder, at
+the modifiers -10 to +5. written as csv, json and a compact html table """
+import argparse
+import csv
+import html
+import json
+import os
+import time
+
+from libs.backend.dsa_game import GameLogic
+from libs.backend.dsa_rules import RULE_SETS, DEFAULT_RULES
+from libs.backend.dsa_sheet import MODIFIERS, build_sheet
+from libs.languages.languages import english
+
+FORMATS = ("csv", "json", "html")
+
+
+def mod_label(mod):
+    """ column label of a modifier
+    input: mod:int
+    output: str, e.g. "-3", "0", "+2" """
+    return "{0:+d}".format(mod) if mod else "0"
+
+
+def attrs_label(attrs):
+    """ related attributes of a sheet row
+    input: attrs:tuple, (abbr, value) pairs
+    output: str, e.g. "MU(12)/IN(13)/GE(11)" """
+    return "/".join("{0}({1})".format(*i) for i in attrs)
+
+
+class Formatted(dict):
+    """
+    Formatted chances, chance -> label. A sheet only has a few distinct
+    chances, every one of them is only formatted once
+
+    ...
+
+    Attributes
+    ----------
+    format_chance: callable
+        creates the label of a chance, e.g. "{0:.4f}".format
+    """
+
+    def __init__(self, format_chance):
+        super().__init__()
+        self.format_chance = format_chance
+
+    def __missing__(self, chance):
+        """ format a chance that wasn't formatted yet
+        input: chance:float
+        output: label """
+        label = self[chance] = self.format_chance(chance)
+        return label
+
+
+def write_csv(rows, mods, path):
+    """ one line per entry, one column per modifier
+    input: rows:list of SheetRow
+           mods:tuple
+           path:str """
+    labels = Formatted("{0:.4f}".format)
+    with open(path, 'w', newline='', encoding="utf-8") as out_file:
+        writer = csv.writer(out_file, delimiter=';')
+        writer.writerow(["Hero", "Category", "Entry", "Value", "Attributes"] +
+                        [mod_label(i) for i in mods])
+        for row in rows:
+            writer.writerow([row.hero, row.category, row.name, row.value,
+                             attrs_label(row.attrs)] +
+                            [labels[i] for i in row.chances])
+
+
+def write_json(rows, mods, rules, path):
+    """ the entries grouped by hero
+    input: rows:list of SheetRow
+           mods:tuple
+           rules:str, critical rule set of the chances
+           path:str """
+    rounded = Formatted(lambda chance: round(chance, 4))
+    heroes = {}
+    for row in rows:
+        heroes.setdefault(row.hero, []).append(
+            {"category": row.category,
+             "name": row.name,
+             "value": row.value,
+             "attrs": [list(i) for i in row.attrs],
+             "chances": [rounded[i] for i in row.chances]})
+    with open(path, 'w', encoding="utf-8") as out_file:
+        # dumps encodes in C, dump to a file would encode in python
+        out_file.write(json.dumps({"rules": rules, "modifiers": list(mods),
+                                   "heroes": heroes}, ensure_ascii=False,
+                                  separators=(',', ':')))
+
+
+def write_html(rows, mods, rules, path):
+    """ one table per hero, chances in percent. a hero's table is not split
+    across printed pages
+    input: rows:list of SheetRow
+           mods:tuple
+           rules:str, critical rule set of the chances
+           path:str """
+    labels = Formatted("<td class=\"c\">{0:.0%}</td>".format)
+    header = "<tr><th>Entry</th><th>Value</th><th>Attributes</th>" + \
+        "".join("<th>{0}</th>".format(mod_label(i)) for i in mods) + "</tr>"
+    out_list = ["<!DOCTYPE html>",
+                "<html><head><meta charset=\"utf-8\">",
+                "<title>DSA probability sheet</title>",
+                "<style>body{font:11px sans-serif}"
+                "section{break-inside:avoid}"
+                "table{border-collapse:collapse}"
+                "th,td{border:1px solid #999;padding:1px 4px}"
+                "td.c{text-align:right}</style>",
+                "</head><body>",
+                "<p>critical rules: {0}</p>".format(html.escape(rules))]
+    current = None
+    for row in rows:
+        if row.hero != current:
+            if current is not None:
+                out_list.append("</table></section>")
+            current = row.hero
+            out_list.append("<section><h2>{0}</h2><table>{1}".format(
+                html.escape(row.hero), header))
+        out_list.append(
+            "<tr><td>{0}</td><td>{1}</td><td>{2}</td>{3}</tr>".format(
+                html.escape(row.name), row.value,
+                html.escape(attrs_label(row.attrs)),
+                "".join([labels[i] for i in row.chances])))
+    if current is not None:
+        out_list.append("</table></section>")
+    out_list.append("</body></html>")
+    with open(path, 'w', encoding="utf-8") as out_file:
+        out_file.write("\n".join(out_list) + "\n")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("out_prefix", help="the sheets are written to "
+                                           "<out_prefix>.csv/.json/.html")
+    parser.add_argument("--hero-folder", default="hero_files")
+    parser.add_argument("--heroes", nargs='+', help="only these heroes")
+    parser.add_argument("--formats", nargs='+', choices=FORMATS,
+                        default=list(FORMATS))
+    parser.add_argument("--rules", choices=RULE_SETS, default=DEFAULT_RULES,
+                        help="critical rule set of the chances")
+    parser.add_argument("--processes", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    columns = GameLogic({"output file": os.devnull,
+                         "hero folder": args.hero_folder},
+                        english).entry_columns()
+    loaded = time.perf_counter()
+    sheet = build_sheet(columns, MODIFIERS, args.rules, args.processes,
+                        args.heroes)
+    computed = time.perf_counter()
+
+    if "csv" in args.formats:
+        write_csv(sheet, MODIFIERS, args.out_prefix + ".csv")
+    if "json" in args.formats:
+        write_json(sheet, MODIFIERS, args.rules, args.out_prefix + ".json")
+    if "html" in args.formats:
+        write_html(sheet, MODIFIERS, args.rules, args.out_prefix + ".html")
+    done = time.perf_counter()
+
+    print("{0} entries of {1} heroes, {2} modifiers: load {3:.2f} s, "
+          "chances {4:.2f} s, write {5:.2f} s".format(
+              len(sheet), len({i.hero for i in sheet}), len(MODIFIERS),
+              loaded - start, computed - loaded, done - computed))
@@ -1,72 +1,336 @@
 """ visualise results from csv file """
+import argparse
+import concurrent.futures
+import contextlib
 import csv
-from collections import namedtuple
-from matplotlib import pyplot as plt
-
-Test = namedtuple("Test", ["file", "category", "name",
-                           "misc_count", "misc_eyes",
-                           "value", "mod", "attrs",
-                           "rolls", "result", "desc",
-                           "time", "dice"])
-
-test_list = []
-
-name_dict = {}
-
-roll_dict = {}
-
-with open("../../output.csv") as csv_file:
-    csv_reader = csv.reader(csv_file, delimiter=',')
-    line_count = 0
-    for row in csv_reader:
-        if line_count == 0:
-            line_count += 1
-        else:
-            hero_file = row[0]
-            category = row[1]
-            name = row[2]
-            misc_count = None
-            misc_eyes = None
-            if row[3] != '':
-                misc_count, misc_eyes = row[3].split("D")
-                misc_count = int(misc_count)
-                misc_eyes = int(misc_eyes)
-            value = row[4]
-            mod = row[5]
-            attrs = row[6]
-            rolls = row[7].replace(' ', '').split(";")
-            rolls = list(map(int, rolls))
-            result = row[8]
-            desc = row[9]
-            time = row[10]
-            dice = row[11]
-
-            test_list.append(Test(hero_file, category, name,
-                                  misc_count, misc_eyes,
-                                  value, mod, attrs,
-                                  rolls, result, desc,
-                                  time, dice))
-
-for test in test_list:
-    if test.category not in ("attr", "skill", "spell", "fight_talent", "advantage"):
-        continue
-    try:
-        name_dict[test.name] += 1
-    except KeyError:
-        name_dict.update({test.name: 1})
-
-    if test.dice != "auto":
-        continue
-
-    for roll in test.rolls:
-        try:
-            roll_dict[roll] += 1
-        except KeyError:
-            roll_dict.update({roll: 1})
-
-
-roll_dict_keys = sorted(roll_dict)
-roll_dict_values = [value for (key, value) in sorted(roll_dict.items())]
-
-plt.bar(roll_dict_keys, roll_dict_values)
-plt.show()
+import importlib.util
+import io
+import itertools
+import os
+import re
+import sys
+import tempfile
+from collections import Counter
+
+from libs.backend.dsa_aggregates import IncrementalAggregate
+from libs.backend.dsa_results import read_rows, parse_rolls, dice_eyes, \
+    detect_format, D20_CATEGORIES
+
+try:
+    import resource
+except ImportError:  # not on Windows, the peak memory isn't shown
+    resource = None
+
+# columns that results can be grouped by
+GROUP_COLUMNS = {"hero": 0,
+                 "category": 1,
+                 "entry": 2,
+                 "modifier": 5,
+                 "dice": 11,
+                 "rules": 12}
+
+
+class ResultAggregate:
+    """
+    Counts tests and rolls of a stream of result rows. Only counters are
+    kept, so memory depends on the number of groups, not on the number of
+    rows.
+
+    ...
+
+    Attributes
+    ----------
+    group_by: list
+        names of GROUP_COLUMNS, rows with the same values form one group
+    dice: str
+        "auto", "manual" or "all", which rolls go into the histograms
+    tests: collections.Counter
+        group -> number of tested entries (misc dice sums are not counted)
+    successes: collections.Counter
+        group -> number of tests with result >= 0
+    rolls: dict
+        (group, dice eyes) -> collections.Counter of rolled values
+    row_count: int
+        number of rows read
+
+    Methods
+    -------
+    add_chunk(rows):
+        Update all counters with a list of rows.
+    """
+
+    def __init__(self, group_by, dice):
+        self.group_by = group_by
+        self.dice = dice
+        self.tests = Counter()
+        self.successes = Counter()
+        self.rolls = {}
+        self.row_count = 0
+        self._indexes = [GROUP_COLUMNS[i] for i in group_by]
+
+    def add_chunk(self, rows):
+        """ update all counters with a list of rows
+        input: rows:list, rows in the output csv column order """
+        self.row_count += len(rows)
+        tests = self.tests
+        successes = self.successes
+        rolls = self.rolls
+        indexes = self._indexes
+        for row in rows:
+            group = tuple([row[i] for i in indexes])
+            if row[1] in D20_CATEGORIES:
+                tests[group] += 1
+                if row[8] != '' and int(row[8]) >= 0:
+                    successes[group] += 1
+
+            if self.dice != "all" and row[11] != self.dice:
+                continue
+            eyes = dice_eyes(row)
+            if eyes is None:
+                continue
+            try:
+                histogram = rolls[(group, eyes)]
+            except KeyError:
+                histogram = rolls[(group, eyes)] = Counter()
+            histogram.update(parse_rolls(row[7]))
+
+
+def aggregate(path, group_by, dice, chunk_size=10000):
+    """ read a result file chunk by chunk and count it
+    input: path:str, output csv file, SQLite database or binary log
+           group_by:list, names of GROUP_COLUMNS
+           dice:str, "auto", "manual" or "all"
+           chunk_size:int, rows per chunk
+    output: ResultAggregate """
+    result = ResultAggregate(group_by, dice)
+    rows = read_rows(path)
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+        if not chunk:
+            return result
+        result.add_chunk(chunk)
+
+
+def print_aggregate(result):
+    """ print test counts, success rates and roll histograms
+    input: result:ResultAggregate """
+    print("{0} rows".format(result.row_count))
+    group_name = "/".join(result.group_by) or "all"
+    print("\n{0:40s} {1:>10s} {2:>10s}".format(group_name, "tests",
+                                                "success"))
+    for group, count in sorted(result.tests.items()):
+        print("{0:40s} {1:10d} {2:9.1f}%".format(
+            "/".join(group) or "all", count,
+            100 * result.successes[group] / count))
+
+    for (group, eyes), histogram in sorted(result.rolls.items()):
+        total = sum(histogram.values())
+        print("\n{0} d{1}, {2} rolls".format("/".join(group) or "all", eyes,
+                                             total))
+        for face in range(1, eyes + 1):
+            print("{0:3d}: {1:10d} {2:7.3f}%".format(
+                face, histogram[face], 100 * histogram[face] / total))
+
+
+def check_formats(path, group_by, dice, chunk_size=10000):
+    """ store the rows of a result file as csv file, SQLite database and
+    binary log and aggregate each of them. the printed aggregates have to be
+    the same for every format
+    input: path:str, output csv file, SQLite database or binary log
+           group_by:list, names of GROUP_COLUMNS
+           dice:str, "auto", "manual" or "all"
+           chunk_size:int, rows per chunk
+    output: outputs:dict, output format -> printed aggregate """
+    # only imported when it's used
+    from libs.backend.dsa_binlog import BinaryResultLog
+    from libs.backend.dsa_game import COLUMNS
+    from libs.backend.dsa_sqlite import SqliteResultStore
+
+    rows = list(read_rows(path))
+    outputs = {}
+    with tempfile.TemporaryDirectory() as folder:
+        paths = {i: os.path.join(folder, "output." + i)
+                 for i in ("csv", "sqlite", "dsalog")}
+        with open(paths["csv"], "w", encoding="utf-8",
+                  newline='') as csv_file:
+            file_writer = csv.writer(csv_file, delimiter=',', quotechar='|',
+                                     quoting=csv.QUOTE_MINIMAL)
+            file_writer.writerow(COLUMNS)
+            file_writer.writerows(rows)
+        store = SqliteResultStore(paths["sqlite"])
+        store.write_rows(rows)
+        store.close()
+        BinaryResultLog(paths["dsalog"]).write_rows(rows)
+
+        for output_format, result_path in paths.items():
+            printed = io.StringIO()
+            with contextlib.redirect_stdout(printed):
+                print_aggregate(aggregate(result_path, group_by, dice,
+                                          chunk_size))
+            outputs[output_format] = printed.getvalue()
+    return outputs
+
+
+def print_incremental(result):
+    """ print the aggregates saved next to an output csv file
+    input: result:IncrementalAggregate """
+    print("{0} rows, {1} bytes".format(result.row_count, result.offset))
+    print("\n{0:40s} {1:>10s} {2:>10s} {3:>10s}".format(
+        "entry", "tests", "success", "failure"))
+    for entry, (tests, successes, failures) in sorted(
+            result.entries.items()):
+        print("{0:40s} {1:10d} {2:10d} {3:10d}".format(entry, tests,
+                                                       successes, failures))
+    for dice, histograms in sorted(result.rolls.items()):
+        for eyes, histogram in sorted(histograms.items(),
+                                      key=lambda item: int(item[0])):
+            total = sum(histogram.values())
+            print("\n{0} d{1}, {2} rolls".format(dice, eyes, total))
+            for face in range(1, int(eyes) + 1):
+                count = histogram.get(str(face), 0)
+                print("{0:3d}: {1:10d} {2:7.3f}%".format(
+                    face, count, 100 * count / total))
+
+
+def plot_aggregate(result):
+    """ one bar chart per roll histogram
+    input: result:ResultAggregate """
+    # matplotlib takes long to import and is only needed here
+    from matplotlib import pyplot as plt
+
+    for (group, eyes), histogram in sorted(result.rolls.items()):
+        plt.figure()
+        plt.title("{0} d{1}".format("/".join(group) or "all", eyes))
+        faces = list(range(1, eyes + 1))
+        plt.bar(faces, [histogram[face] for face in faces])
+    plt.show()
+
+
+# figure of a render worker process, created once and reused for every chart
+_figure = None
+
+
+def _init_renderer():
+    """ runs once in every render worker process. selects the non
+    interactive Agg backend, so no display is needed, and creates the figure
+    that all charts of this process are drawn on """
+    global _figure  # pylint: disable=global-statement
+    # matplotlib is only imported by processes that render
+    import matplotlib
+    matplotlib.use("Agg")
+    from matplotlib.figure import Figure
+    _figure = Figure(figsize=(8, 4.5))
+    _figure.add_subplot(1, 1, 1)
+
+
+def _render_chart(job):
+    """ draw one histogram on the reused figure and write it to a file
+    input: job:tuple, (file path, title, faces, counts)
+    output: str, file path of the chart """
+    if _figure is None:
+        _init_renderer()
+    path, title, faces, counts = job
+    axes = _figure.axes[0]
+    axes.cla()
+    axes.bar(faces, counts)
+    axes.set_title(title)
+    axes.set_xlabel("roll")
+    axes.set_ylabel("count")
+    axes.set_xticks(faces if len(faces) <= 20 else faces[::len(faces) // 20])
+    _figure.savefig(path)
+    return path
+
+
+def render_charts(result, folder, image_format="png", processes=None):
+    """ write one chart per group and die size, rendered in parallel by a
+    process pool without a display
+    input: result:ResultAggregate
+           folder:str, the charts are written here
+           image_format:str, "png" or "svg"
+           processes:int, size of the pool, None uses every core
+    output: paths:list, file paths of the charts """
+    # a missing matplotlib would only show up as a broken pool, look for
+    # it without importing it
+    if importlib.util.find_spec("matplotlib") is None:
+        raise ImportError("rendering charts needs matplotlib")
+
+    os.makedirs(folder, exist_ok=True)
+    jobs = []
+    for (group, eyes), histogram in sorted(result.rolls.items()):
+        title = "{0} d{1}".format("/".join(group) or "all", eyes)
+        # group values can contain characters that aren't allowed in paths
+        name = re.sub(r"[^\w.-]+", "_", title)
+        faces = list(range(1, eyes + 1))
+        jobs.append((os.path.join(folder, name + "." + image_format), title,
+                     faces, [histogram[face] for face in faces]))
+
+    if processes == 1:
+        return [_render_chart(job) for job in jobs]
+    with concurrent.futures.ProcessPoolExecutor(
+            max_workers=processes, initializer=_init_renderer) as pool:
+        return list(pool.map(_render_chart, jobs,
+                             chunksize=max(1, len(jobs) // 64)))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("path", nargs="?", default="output.csv",
+                        help="output csv file, SQLite database or binary log")
+    parser.add_argument("--group-by", nargs="*", default=[],
+                        choices=sorted(GROUP_COLUMNS),
+                        help="count tests and rolls per group")
+    parser.add_argument("--dice", default="auto",
+                        choices=("auto", "manual", "all"),
+                        help="which rolls go into the histograms")
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    parser.add_argument("--no-plot", action="store_true",
+                        help="only print the counts")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only read rows appended since the last "
+                             "incremental run, counts are kept in "
+                             "<path>.agg.json (csv files only)")
+    parser.add_argument("--render", metavar="FOLDER",
+                        help="write one chart per group to FOLDER instead "
+                             "of showing them, works without a display")
+    parser.add_argument("--format", default="png", choices=("png", "svg"),
+                        help="image format of --render")
+    parser.add_argument("--processes", type=int,
+                        help="render processes, default is every core")
+    parser.add_argument("--check-formats", action="store_true",
+                        help="check that the rows give the same counts "
+                             "when they are stored as csv file, SQLite "
+                             "database and binary log")
+    args = parser.parse_args()
+
+    if args.check_formats:
+        checked = check_formats(args.path, args.group_by, args.dice,
+                                args.chunk_size)
+        differ = [i for i in checked if checked[i] != checked["csv"]]
+        print("{0} formats, {1}".format(
+            len(checked), "counts differ for " + ", ".join(differ) if differ
+            else "same counts"))
+        raise SystemExit(1 if differ else 0)
+
+    if args.incremental:
+        if detect_format(args.path) != "csv":
+            parser.error("--incremental needs an output csv file")
+        incremental = IncrementalAggregate(args.path)
+        new_rows = incremental.update()
+        print_incremental(incremental)
+        print("\n{0} new rows".format(new_rows))
+        raise SystemExit
+
+    aggregated = aggregate(args.path, args.group_by, args.dice,
+                           args.chunk_size)
+    print_aggregate(aggregated)
+    if resource is not None:
+        # ru_maxrss is in bytes on macOS and in KB everywhere else
+        print("\npeak memory: {0:.1f} MB".format(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss /
+            (1 << 20 if sys.platform == "darwin" else 1 << 10)))
+    if args.render:
+        charts = render_charts(aggregated, args.render, args.format,
+                               args.processes)
+        print("wrote {0} charts to {1}".format(len(charts), args.render))
+    elif not args.no_plot:
+        plot_aggregate(aggregated)
@@ -0,0 +1,185 @@
+""" success rate statistics of saved tests, grouped by any combination of
+hero, category, entry, modifier bucket and dice type. observed success rates
+are compared with the exact probabilities of the tests """
+import argparse
+import json
+import math
+import sys
+
+from libs.backend.dsa_probability import distribution_1dice, \
+    distribution_3dice, success_chance, mean_result
+from libs.backend.dsa_results import read_rows, parse_attrs, D20_CATEGORIES
+
+# z value of a 95% confidence interval
+Z_95 = 1.959964
+
+# how a row is turned into a part of its group key
+GROUP_KEYS = {"hero": lambda row, _: row[0],
+              "category": lambda row, _: row[1],
+              "entry": lambda row, _: row[2],
+              "modifier": lambda row, width: modifier_bucket(row[5], width),
+              "dice": lambda row, _: row[11],
+              "rules": lambda row, _: row[12]}
+
+
+def modifier_bucket(mod, width):
+    """ name of the modifier range a modifier falls into
+    input: mod:str, modifier column
+           width:int, size of the ranges, 1 keeps every modifier on its own
+    output: str, e.g. "-5..-1" """
+    mod = int(mod or 0)
+    if width <= 1:
+        return str(mod)
+    start = (mod // width) * width
+    return "{0}..{1}".format(start, start + width - 1)
+
+
+def expected(row):
+    """ exact success chance and mean result of the test of a row
+    input: row:list, in the output csv column order
+    output: (chance, mean):tuple, None if the row doesn't have the values
+            that are needed """
+    if row[4] == '' or row[5] == '':
+        return None
+    value = int(row[4])
+    mod = int(row[5])
+    # the exact chances follow the critical rule set of the row
+    rules = row[12]
+    if row[1] in ("skill", "spell"):
+        attrs = parse_attrs(row[6])
+        if len(attrs) != 3:
+            return None
+        counts = distribution_3dice(tuple(i[1] for i in attrs), value, mod,
+                                    rules)
+    else:
+        counts = distribution_1dice(value, mod, rules)
+    return success_chance(counts), mean_result(counts)
+
+
+def wilson_interval(successes, count, z_score=Z_95):
+    """ confidence interval of a success rate
+    input: successes:int
+           count:int
+           z_score:float
+    output: (low, high):tuple """
+    if not count:
+        return 0.0, 1.0
+    rate = successes / count
+    denominator = 1 + z_score ** 2 / count
+    center = (rate + z_score ** 2 / (2 * count)) / denominator
+    spread = z_score * math.sqrt(rate * (1 - rate) / count +
+                                 z_score ** 2 / (4 * count ** 2)) / denominator
+    return max(0.0, center - spread), min(1.0, center + spread)
+
+
+def group_stats(rows, group_by, mod_width=1):
+    """ single pass over all rows, every group only keeps running sums
+    input: rows:iterable, rows in the output csv column order
+           group_by:list, names of GROUP_KEYS
+           mod_width:int, size of the modifier buckets
+    output: groups:dict, group key -> list of sums, see summarize() """
+    keys = [GROUP_KEYS[name] for name in group_by]
+    # expected values are cached, most rows repeat the same tests
+    expected_cache = {}
+    groups = {}
+    for row in rows:
+        if row[1] not in D20_CATEGORIES or row[8] == '':
+            continue
+        key = tuple(function(row, mod_width) for function in keys)
+        try:
+            sums = groups[key]
+        except KeyError:
+            # count, successes, result sum, result square sum,
+            # rows with expected values, expected chance sum,
+            # expected chance variance sum, expected mean sum
+            sums = groups[key] = [0, 0, 0, 0, 0, 0.0, 0.0, 0.0]
+        result = int(row[8])
+        sums[0] += 1
+        sums[1] += result >= 0
+        sums[2] += result
+        sums[3] += result * result
+
+        test = (row[1], row[4], row[5], row[6], row[12])
+        try:
+            exact = expected_cache[test]
+        except KeyError:
+            exact = expected_cache[test] = expected(row)
+        if exact is not None:
+            sums[4] += 1
+            sums[5] += exact[0]
+            sums[6] += exact[0] * (1 - exact[0])
+            sums[7] += exact[1]
+    return groups
+
+
+def summarize(groups, group_by):
+    """ turn the running sums into a list of statistics per group
+    input: groups:dict, created by group_stats()
+           group_by:list, names of GROUP_KEYS
+    output: list of dicts """
+    out_list = []
+    for key, sums in sorted(groups.items()):
+        (count, successes, result_sum, square_sum, expected_count,
+         chance_sum, variance_sum, mean_sum) = sums
+        mean = result_sum / count
+        variance = max(0.0, square_sum / count - mean ** 2)
+        spread = Z_95 * math.sqrt(variance / count)
+        entry = {"group": dict(zip(group_by, key)),
+                 "count": count,
+                 "successes": successes,
+                 "success_rate": successes / count,
+                 "success_interval": wilson_interval(successes, count),
+                 "mean_result": mean,
+                 "mean_interval": (mean - spread, mean + spread),
+                 "expected_rows": expected_count}
+        if expected_count:
+            entry["expected_rate"] = chance_sum / expected_count
+            entry["expected_mean"] = mean_sum / expected_count
+            # z score of the observed successes against the sum of the
+            # expected chances, only rows with exact values take part
+            if expected_count == count and variance_sum > 0:
+                entry["z_score"] = (successes - chance_sum) / math.sqrt(
+                    variance_sum)
+        out_list.append(entry)
+    return out_list
+
+
+def print_stats(stats, group_by):
+    """ print the statistics as a table
+    input: stats:list, created by summarize()
+           group_by:list """
+    print("{0:45s} {1:>8s} {2:>17s} {3:>9s} {4:>8s} {5:>9s}".format(
+        "/".join(group_by) or "all", "tests", "success (95%)", "expected",
+        "mean", "exp. mean"))
+    for entry in stats:
+        low, high = entry["success_interval"]
+        print("{0:45s} {1:8d} {2:5.1f}% {3:4.1f}-{4:4.1f}% {5:>9s} "
+              "{6:8.2f} {7:>9s}".format(
+                  "/".join(entry["group"].values())[:45] or "all",
+                  entry["count"], 100 * entry["success_rate"],
+                  100 * low, 100 * high,
+                  "{0:.1f}%".format(100 * entry["expected_rate"])
+                  if "expected_rate" in entry else "-",
+                  entry["mean_result"],
+                  "{0:.2f}".format(entry["expected_mean"])
+                  if "expected_mean" in entry else "-"))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("path", nargs="?", default="output.csv",
+                        help="output csv file, SQLite database or binary log")
+    parser.add_argument("--group-by", nargs="*", default=["hero", "entry"],
+                        choices=sorted(GROUP_KEYS))
+    parser.add_argument("--mod-width", type=int, default=1,
+                        help="size of the modifier buckets")
+    parser.add_argument("--json", action="store_true",
+                        help="print the statistics as json")
+    args = parser.parse_args()
+
+    summary = summarize(group_stats(read_rows(args.path), args.group_by,
+                                    args.mod_width), args.group_by)
+    if args.json:
+        json.dump(summary, sys.stdout, indent=1)
+    else:
+        print_stats(summary, args.group_by)
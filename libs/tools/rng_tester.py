@@ -1,25 +1,187 @@
-""" this module tests GameLogic.roll_dice() """
-from libs.backend.dsa_game import GameLogic
+""" this module tests GameLogic.roll_dice() and other random number
+generators: throughput in rolls per second, peak memory and how evenly the
+faces are distributed. rolls are counted in fixed size chunks and never
+stored, independent streams run on worker processes """
+import argparse
+import concurrent.futures
+import random
+import re
+import sys
+import time
 
-if __name__ == '__main__':
-    test_count = 10000000
-    dice_count = 3
-    min_value = 1
-    max_value = 20
+from libs.backend.dsa_game import SessionDice
+from libs.tools.dice_fairness import chi_square_test
+
+try:
+    import numpy as np
+except ImportError:  # the numpy backend is left out
+    np = None
+
+try:
+    import resource
+except ImportError:  # not on Windows, the peak memory isn't shown
+    resource = None
+
+
+def _chunks_gamelogic(seed, dice_count, dice_eyes, tests, chunk_size):
+    """ GameLogic._roll_dice as the interfaces use it, on the seeded dice of
+    a session """
+    dice = SessionDice(seed)
+    while tests > 0:
+        size = min(chunk_size, tests)
+        tests -= size
+        chunk = []
+        for _ in range(size):
+            chunk += dice.roll(dice_count, 1, dice_eyes)
+        yield chunk
+
+
+def _chunks_randint(seed, dice_count, dice_eyes, tests, chunk_size):
+    """ random.Random.randint on a private generator """
+    rng = random.Random(seed)
+    randint = rng.randint
+    while tests > 0:
+        size = min(chunk_size, tests)
+        tests -= size
+        yield [randint(1, dice_eyes) for _ in range(size * dice_count)]
+
+
+def _chunks_choices(seed, dice_count, dice_eyes, tests, chunk_size):
+    """ random.Random.choices, draws a whole chunk with one call """
+    rng = random.Random(seed)
+    faces = range(1, dice_eyes + 1)
+    while tests > 0:
+        size = min(chunk_size, tests)
+        tests -= size
+        yield rng.choices(faces, k=size * dice_count)
+
+
+def _chunks_system(seed, dice_count, dice_eyes, tests, chunk_size):
+    """ random.SystemRandom, the operating system's generator. it can't be
+    seeded """
+    del seed
+    rng = random.SystemRandom()
+    randint = rng.randint
+    while tests > 0:
+        size = min(chunk_size, tests)
+        tests -= size
+        yield [randint(1, dice_eyes) for _ in range(size * dice_count)]
 
-    rolls = [GameLogic._roll_dice(dice_count, min_value, max_value) for i in range(test_count)]
 
-    print(repr(len(rolls)) + " dice rolls")
-    #    print(repr(rolls))
+def _chunks_numpy(seed, dice_count, dice_eyes, tests, chunk_size):
+    """ numpy.random.Generator.integers, vectorized """
+    rng = np.random.default_rng(seed)
+    while tests > 0:
+        size = min(chunk_size, tests)
+        tests -= size
+        yield rng.integers(1, dice_eyes + 1, size=size * dice_count)
 
-    out_list = []
-    for i in range(max_value):
-        out_list.append(0)
 
-    for index, value in enumerate(rolls):
-        for i, v in enumerate(rolls[index]):
-            out_list[v - 1] += 1
+BACKENDS = {"gamelogic": _chunks_gamelogic,
+            "randint": _chunks_randint,
+            "choices": _chunks_choices,
+            "system": _chunks_system}
+if np is not None:
+    BACKENDS["numpy"] = _chunks_numpy
+
+
+def count_stream(job):
+    """ roll one independent stream chunk by chunk and count the faces, runs
+    on a worker process
+    input: job:tuple, (backend, seed, dice count, dice eyes, tests,
+                       chunk size)
+    output: counts:list, index 0 is face 1 """
+    backend, seed, dice_count, dice_eyes, tests, chunk_size = job
+    counts = [0] * (dice_eyes + 1)
+    for chunk in BACKENDS[backend](seed, dice_count, dice_eyes, tests,
+                                   chunk_size):
+        if np is not None:
+            chunk_counts = np.bincount(chunk, minlength=dice_eyes + 1)
+            for face in range(1, dice_eyes + 1):
+                counts[face] += int(chunk_counts[face])
+        else:
+            for roll in chunk:
+                counts[roll] += 1
+    return counts[1:]
+
+
+def benchmark(backend, dice_count, dice_eyes, tests, processes, chunk_size,
+              seed):
+    """ split the tests into one stream per process and merge the counts
+    input: backend:str, key of BACKENDS
+           dice_count:int
+           dice_eyes:int
+           tests:int, how many times dice_count dice are rolled
+           processes:int
+           chunk_size:int, tests per chunk
+           seed:int, stream i uses seed + i
+    output: (counts, seconds):tuple """
+    per_process = -(-tests // processes)
+    jobs = []
+    for index in range(processes):
+        stream_tests = min(per_process, tests - index * per_process)
+        if stream_tests > 0:
+            jobs.append((backend, seed + index, dice_count, dice_eyes,
+                         stream_tests, chunk_size))
+
+    start = time.perf_counter()
+    if processes == 1:
+        results = [count_stream(job) for job in jobs]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(processes) as pool:
+            results = list(pool.map(count_stream, jobs))
+    seconds = time.perf_counter() - start
+    counts = [sum(i) for i in zip(*results)]
+    return counts, seconds
+
+
+def peak_memory():
+    """ peak resident memory of this process and its finished workers
+    output: float, MB, None if the resource module is missing """
+    if resource is None:
+        return None
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KB everywhere else
+    return max(own, children) / (1 << 20 if sys.platform == "darwin"
+                                 else 1 << 10)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tests", type=int, default=10000000,
+                        help="tests per dice shape")
+    parser.add_argument("--dice", nargs="*", default=["1d20", "3d20"],
+                        help="dice shapes, e.g. 1d20 (attributes), 3d20 "
+                             "(skills, spells), 3d6 (misc dice sums)")
+    parser.add_argument("--backend", nargs="*", default=["gamelogic"],
+                        choices=sorted(BACKENDS) + ["all"])
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--chunk-size", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
 
-    for i in range(max_value):
-        print("{0:2d}: {1:d}, {2:3.4f}%".format(i + 1, out_list[i], (
-                    out_list[i] / (dice_count * test_count)) * 100))
+    backends = sorted(BACKENDS) if "all" in args.backend else args.backend
+    for shape in args.dice:
+        # regex: "3d20" -> '3', '20', same syntax as misc dice sums
+        match = re.match(r"^(\d+)[dDwW](\d+)$", shape)
+        if not match:
+            parser.error("invalid dice shape " + shape)
+        count, eyes = int(match.groups()[0]), int(match.groups()[1])
+        for name in backends:
+            face_count, duration = benchmark(name, count, eyes, args.tests,
+                                             args.processes,
+                                             args.chunk_size, args.seed)
+            total = sum(face_count)
+            chi_square = chi_square_test(face_count)
+            print("{0:10s} {1:6s} {2:12d} rolls {3:12.0f} rolls/s "
+                  "chi square p={4:.4f}".format(
+                      name, shape, total, total / duration,
+                      chi_square["p_value"]))
+            for face in range(eyes):
+                print("\t{0:2d}: {1:d}, {2:3.4f}%".format(
+                    face + 1, face_count[face],
+                    face_count[face] / total * 100))
+    peak = peak_memory()
+    if peak is not None:
+        print("peak memory: {0:.1f} MB".format(peak))
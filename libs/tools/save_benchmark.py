@@ -0,0 +1,59 @@
+""" compare the save latency seen by an interface when writing directly and
+when handing rows to the background ResultWriter, using a slowed down sink """
+import argparse
+import time
+
+from libs.backend.dsa_writer import ResultWriter
+
+
+def slow_sink(delay):
+    """ create a sink that sleeps for every call, like a slow network disk
+    input: delay:float, seconds per write call
+    output: sink:callable """
+
+    def sink(rows):
+        time.sleep(delay)
+        return len(rows)
+
+    return sink
+
+
+def measure(save, save_count):
+    """ call save() save_count times
+    input: save:callable, saves one row
+           save_count:int
+    output: latencies:list, seconds per call """
+    latencies = []
+    for i in range(save_count):
+        start = time.perf_counter()
+        save(["hero.xml", "attr", "Mut", '', 12, 0, '', str(i), 0,
+              "Roll#" + str(i), "2020-01-01T00:00:00", "auto", "none"])
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def report(name, latencies):
+    """ print mean and max latency in milliseconds """
+    latencies = sorted(latencies)
+    print("{0:10s} mean {1:8.3f} ms   p99 {2:8.3f} ms   max {3:8.3f} ms"
+          .format(name,
+                  1000 * sum(latencies) / len(latencies),
+                  1000 * latencies[int(0.99 * (len(latencies) - 1))],
+                  1000 * latencies[-1]))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--saves", type=int, default=50)
+    parser.add_argument("--delay", type=float, default=0.02,
+                        help="seconds the sink sleeps per write")
+    args = parser.parse_args()
+
+    sink = slow_sink(args.delay)
+    report("direct", measure(lambda row: sink([row]), args.saves))
+
+    writer = ResultWriter(sink, max_size=args.saves)
+    report("queued", measure(writer.submit, args.saves))
+    start = time.perf_counter()
+    writer.close()
+    print("drained queue in {0:.3f} s".format(time.perf_counter() - start))
@@ -0,0 +1,58 @@
+""" replay recorded sessions of a trace file (config entry "session
+recording: on") without an interface, as fast as GameLogic runs them. every
+test is rolled with the recorded seed and compared with the trace, so a
+reported anomaly can be reproduced. replays also serve as load benchmarks
+made of real sessions """
+import argparse
+import os
+import sys
+
+from libs.backend.dsa_trace import read_sessions, replay_session
+from libs.languages.languages import english
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("trace", help="trace file, e.g. session.trace")
+    parser.add_argument("--session", type=int, nargs='+',
+                        help="numbers of the sessions to replay, starting "
+                             "at 1, all sessions if not given")
+    parser.add_argument("--hero-folder",
+                        help="hero folder of the replay, the recorded "
+                             "folder if not given")
+    parser.add_argument("--output", default=os.devnull,
+                        help="saved tests are written here")
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="replay every session this many times")
+    parser.add_argument("--show", type=int, default=10,
+                        help="mismatches shown per session")
+    args = parser.parse_args()
+
+    sessions = read_sessions(args.trace)
+    numbers = args.session or range(1, len(sessions) + 1)
+    total_events = 0
+    total_seconds = 0.0
+    failed = False
+    for number in numbers:
+        if not 1 <= number <= len(sessions):
+            parser.error("no session {0}, the trace has {1}".format(
+                number, len(sessions)))
+        session = sessions[number - 1]
+        for _ in range(args.repeat):
+            result = replay_session(session, english, args.hero_folder,
+                                    args.output)
+            total_events += result.events
+            total_seconds += result.seconds
+        print("session {0} (seed {1}): {2} events, {3} tests, {4} "
+              "mismatches, {5:.1f} ms".format(
+                  number, session.header["seed"], result.events,
+                  result.tests, len(result.mismatches),
+                  result.seconds * 1000))
+        for mismatch in result.mismatches[:args.show]:
+            print("\t" + mismatch)
+        failed = failed or bool(result.mismatches)
+
+    if total_seconds:
+        print("{0} events in {1:.3f} s, {2:.0f} events/s".format(
+            total_events, total_seconds, total_events / total_seconds))
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,47 @@
+""" import an existing output csv file into a SQLite result database and
+show per hero or per entry statistics """
+import argparse
+import os
+import time
+
+from libs.backend.dsa_sqlite import SqliteResultStore
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("database", help="SQLite file, created if missing")
+    parser.add_argument("--csv", help="output csv file to import, rows that "
+                                      "are already stored are skipped")
+    parser.add_argument("--hero", help="show statistics of this hero file")
+    parser.add_argument("--entry", help="show statistics of this entry")
+    args = parser.parse_args()
+
+    if not args.csv and not os.path.isfile(args.database):
+        parser.error("no database " + args.database)
+    # statistics alone don't change the database
+    store = SqliteResultStore(args.database, readonly=not args.csv)
+
+    if args.csv:
+        start = time.perf_counter()
+        count = store.import_csv(args.csv)
+        print("imported {0} rows in {1:.2f} s".format(
+            count, time.perf_counter() - start))
+
+    if args.hero:
+        start = time.perf_counter()
+        stats = store.hero_stats(args.hero)
+        duration = time.perf_counter() - start
+        for category, name, count, successes, mean in stats:
+            print("{0:14s} {1:30s} {2:8d} {3:8d} {4:8.2f}".format(
+                category, name, count, successes, mean))
+        print("query took {0:.2f} ms".format(1000 * duration))
+
+    if args.entry:
+        start = time.perf_counter()
+        stats = store.entry_stats(args.entry)
+        duration = time.perf_counter() - start
+        for hero_file, count, successes, mean in stats:
+            print("{0:30s} {1:8d} {2:8d} {3:8.2f}".format(
+                hero_file, count, successes, mean))
+        print("query took {0:.2f} ms".format(1000 * duration))
+
+    store.close()
@@ -0,0 +1,100 @@
+""" measures how long DSATester takes to start: which modules cost the most
+import time, and the cold start from launching main.py in the CLI to its
+first prompt. every run is a fresh interpreter, so nothing is cached """
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# the repository root, main.py is started from here
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))
+
+
+def import_profile(module="main"):
+    """ import a module in a new interpreter with -X importtime
+    input: module:str
+    output: list of (cumulative us, self us, module name) tuples, slowest
+            first """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c",
+                             "import " + module], cwd=ROOT, check=True,
+                            capture_output=True, text=True)
+    out_list = []
+    for line in result.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[0].startswith("import time:"):
+            continue
+        self_time = parts[0].split(":")[1].strip()
+        if not self_time.isdigit():
+            continue
+        out_list.append((int(parts[1]), int(self_time), parts[2].rstrip()))
+    out_list.sort(reverse=True)
+    return out_list
+
+
+def write_cli_config(folder, hero_folder):
+    """ write a config.txt that starts the CLI with the given heroes
+    input: folder:str, the config and the output file are placed here
+           hero_folder:str """
+    with open(os.path.join(folder, "config.txt"), "w",
+              encoding="utf-8") as config_file:
+        config_file.write("language: english\n"
+                          "hero folder: {0}\n"
+                          "output file: {1}\n"
+                          "output format: csv\n"
+                          "interface: CLI\n"
+                          "dice: auto\n".format(
+                              os.path.abspath(hero_folder),
+                              os.path.join(folder, "output.csv")))
+
+
+def cold_start(hero_folder, runs):
+    """ start main.py runs times, each one quits at its first prompt
+    input: hero_folder:str
+           runs:int
+    output: list of floats, seconds per run """
+    work_folder = tempfile.mkdtemp()
+    durations = []
+    try:
+        write_cli_config(work_folder, hero_folder)
+        for _ in range(runs):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, os.path.join(ROOT, "main.py")],
+                           cwd=work_folder, input="exit\n", check=True,
+                           capture_output=True, text=True)
+            durations.append(time.perf_counter() - start)
+    finally:
+        shutil.rmtree(work_folder)
+    return durations
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--hero-folder",
+                        default=os.path.join(ROOT, "hero_files"))
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--top", type=int, default=15,
+                        help="how many modules of the import profile are "
+                             "shown")
+    parser.add_argument("--max-ms", type=float, default=None,
+                        help="exit with 1 if the median cold start is "
+                             "slower, e.g. for a CI job")
+    args = parser.parse_args()
+
+    print("{0:>10s} {1:>10s}  module".format("cumul. us", "self us"))
+    for cumulative, own, name in import_profile()[:args.top]:
+        print("{0:10d} {1:10d} {2}".format(cumulative, own, name))
+
+    times = cold_start(args.hero_folder, args.runs)
+    median = statistics.median(times) * 1000
+    print("cold start to first prompt: median {0:.1f} ms, min {1:.1f} ms, "
+          "max {2:.1f} ms over {3} runs".format(
+              median, min(times) * 1000, max(times) * 1000, len(times)))
+    if args.max_ms is not None and median > args.max_ms:
+        print("SLOWER than {0:.1f} ms".format(args.max_ms))
+        sys.exit(1)
@@ -1,6 +1,8 @@
 """ Reads config file and starts interface """
-from libs.interfaces.cli import CLI
-from libs.interfaces.gui import GUI
+import argparse
+import shlex
+import sys
+
 from libs.backend.dsa_game import GameLogic, GameState
 from libs.languages.languages import english, german
 
@@ -18,9 +20,12 @@ def read_config(config_name):
     """
 
     out_dict = {}
-    str_entries = ("output file", "interface",
-                   "dice", "hero folder", "language")
-    int_entries = ("font size", "width", "height")
+    str_entries = ("output file", "output format", "interface",
+                   "dice", "hero folder", "language", "metrics",
+                   "metrics file", "critical rules", "session recording",
+                   "session trace file")
+    int_entries = ("font size", "width", "height", "save queue size",
+                   "metrics interval", "search delay", "session seed")
     float_entries = "scaling"
     with open(config_name, "r", encoding="utf-8") as configfile:
         for line in configfile.readlines():
@@ -38,7 +43,41 @@ def read_config(config_name):
     return out_dict
 
 
+def batch_lines(args):
+    """
+    Collects the commands of the batch mode. Command line arguments form
+    commands, separated by an argument ";". A batch file is read line by
+    line while the commands run.
+
+    Parameters:
+        args (argparse.Namespace): parsed command line arguments
+
+    Returns:
+        lines (iterable): one command per line, None if there are no batch
+        commands
+    """
+
+    if args.batch == '-':
+        return sys.stdin
+    if args.batch is not None:
+        # the file stays open until the program ends
+        return open(args.batch, "r", encoding="utf-8")
+    if args.commands:
+        return " ".join(shlex.quote(i) for i in args.commands).split(" ';' ")
+    return None
+
+
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("commands", nargs="*",
+                        help='run batch commands instead of the interface, '
+                             'e.g. hero=02_testchar test="Klettern" mod=-3 '
+                             'save="desc", separate commands with ";"')
+    parser.add_argument("--batch", metavar="FILE",
+                        help='run the batch commands of a file, one per '
+                             'line, "-" reads them from stdin')
+    arguments = parser.parse_args()
+
     lang = None
     interface = None
     configs = read_config("config.txt")
@@ -49,11 +88,45 @@ if __name__ == '__main__':
     elif configs["language"] == "german":
         lang = german
 
-    game = GameLogic(configs, lang)
+    # without "metrics: on" nothing is wrapped and nothing is measured
+    metrics = None
+    if configs.get("metrics") == "on":
+        from libs.backend.dsa_metrics import Metrics, GAME_METHODS
+        metrics = Metrics()
+
+    try:
+        if metrics is None:
+            game = GameLogic(configs, lang)
+        else:
+            with metrics.timer("GameLogic.__init__"):
+                game = GameLogic(configs, lang)
+    except ValueError as error:
+        # a config error, e.g. an output file of another output format
+        sys.exit(str(error))
+    if metrics is not None:
+        metrics.instrument(game, GAME_METHODS, "GameLogic")
+        metrics.start_exporter(configs["metrics file"],
+                               configs["metrics interval"])
+    # roll numbers continue where the output file ends
+    state = game.restore_counter(state)
 
-    if configs["interface"] == "CLI":
-        interface = CLI(game, state, configs, lang)
-    elif configs["interface"] == "GUI":
-        interface = GUI(game, state, configs, lang)
+    # only the chosen interface is imported, so a CLI run doesn't wait for
+    # tkinter
+    try:
+        lines = batch_lines(arguments)
+        if lines is not None:
+            from libs.interfaces.batch import Batch
+            interface = Batch(game, state, configs, lang, lines)
+        elif configs["interface"] == "CLI":
+            from libs.interfaces.cli import CLI
+            interface = CLI(game, state, configs, lang, metrics)
+        elif configs["interface"] == "GUI":
+            from libs.interfaces.gui import GUI
+            interface = GUI(game, state, configs, lang, metrics)
 
-    interface.loop()
+        interface.loop()
+    finally:
+        if metrics is not None:
+            metrics.stop_exporter()
+            metrics.write_file(configs["metrics file"])
+            print(metrics.dump())